@@ -3,6 +3,7 @@ import random
 from flask import current_app
 from flask_mail import Message
 #from app.extensions import mail
+from app.mail_queue import mail_queue
 from app.models.ActivityRecord import ActivityRecord
 from datetime import datetime, timezone, UTC, timedelta
 
@@ -46,8 +47,8 @@ def send_verification_email(email: str, code: str, purpose: str = "login") -> bo
             return False
 
         msg = Message(subject=subject, recipients=[email], body=body, sender=sender)
-        mail.send(msg)
-        print(f"{purpose.capitalize().replace('_', ' ')} verification email sent to {email}")
+        mail_queue.enqueue(msg, category=purpose)
+        print(f"{purpose.capitalize().replace('_', ' ')} verification email queued for {email}")
         return True
     except Exception as e:
         print(f"!!! Failed to send {purpose} verification email to {email}: {str(e)}")
@@ -3,6 +3,8 @@ from datetime import datetime, timezone, timedelta
 import random # For generating numerical CAPTCHA
 import string   # For generating numerical CAPTCHA
 from ...extensions import mongo
+from ...code_store import CodeStore
+from ...mail_queue import mail_queue
 from ...models.ActivityRecord import ActivityRecord
 from flask_mail import Message
 
@@ -16,6 +18,7 @@ CODE_SEND_FAILED_DB = "CODE_SEND_FAILED_DB"
 
 # Define the CAPTCHA collection name, consistent with your new app.py
 CAPTCHA_COLLECTION_NAME = 'mail_verificationsl_verifications'
+captcha_codes = CodeStore(CAPTCHA_COLLECTION_NAME, code_field='captcha', expiry_field='expires_at')
 
 class VerificationService:
     """Handles logic related to generating, sending, and verifying email CAPTCHAs."""
@@ -48,39 +51,10 @@ class VerificationService:
         if not isinstance(code_lifetime, timedelta): # Type check and fallback
             code_lifetime = timedelta(minutes=5)
 
-        now_utc = datetime.now(timezone.utc)
-        expires_at = now_utc + code_lifetime
-
-        # Prepare record for MongoDB, similar to your new app.py
-        # We include 'purpose' and 'created_at' for better record management,
-        # and 'expires_at' for automatic cleanup or validation.
-        captcha_record_data = {
-            "email": email.lower(), # Store email in lowercase for case-insensitive lookup
-            "captcha": captcha_code, # Storing the numerical code
-            "expires_at": expires_at,
-            "created_at": now_utc,
-            "purpose": purpose # Useful for distinguishing login vs registration codes etc.
-        }
-
-        collection = cls._get_collection()
-        record_id = None
-
         try:
-            update_result = collection.update_one(
-                {'email': email.lower()},  # Query condition based on email
-                {'$set': captcha_record_data}, # Data to insert or update
-                upsert=True  # Create a new document if no match is found
-            )
-            
-            if update_result.upserted_id:
-                record_id = update_result.upserted_id
-                print(f"New CAPTCHA record created for {email}, purpose: {purpose}, ID: {record_id}")
-            elif update_result.matched_count > 0:
-                # If an existing record was updated, we might not get a direct ID from update_result this way.
-                # We can fetch the record if ID is strictly needed for logging here.
-                # For now, successful update is sufficient.
-                print(f"CAPTCHA record updated for {email}, purpose: {purpose}")
-
+            # One code per email; the TTL index on expires_at removes it once it has expired
+            captcha_codes.issue(email, captcha_code, code_lifetime, purpose=purpose)
+            print(f"CAPTCHA code stored for {email}, purpose: {purpose}")
 
             # Create and send email using Flask-Mail
             mail_instance = current_app.extensions.get('mail')
@@ -109,8 +83,8 @@ class VerificationService:
                 body=email_body,
                 sender=sender_email
             )
-            mail_instance.send(msg)
-            print(f"CAPTCHA email sent to {email} for {purpose}.")
+            mail_queue.enqueue(msg, category=purpose)
+            print(f"CAPTCHA email queued for {email} for {purpose}.")
 
             ActivityRecord(
                 userAccount=email,
@@ -151,25 +125,12 @@ class VerificationService:
         if not email or not code_to_verify:
             return VERIFICATION_FAILED_INVALID
 
-        collection = cls._get_collection()
-        now_utc = datetime.now(timezone.utc)
-
         try:
-            # Find the document. We will delete it if valid.
-            # Query includes purpose for stricter matching if your upsert logic in create_and_send_code
-            # also considers purpose for uniqueness. If not, querying by email and captcha is enough.
-            # To match the simple upsert by email in your new app.py, we'd query by email and captcha.
-            query = {
-                "email": email.lower(),
-                "captcha": code_to_verify,
-                # "purpose": purpose, # Optional: add if you store purpose-specific codes
-                "expires_at": {"$gt": now_utc} # Check expiry
-            }
-            captcha_doc = collection.find_one(query)
+            # Valid, unexpired and under the attempt limit; deleted in the same operation
+            # so the code cannot be reused. Wrong guesses count towards the limit.
+            captcha_doc = captcha_codes.verify(email, code_to_verify)
 
             if captcha_doc:
-                # CAPTCHA is valid and not expired. Delete it to prevent reuse.
-                collection.delete_one({"_id": captcha_doc["_id"]})
                 ActivityRecord(
                     userAccount=email,
                     activityName=f"CAPTCHA Verified Successfully ({purpose})",
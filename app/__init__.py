@@ -1,14 +1,29 @@
 from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
 from .extensions import mongo, close_db, login_manager, mail
+from .jobs import job_engine
+from .mail_queue import mail_queue
+from .indexes import indexes_cli, ensure_indexes_on_start
+from .status_counters import counters_cli
+from .query_audit import query_audit
+from .instrumentation import request_instrumentation
+from .metrics import metrics
+from .ratelimit import rate_limiter
 from .main.User import User
+from .main.IdentityService import IdentityService
 from .main.routes import main_bp
 from .auth.routes import auth_bp
 from .payment.routes import payment_bp
+from .payment.Ledger import Ledger, ledger_cli
 from .workspace.routes import workspace_bp
+from .workspace.service.OrganizationService import OrganizationService
 from .thesis.routes import thesis_bp
 from .datauser.routes import datauser_bp
+from .datauser.services.NotificationBroker import notification_broker
+from .datauser.services.QuotaService import QuotaService
 from .datauser.routes import datauser_bp, consumer_bp, public_bp
 from .admin.routes import admin_bp
+from .admin.service.Eadmin_service import EAdminService
 from app.main.User import User # Assuming User.Roles enum is here
 from app.workspace.models import OConvener
 from app.admin.models import TAdmin, EAdmin, SeniorEAdmin
@@ -17,27 +32,27 @@ from bson import ObjectId
 def create_app():
     app = Flask(__name__)
     app.config.from_object("config.Config")
+    if app.config.get('PROXY_FIX_X_FOR'):
+        # request.remote_addr is otherwise the address of the last proxy
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
 
-    # Initialize MongoDB
-    mongo.init_app(app)
+    # Initialize MongoDB; command listeners must be passed when the client is created
+    query_audit.init_app(app)
+    request_instrumentation.init_app(app)
+    metrics.init_app(app)
+    mongo.init_app(app, event_listeners=(
+        query_audit.command_listeners() + request_instrumentation.command_listeners() + metrics.event_listeners()
+    ))
     login_manager.init_app(app)
-    @login_manager.user_loader
-    def load_user(user_id):
-        #print(ObjectId(user_id))
-        user_doc = mongo.db.users.find_one({"_id": ObjectId(user_id)})
-        role = user_doc.get('role')
-        if int(role) == User.Roles.O_CONVENER.value:
-            return OConvener(user_doc)
-        elif int(role) == User.Roles.E_ADMIN.value:
-            return EAdmin(user_doc)
-        elif int(role) == User.Roles.T_ADMIN.value:
-            return TAdmin(user_doc)
-        elif role == User.Roles.SENIOR_EADMIN.value: # 新增 SeniorEAdmin 加载
-            return SeniorEAdmin(user_doc)
-        else:
-            return User(user_doc) 
+    IdentityService.init_app(app)
+    login_manager.user_loader(IdentityService.load_user)
+    OrganizationService.init_app(app)
+    EAdminService.init_app(app)
 
     mail.init_app(app)
+    mail_queue.init_app(app)
+    notification_broker.init_app(app)
+    QuotaService.init_app(app)
 
     # Register blueprints
     app.register_blueprint(main_bp)
@@ -50,6 +65,19 @@ def create_app():
     app.register_blueprint(public_bp)
     app.register_blueprint(admin_bp)
 
+    # Throttle the data user APIs per IP, user and organization
+    rate_limiter.init_app(app, blueprints=(datauser_bp, consumer_bp, public_bp))
+
+    app.cli.add_command(indexes_cli)
+    app.cli.add_command(counters_cli)
+    app.cli.add_command(ledger_cli)
+    if app.config.get('ENSURE_INDEXES_ON_START'):
+        ensure_indexes_on_start(app)
+
+    # Start background workers after the blueprints have registered their job handlers
+    job_engine.register_sweep(Ledger.recover_pending)
+    job_engine.init_app(app)
+
     # Disconnect database on exit
     app.teardown_appcontext(close_db)
 
@@ -3,8 +3,10 @@ from flask_login import login_required, current_user
 from app.main.User import User
 from app.admin.models import EAdmin
 from app.extensions import mongo
-from . import admin_bp
-from ..service.Eadmin_service import EAdminService
+from app.main.IdentityService import IdentityService
+from . import admin_bp, bulk_request_ids
+from ..service.Eadmin_service import EAdminService, summarize_bulk_outcomes
+from ..service.EAdminDashboardService import EAdminDashboardService
 from bson import ObjectId
 from werkzeug.utils import secure_filename
 import os
@@ -21,39 +23,16 @@ def eadmin_dashboard_page():
     if not current_user.is_authenticated or current_user.role != User.Roles.E_ADMIN:
         flash("Unauthorized access.", "danger")
         return redirect(url_for('auth.login'))
-    user_doc = mongo.db.users.find_one({"_id": ObjectId(current_user.user_id)})
-    if not user_doc:
-        flash("User session error.", "danger")
-        return redirect(url_for('auth.logout'))
-    current_eadmin = EAdmin(user_doc)
-    eadmin_service = EAdminService()
-    eadmin_service.email = current_eadmin.email
 
-    # Get registration applications
-    app_status_filter = request.args.get('app_status', "pending_eadmin_approval")
-    applications_list = eadmin_service.view_registration_applications(status=app_status_filter)
-
-    # Get user logs
-    current_log_page = request.args.get('log_page', 1, type=int)
-    logs_per_page = 15
-    logs_list, total_logs = eadmin_service.view_user_logs(limit=logs_per_page, page=current_log_page)
-    total_log_pages = (total_logs + logs_per_page - 1) // logs_per_page if total_logs else 1
-
-    # Get platform policies
-    current_policy_page = request.args.get('page', 1, type=int)
-    policies_per_page = 10
-    platform_policies_list, total_policies = eadmin_service.view_policies(limit=policies_per_page, page=current_policy_page)
-    total_policy_pages = (total_policies + policies_per_page - 1) // policies_per_page if total_policies else 1
-
-    return render_template('admin/EAdminDashBoard.html',
-                         applications=applications_list or [],
-                         current_app_filter=app_status_filter,
-                         logs=logs_list or [],
-                         current_log_page=current_log_page,
-                         total_log_pages=total_log_pages,
-                         platform_policies=platform_policies_list or [],
-                         current_policy_page=current_policy_page,
-                         total_policy_pages=total_policy_pages)
+    # current_user was loaded from the user document by the login manager; no second lookup needed
+    view_model = EAdminDashboardService.build_eadmin_dashboard(
+        current_user.email,
+        app_status=request.args.get('app_status', "pending_eadmin_approval"),
+        app_cursor=request.args.get('app_cursor'),
+        log_page=request.args.get('log_page', 1, type=int),
+        policy_page=request.args.get('page', 1, type=int)
+    )
+    return render_template('admin/EAdminDashBoard.html', **view_model)
 
 @admin_bp.route('/eadmin/applications/<string:app_id>/approve', methods=['POST'])
 @login_required
@@ -62,7 +41,7 @@ def eadmin_approve_app(app_id):
     if not current_user.is_authenticated or current_user.role != User.Roles.E_ADMIN:
         flash("Unauthorized access.", "danger")
         return redirect(url_for('auth.login'))
-    user_doc = mongo.db.users.find_one({"_id": ObjectId(current_user.user_id)})
+    user_doc = IdentityService.get_user_doc(current_user.user_id)
     if not user_doc:
         flash("User session error.", "danger")
         return redirect(url_for('auth.logout'))
@@ -82,7 +61,7 @@ def eadmin_reject_app_page(app_id):
         return redirect(url_for('auth.login'))
     
     if request.method == 'POST':
-        user_doc = mongo.db.users.find_one({"_id": ObjectId(current_user.user_id)})
+        user_doc = IdentityService.get_user_doc(current_user.user_id)
         if not user_doc:
             flash("User session error.", "danger")
             return redirect(url_for('auth.logout'))
@@ -101,6 +80,51 @@ def eadmin_reject_app_page(app_id):
 
     return render_template('admin/reject_application.html', app_id=app_id)
 
+def _bulk_application_action(action: str):
+    """Shared by the bulk approve/reject routes; JSON callers get the per-id outcomes."""
+    if not current_user.is_authenticated or current_user.role != User.Roles.E_ADMIN:
+        flash("Unauthorized access.", "danger")
+        return (jsonify({'success': False, 'message': 'Unauthorized access.'}), 403) if request.is_json else redirect(url_for('auth.login'))
+    user_doc = IdentityService.get_user_doc(current_user.user_id)
+    if not user_doc:
+        flash("User session error.", "danger")
+        return (jsonify({'success': False, 'message': 'User session error.'}), 401) if request.is_json else redirect(url_for('auth.logout'))
+    redirect_target = url_for('admin.eadmin_dashboard_page', app_status=request.args.get('app_status', "pending_eadmin_approval"))
+
+    app_ids, error = bulk_request_ids()
+    reason = (request.get_json(silent=True) or {}).get('rejection_reason') if request.is_json else request.form.get('rejection_reason')
+    if not error and action == "rejected" and not (reason or '').strip():
+        error = "Rejection reason is required."
+    if error:
+        if request.is_json:
+            return jsonify({'success': False, 'message': error}), 400
+        flash(error, "danger")
+        return redirect(redirect_target)
+
+    eadmin_service = EAdminService()
+    eadmin_service.email = EAdmin(user_doc).email
+    if action == "approved":
+        success, outcomes = eadmin_service.approveRegistrationApplications(app_ids)
+    else:
+        success, outcomes = eadmin_service.rejectRegistrationApplications(app_ids, reason=reason.strip())
+    message = summarize_bulk_outcomes(outcomes, action)
+    if request.is_json:
+        return jsonify({'success': success, 'message': message, 'results': outcomes})
+    flash(message, "success" if success else "danger")
+    return redirect(redirect_target)
+
+@admin_bp.route('/eadmin/applications/bulk-approve', methods=['POST'])
+@login_required
+def eadmin_bulk_approve_apps():
+    """Approve several registration applications at once"""
+    return _bulk_application_action("approved")
+
+@admin_bp.route('/eadmin/applications/bulk-reject', methods=['POST'])
+@login_required
+def eadmin_bulk_reject_apps():
+    """Reject several registration applications at once, with one reason"""
+    return _bulk_application_action("rejected")
+
 @admin_bp.route('/eadmin/policies/add', methods=['POST'])
 @login_required
 def eadmin_add_policy():
@@ -108,7 +132,7 @@ def eadmin_add_policy():
         flash("Unauthorized access.", "danger")
         return redirect(url_for('auth.login'))
     
-    user_doc = mongo.db.users.find_one({"_id": ObjectId(current_user.user_id)})
+    user_doc = IdentityService.get_user_doc(current_user.user_id)
     if not user_doc:
         flash("User session error.", "danger")
         return redirect(url_for('auth.logout'))
@@ -142,7 +166,7 @@ def eadmin_delete_policy(policy_id):
         flash("Unauthorized access.", "danger")
         return redirect(url_for('auth.login'))
     
-    user_doc = mongo.db.users.find_one({"_id": ObjectId(current_user.user_id)})
+    user_doc = IdentityService.get_user_doc(current_user.user_id)
     if not user_doc:
         flash("User session error.", "danger")
         return redirect(url_for('auth.logout'))
@@ -160,7 +184,7 @@ def eadmin_edit_policy(policy_id):
     if not current_user.is_authenticated or current_user.role != User.Roles.E_ADMIN:
         return (jsonify({'success': False, 'message': 'Unauthorized access.'}), 403) if request.is_json else redirect(url_for('auth.login'))
 
-    user_doc = mongo.db.users.find_one({"_id": ObjectId(current_user.user_id)})
+    user_doc = IdentityService.get_user_doc(current_user.user_id)
     if not user_doc:
         return (jsonify({'success': False, 'message': 'User session error.'}), 401) if request.is_json else redirect(url_for('auth.logout'))
 
@@ -3,6 +3,7 @@ from flask_login import login_required, current_user
 from app.main.User import User 
 from ..models import TAdmin, UserQuestion
 from app.extensions import mongo 
+from app.main.IdentityService import IdentityService
 from . import admin_bp 
 from ..service.Tadmin_service import TAdminService 
 from bson import ObjectId 
@@ -15,16 +16,20 @@ def tadmin_dashboard_page():
         flash("Access Denied: Not a logged-in T-Admin.", "danger")
         return redirect(url_for('main.index'))
 
-    user_doc = mongo.db.users.find_one({"_id": ObjectId(current_user.user_id)})
+    user_doc = IdentityService.get_user_doc(current_user.user_id)
     if not user_doc:
         flash("Critical Error: T-Admin user document not found.", "danger")
         return redirect(url_for('auth.logout'))
 
     tadmin_model_instance = TAdmin(user_doc)
     request_status_filter = request.args.get('request_status', UserQuestion.PENDING)
+    if request_status_filter not in (UserQuestion.PENDING, UserQuestion.ANSWERED):
+        request_status_filter = UserQuestion.PENDING
+    request_cursor = request.args.get('request_cursor')
+    request_search = request.args.get('request_q', '').strip()
 
-    help_requests_list, error_help = tadmin_service_instance.view_help_requests(
-        admin=tadmin_model_instance, status=request_status_filter
+    help_requests_list, next_request_cursor, error_help = tadmin_service_instance.view_help_requests(
+        admin=tadmin_model_instance, status=request_status_filter, cursor=request_cursor, search=request_search
     )
     if error_help:
         flash(f"Error loading help requests: {error_help}", "danger")
@@ -41,6 +46,10 @@ def tadmin_dashboard_page():
                            help_requests=help_requests_list or [],
                            eadmin_list=all_managed_admins or [], # 重命名为 all_managed_admins
                            current_request_filter=request_status_filter,
+                           request_cursor=request_cursor,
+                           next_request_cursor=next_request_cursor,
+                           request_search=request_search,
+                           pending_request_count=tadmin_service_instance.pending_help_request_count(),
                            UserQuestion=UserQuestion,
                            User=User) # 传递 User 类到模板
 
@@ -51,7 +60,7 @@ def tadmin_answer_request(question_id):
         flash("Access Denied.", "danger")
         return redirect(url_for('auth.login')) 
 
-    user_doc = mongo.db.users.find_one({"_id": current_user.user_id}) 
+    user_doc = IdentityService.get_user_doc(current_user.user_id)
     if not user_doc:
         flash("Critical Error: T-Admin user document not found.", "danger")
         return redirect(url_for('auth.logout'))
@@ -80,7 +89,7 @@ def tadmin_add_admin_user_route(): # 重命名路由函数
         flash("Access Denied.", "danger")
         return redirect(url_for('auth.login'))
 
-    user_doc = mongo.db.users.find_one({"_id": ObjectId(current_user.user_id)})
+    user_doc = IdentityService.get_user_doc(current_user.user_id)
     if not user_doc:
         flash("Critical Error: T-Admin user document not found.", "danger")
         return redirect(url_for('auth.logout'))
@@ -121,7 +130,7 @@ def tadmin_edit_admin_user_page(eadmin_id):
         flash("Access Denied. Not a logged-in T-Admin.", "danger")
         return redirect(url_for('auth.login'))
 
-    tadmin_user_doc = mongo.db.users.find_one({"_id": ObjectId(current_user.user_id)}) # Use current_user.user_id
+    tadmin_user_doc = IdentityService.get_user_doc(current_user.user_id) # Use current_user.user_id
     if not tadmin_user_doc:
         if request.method == 'POST':
             return jsonify({'success': False, 'message': 'Critical Error: T-Admin user document not found.'}), 500
@@ -200,7 +209,7 @@ def tadmin_delete_admin_user_route(admin_user_id): # 重命名
         flash("Access Denied.", "danger")
         return redirect(url_for('auth.login'))
 
-    user_doc = mongo.db.users.find_one({"_id": ObjectId(current_user.user_id)})
+    user_doc = IdentityService.get_user_doc(current_user.user_id)
     if not user_doc:
         flash("Critical Error: T-Admin user document not found.", "danger")
         return redirect(url_for('auth.logout'))
@@ -1,9 +1,27 @@
-from flask import Blueprint, redirect, url_for, render_template, request
+from flask import Blueprint, redirect, url_for, render_template, request, current_app
 from flask_login import current_user
 from app.main.User import User
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin/routes")
 
+
+def bulk_request_ids() -> tuple[list[str] | None, str | None]:
+    """
+    Application ids of a bulk action, from the JSON body ({"app_ids": [...]}) or the
+    checked `app_ids` boxes of the dashboard form. Returns (ids, error message).
+    """
+    if request.is_json:
+        app_ids = (request.get_json(silent=True) or {}).get("app_ids")
+    else:
+        app_ids = request.form.getlist("app_ids")
+    if not isinstance(app_ids, list) or not app_ids:
+        return None, "Select at least one application."
+    app_ids = list(dict.fromkeys(str(app_id).strip() for app_id in app_ids if str(app_id).strip()))
+    max_ids = current_app.config.get('ADMIN_BULK_MAX_APPLICATIONS', 1000)
+    if len(app_ids) > max_ids:
+        return None, f"At most {max_ids} applications can be processed at once."
+    return app_ids, None
+
 from . import Tadmin_routes
 from . import Eadmin_routes
 from . import senior_eadmin_routes
\ No newline at end of file
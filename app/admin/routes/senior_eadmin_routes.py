@@ -1,14 +1,15 @@
 # app/admin/routes/senior_eadmin_routes.py
-from flask import render_template, request, flash, redirect, url_for, current_app
+from flask import render_template, request, flash, redirect, url_for, current_app, jsonify
 from flask_login import login_required, current_user
 from app.admin.models import SeniorEAdmin # 确保导入 SeniorEAdmin
 from app.main.User import User as MainUser # 导入 User.Roles
 from app.extensions import mongo
-from . import admin_bp # 假设你的 admin_bp 在 __init__.py 中定义
+from app.main.IdentityService import IdentityService
+from . import admin_bp, bulk_request_ids # 假设你的 admin_bp 在 __init__.py 中定义
 from app.admin.service.senior_eadmin_service import SeniorEAdminService
 from bson import ObjectId
 # 导入状态常量 (如果它们在 utils.py)
-from ..service.Eadmin_service import PENDING_SEADMIN_APPROVAL, ACTIVE, REJECTED_BY_SEADMIN
+from ..service.Eadmin_service import PENDING_SEADMIN_APPROVAL, ACTIVE, REJECTED_BY_SEADMIN, summarize_bulk_outcomes
 
 senior_eadmin_service = SeniorEAdminService()
 
@@ -20,7 +21,7 @@ def senior_eadmin_dashboard_page():
         return redirect(url_for('main.index')) # 或者合适的跳转
 
     # 从数据库获取最新的 SeniorEAdmin 用户信息，以防 session 中的数据过时
-    user_doc = mongo.db.users.find_one({"_id": ObjectId(current_user.user_id)})
+    user_doc = IdentityService.get_user_doc(current_user.user_id)
     if not user_doc:
         flash("User session error.", "danger")
         return redirect(url_for('auth.logout')) # 或者 'auth.login'
@@ -28,18 +29,31 @@ def senior_eadmin_dashboard_page():
     current_senior_eadmin = SeniorEAdmin(user_doc)
 
     # 获取待 Senior EAdmin 审批的组织列表
-    pending_orgs, error_msg = senior_eadmin_service.get_pending_organizations_for_senior_approval(current_senior_eadmin)
+    cursor = request.args.get('cursor')
+    pending_orgs, next_cursor, error_msg = senior_eadmin_service.get_pending_organizations_for_senior_approval(current_senior_eadmin, cursor)
     if error_msg:
         flash(error_msg, "danger")
 
-    approved_orgs = list(mongo.db.org_register_request.find({"status": ACTIVE, "seadmin_approved_by": current_senior_eadmin.email}))
-    rejected_orgs = list(mongo.db.org_register_request.find({"status": REJECTED_BY_SEADMIN, "seadmin_rejected_by": current_senior_eadmin.email}))
-
+    # The decision histories are paged like the queue, each with its own cursor
+    approved_cursor = request.args.get('approved_cursor')
+    rejected_cursor = request.args.get('rejected_cursor')
+    approved_orgs, next_approved_cursor, approved_error = senior_eadmin_service.get_decided_organizations(current_senior_eadmin, ACTIVE, approved_cursor)
+    rejected_orgs, next_rejected_cursor, rejected_error = senior_eadmin_service.get_decided_organizations(current_senior_eadmin, REJECTED_BY_SEADMIN, rejected_cursor)
+    for history_error in (approved_error, rejected_error):
+        if history_error:
+            flash(history_error, "danger")
 
     return render_template('admin/senior_eadmin_dashboard.html',
                            pending_organizations=pending_orgs,
+                           pending_count=senior_eadmin_service.pending_organization_count(),
+                           cursor=cursor,
+                           next_cursor=next_cursor,
                            approved_organizations=approved_orgs,
+                           approved_cursor=approved_cursor,
+                           next_approved_cursor=next_approved_cursor,
                            rejected_organizations=rejected_orgs,
+                           rejected_cursor=rejected_cursor,
+                           next_rejected_cursor=next_rejected_cursor,
                            current_senior_eadmin=current_senior_eadmin)
 
 @admin_bp.route('/senior-eadmin/approve/<string:request_id>', methods=['POST'])
@@ -49,7 +63,7 @@ def senior_eadmin_approve_organization(request_id):
         flash("Unauthorized action.", "danger")
         return redirect(url_for('admin.senior_eadmin_dashboard_page'))
 
-    user_doc = mongo.db.users.find_one({"_id": ObjectId(current_user.user_id)})
+    user_doc = IdentityService.get_user_doc(current_user.user_id)
     current_senior_eadmin = SeniorEAdmin(user_doc)
 
     success, message = senior_eadmin_service.approve_organization_final(current_senior_eadmin, request_id)
@@ -65,7 +79,7 @@ def senior_eadmin_reject_organization(request_id):
         return redirect(url_for('main.index'))
 
 
-    user_doc = mongo.db.users.find_one({"_id": ObjectId(current_user.user_id)})
+    user_doc = IdentityService.get_user_doc(current_user.user_id)
     current_senior_eadmin = SeniorEAdmin(user_doc)
 
     rejection_reason = request.form.get('rejection_reason')
@@ -78,6 +92,44 @@ def senior_eadmin_reject_organization(request_id):
     flash(message, "success" if success else "danger")
     return redirect(url_for('admin.senior_eadmin_dashboard_page'))
 
+def _bulk_organization_action(action: str):
+    if current_user.role != MainUser.Roles.SENIOR_EADMIN:
+        flash("Unauthorized action.", "danger")
+        return (jsonify({'success': False, 'message': 'Unauthorized action.'}), 403) if request.is_json else redirect(url_for('main.index'))
+
+    user_doc = IdentityService.get_user_doc(current_user.user_id)
+    current_senior_eadmin = SeniorEAdmin(user_doc)
+
+    request_ids, error = bulk_request_ids()
+    rejection_reason = (request.get_json(silent=True) or {}).get('rejection_reason') if request.is_json else request.form.get('rejection_reason')
+    if not error and action == "rejected" and not (rejection_reason or '').strip():
+        error = "Rejection reason is required."
+    if error:
+        if request.is_json:
+            return jsonify({'success': False, 'message': error}), 400
+        flash(error, "warning")
+        return redirect(url_for('admin.senior_eadmin_dashboard_page'))
+
+    if action == "approved":
+        success, outcomes = senior_eadmin_service.approve_organizations_final(current_senior_eadmin, request_ids)
+    else:
+        success, outcomes = senior_eadmin_service.reject_organizations_final(current_senior_eadmin, request_ids, rejection_reason.strip())
+    message = summarize_bulk_outcomes(outcomes, action)
+    if request.is_json:
+        return jsonify({'success': success, 'message': message, 'results': outcomes})
+    flash(message, "success" if success else "danger")
+    return redirect(url_for('admin.senior_eadmin_dashboard_page'))
+
+@admin_bp.route('/senior-eadmin/bulk-approve', methods=['POST'])
+@login_required
+def senior_eadmin_bulk_approve_organizations():
+    return _bulk_organization_action("approved")
+
+@admin_bp.route('/senior-eadmin/bulk-reject', methods=['POST'])
+@login_required
+def senior_eadmin_bulk_reject_organizations():
+    return _bulk_organization_action("rejected")
+
 @admin_bp.route('/senior-eadmin/reject-page/<string:request_id>', methods=['GET'])
 @login_required
 def senior_eadmin_reject_organization_page(request_id):
@@ -0,0 +1,43 @@
+import math
+from app.extensions import run_parallel
+from .Eadmin_service import EAdminService, PENDING_EADMIN_APPROVAL
+
+
+class EAdminDashboardService:
+    """
+    Builds the E-Admin dashboard view model. The application queue, the status counts,
+    the log page, the policy page and the pagination totals are independent reads, so
+    they run concurrently; the totals come from EAdminService.dashboard_totals() instead
+    of exact counts on every view.
+    """
+
+    @classmethod
+    def build_eadmin_dashboard(cls, eadmin_email: str, app_status: str = PENDING_EADMIN_APPROVAL, app_cursor: str | None = None,
+                               log_page: int = 1, policy_page: int = 1, logs_per_page: int = 15, policies_per_page: int = 10) -> dict[str, any]:
+        """Returns the template variables of admin/EAdminDashBoard.html."""
+        eadmin_service = EAdminService()
+        eadmin_service.email = eadmin_email
+        log_page = max(log_page, 1)
+        policy_page = max(policy_page, 1)
+
+        (applications, next_app_cursor), application_counts, (logs, _), (policies, _), totals = run_parallel(
+            lambda: eadmin_service.view_registration_applications(status=app_status, cursor=app_cursor),
+            eadmin_service.registration_application_counts,
+            lambda: eadmin_service.view_user_logs(limit=logs_per_page, page=log_page, with_total=False),
+            lambda: eadmin_service.view_policies(limit=policies_per_page, page=policy_page, with_total=False),
+            EAdminService.dashboard_totals
+        )
+
+        return {
+            "applications": applications or [],
+            "current_app_filter": app_status,
+            "application_counts": application_counts,
+            "app_cursor": app_cursor,
+            "next_app_cursor": next_app_cursor,
+            "logs": logs or [],
+            "current_log_page": log_page,
+            "total_log_pages": max(1, math.ceil(totals["total_logs"] / logs_per_page)),
+            "platform_policies": policies or [],
+            "current_policy_page": policy_page,
+            "total_policy_pages": max(1, math.ceil(totals["total_policies"] / policies_per_page))
+        }
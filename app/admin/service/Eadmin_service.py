@@ -11,6 +11,10 @@ import uuid
 from werkzeug.utils import secure_filename
 import os
 from app.admin.models import EAdmin
+from app.workspace.service.OrganizationService import OrganizationService
+from app.workspace.utils import registration_counters
+from app.cache import TTLCache
+from app.pagination import fetch_page
 
 PENDING_EADMIN_APPROVAL = "pending_eadmin_approval"  # EAdmin 审批后的状态，等待 SEadmin 审批
 PENDING_SEADMIN_APPROVAL = "pending_seadmin_approval" # 新增状态，专指等待SEadmin审批
@@ -19,14 +23,122 @@ REJECTED_BY_EADMIN = "rejected_by_eadmin" # EAdmin 拒绝
 REJECTED_BY_SEADMIN = "rejected_by_seadmin" # SEadmin 拒绝 (新增)
 NOT_SUBMITTED = "not_submitted"
 
+# Fields the approval queues show; the rest of an application is loaded on demand
+APPLICATION_QUEUE_PROJECTION = {
+    "organization_id": 1, "organization_name": 1, "org_name": 1, "email": 1, "status": 1,
+    "submit_time": 1, "submitted_at": 1, "proof_document_path": 1,
+    "approved_by": 1, "approved_at": 1, "eadmin_approved_by": 1, "eadmin_approved_at": 1, "rejection_reason": 1,
+    "seadmin_approved_at": 1, "seadmin_rejected_at": 1
+}
+
+
+def page_registration_applications(status: str, cursor: str | None = None, limit: int | None = None) -> tuple[list[dict], str | None]:
+    """
+    One page of the applications in `status`, oldest submission first, with the queue
+    projection. `cursor` is the next_cursor of the previous page, so every page is one
+    range scan on the (status, submit_time, _id) index however long the queue is.
+    Returns (applications, next_cursor or None on the last page); a malformed cursor
+    starts from the first page.
+    """
+    limit = limit or current_app.config.get('ADMIN_QUEUE_PAGE_SIZE', 25)
+    return fetch_page(mongo.db.org_register_request, {"status": status}, "submit_time", cursor, limit, APPLICATION_QUEUE_PROJECTION)
+
+
+# Per-application outcomes of the bulk approve/reject actions
+BULK_UPDATED = "updated"
+BULK_NOT_FOUND = "not_found"
+BULK_INVALID_ID = "invalid_id"
+BULK_WRONG_STATUS = "wrong_status"
+
+
+def transition_registration_applications(app_ids: list[str], expected_status: str, updates: dict) -> tuple[dict[str, str], list[dict]]:
+    """
+    Moves the given registration applications from expected_status to the fields in
+    `updates` with one conditional update_many, then reads them back once to tell per id
+    whether this call changed it. Applications in another status are left as they are.
+    Returns ({app_id: outcome}, the transitioned application documents).
+    """
+    outcomes = {}
+    object_ids = {}
+    for app_id in dict.fromkeys(app_ids):
+        if ObjectId.is_valid(app_id):
+            object_ids[ObjectId(app_id)] = app_id
+        else:
+            outcomes[app_id] = BULK_INVALID_ID
+    if not object_ids:
+        return outcomes, []
+
+    reg_collection = mongo.db.org_register_request
+    # Marks the documents written by this call, so concurrent actions on the same ids are told apart
+    transition_id = uuid.uuid4().hex
+    reg_collection.update_many(
+        {"_id": {"$in": list(object_ids)}, "status": expected_status},
+        {"$set": {**updates, "transition_id": transition_id}}
+    )
+    transitioned = []
+    application_docs = reg_collection.find(
+        {"_id": {"$in": list(object_ids)}},
+        {"status": 1, "transition_id": 1, "organization_id": 1, "organization_name": 1, "submit_user_id": 1}
+    )
+    for application_doc in application_docs:
+        app_id = object_ids[application_doc["_id"]]
+        if application_doc.get("transition_id") == transition_id:
+            outcomes[app_id] = BULK_UPDATED
+            transitioned.append(application_doc)
+            OrganizationService.invalidate_organization_cache(application_doc.get("organization_id"))
+        else:
+            outcomes[app_id] = BULK_WRONG_STATUS
+    for app_id in object_ids.values():
+        outcomes.setdefault(app_id, BULK_NOT_FOUND)
+    registration_counters.move(expected_status, updates.get("status"), len(transitioned))
+    return outcomes, transitioned
+
+
+def summarize_bulk_outcomes(outcomes: dict[str, str], action: str) -> str:
+    """One flash line for a bulk action, e.g. '3 application(s) approved; 1 not pending.'"""
+    counts = {}
+    for outcome in outcomes.values():
+        counts[outcome] = counts.get(outcome, 0) + 1
+    parts = [f"{counts.get(BULK_UPDATED, 0)} application(s) {action}"]
+    if counts.get(BULK_WRONG_STATUS):
+        parts.append(f"{counts[BULK_WRONG_STATUS]} not in the expected status")
+    if counts.get(BULK_NOT_FOUND):
+        parts.append(f"{counts[BULK_NOT_FOUND]} not found")
+    if counts.get(BULK_INVALID_ID):
+        parts.append(f"{counts[BULK_INVALID_ID]} invalid id(s)")
+    return "; ".join(parts) + "."
+
 class EAdminService:
+    # Log and policy totals for the dashboard pagination, shared by all E-Admins of this worker
+    _totals_cache = TTLCache("eadmin_dashboard_totals", maxsize=1, ttl=30)
+
+    @classmethod
+    def init_app(cls, app):
+        cls._totals_cache.configure(ttl=app.config.get('ADMIN_DASHBOARD_TOTALS_TTL', 30))
+
+    @classmethod
+    def dashboard_totals(cls) -> dict[str, int]:
+        """
+        {"total_logs", "total_policies"}, cached for ADMIN_DASHBOARD_TOTALS_TTL seconds. The
+        log total is the collection's estimated count, which comes from metadata rather than a scan.
+        """
+        totals = cls._totals_cache.get("totals")
+        if totals is None:
+            totals = {
+                "total_logs": mongo.db.activity_log.estimated_document_count(),
+                "total_policies": mongo.db[cls.POLICY_COLLECTION_NAME].count_documents({})
+            }
+            cls._totals_cache.set("totals", totals)
+        return totals
+
     # --- User Log Viewing ---
-    def view_user_logs(self, limit=200, page=1):
+    def view_user_logs(self, limit=200, page=1, with_total=True):
         """
         Retrieves user activity logs from the database.
         Args:
             limit (int): Max number of logs per page.
             page (int): Page number to retrieve.
+            with_total (bool): Also count the logs; without it the total is None.
         Returns:
             tuple: (list of log documents, total number of logs)
         """
@@ -35,7 +147,7 @@ class EAdminService:
             log_collection = mongo.db.activity_log
             skip = (page - 1) * limit
             logs_cursor = log_collection.find().sort("activityTime", -1).skip(skip).limit(limit)
-            total_logs = log_collection.count_documents({}) # For pagination calculation
+            total_logs = log_collection.count_documents({}) if with_total else None # For pagination calculation
             logs = list(logs_cursor)
             #print(logs)
             return logs, total_logs
@@ -49,28 +161,33 @@ class EAdminService:
             return [], 0
 
     # --- Registration Application Management ---
-    def view_registration_applications(self, status="pending_eadmin_approval"):
+    def view_registration_applications(self, status="pending_eadmin_approval", cursor: str | None = None):
         """
-        Retrieves pending (or specified status) O-Convener registration applications.
+        Retrieves one page of pending (or specified status) O-Convener registration applications.
          Args:
             status (str): The status of applications to retrieve.
+            cursor (str): next_cursor of the previous page, None for the first page.
         Returns:
-            list: A list of application documents.
+            tuple: (list of application documents, next_cursor or None)
         """
         try:
-            reg_collection = mongo.db.org_register_request
-            apps_cursor = reg_collection.find({"status": status}).sort("submitted_at", 1)
-            apps_cursor = list(apps_cursor)
-            #print(apps_cursor)
-            return apps_cursor
+            return page_registration_applications(status, cursor)
         except Exception as e:
-            #print(f"Error fetching registration applications by {self.email}: {e}")
+            print(f"Error fetching registration applications by {self.email}: {e}")
             # ActivityRecord(
             #     userAccount=self.email, 
             #     activityName="View Registrations Error", 
             #     details=str(e)
             # ).addRecord()
-            return []
+            return [], None
+
+    def registration_application_counts(self) -> dict[str, int]:
+        """Number of applications per status, from the maintained counters."""
+        try:
+            return registration_counters.counts()
+        except Exception as e:
+            print(f"Error reading registration application counts: {e}")
+            return {}
 
     def approveRegistrationApplication(self, app_id: str) -> tuple[bool, str]:
         """
@@ -100,6 +217,8 @@ class EAdminService:
         )
         if update_result.matched_count == 0:
             return False, f"Could not approve application {app_id} as its status was not 'pending_eadmin_approval'."
+        OrganizationService.invalidate_organization_cache(application_doc.get("organization_id"))
+        registration_counters.move(PENDING_EADMIN_APPROVAL, PENDING_SEADMIN_APPROVAL)
         return True, f"Application {app_id} approved successfully."
 
     def rejectRegistrationApplication(self, app_id: str, reason: str = "No reason provided.") -> tuple[bool, str]:
@@ -118,7 +237,7 @@ class EAdminService:
         if application.get('status') != 'pending_eadmin_approval':
             return False, f"Application is not pending E-Admin approval (status: {application.get('status')})."
         update_result = reg_collection.update_one(
-            {"_id": app_object_id},
+            {"_id": app_object_id, "status": PENDING_EADMIN_APPROVAL},
             {"$set": {
                 "status": "rejected",
                 "rejected_by": self.email,
@@ -127,10 +246,39 @@ class EAdminService:
             }}
         )
         if update_result.modified_count > 0:
+            OrganizationService.invalidate_organization_cache(application.get("organization_id"))
+            registration_counters.move(PENDING_EADMIN_APPROVAL, "rejected")
             return True, f"Application {app_id} rejected."
         else:
             return False, "Application status could not be updated (already processed or DB error)."
 
+    def approveRegistrationApplications(self, app_ids: list[str]) -> tuple[bool, dict[str, str]]:
+        """
+        Bulk version of approveRegistrationApplication: one conditional update for all ids.
+        Returns (any approved, {app_id: outcome}).
+        """
+        print(f"E-Admin {self.email} approving {len(app_ids)} application(s) in bulk")
+        outcomes, approved = transition_registration_applications(app_ids, PENDING_EADMIN_APPROVAL, {
+            "status": PENDING_SEADMIN_APPROVAL,
+            "approved_by": self.email,
+            "approved_at": datetime.now(timezone.utc)
+        })
+        return bool(approved), outcomes
+
+    def rejectRegistrationApplications(self, app_ids: list[str], reason: str = "No reason provided.") -> tuple[bool, dict[str, str]]:
+        """
+        Bulk version of rejectRegistrationApplication, with the same reason for every id.
+        Returns (any rejected, {app_id: outcome}).
+        """
+        print(f"E-Admin {self.email} rejecting {len(app_ids)} application(s) in bulk")
+        outcomes, rejected = transition_registration_applications(app_ids, PENDING_EADMIN_APPROVAL, {
+            "status": "rejected",
+            "rejected_by": self.email,
+            "rejected_at": datetime.now(timezone.utc),
+            "rejection_reason": reason
+        })
+        return bool(rejected), outcomes
+
     # --- Policy Management (Method Stubs - Require Implementation) ---
     POLICY_COLLECTION_NAME = "platform_policies"
     ALLOWED_POLICY_EXTENSIONS = {'pdf'}
@@ -141,13 +289,12 @@ class EAdminService:
     def _allowed_policy_file(self, filename):
         return '.' in filename and \
                 filename.rsplit('.', 1)[1].lower() in self.ALLOWED_POLICY_EXTENSIONS
-    def view_policies(self, limit=50, page = 1):
+    def view_policies(self, limit=50, page = 1, with_total=True):
         try:
             policy_collection = self._get_policy_collection()
-            print(policy_collection)
             skip = (page - 1) * limit
-            policies = policy_collection.find().sort("upload_timestamp", -1).skip(skip).limit(limit)
-            total_policies = policy_collection.count_documents({})
+            policies = policy_collection.find().sort("created_at", -1).skip(skip).limit(limit)
+            total_policies = policy_collection.count_documents({}) if with_total else None
             policies = list(policies)
             # ActivityRecord(
             #     userAccount=self.email,
@@ -198,6 +345,7 @@ class EAdminService:
                 "last_updated_by": self.email
             }
             result = policy_collection.insert_one(policy_data)
+            self._totals_cache.clear()
             message = f"Policy '{title}' added successfully with ID: {result.inserted_id}."
             return True, message
         except Exception as e:
@@ -340,6 +488,7 @@ class EAdminService:
         try:
             result = policy_collection.delete_one({"_id": p_object_id})
             if result.deleted_count > 0:
+                self._totals_cache.clear()
                 if filepath_to_delete and os.path.exists(filepath_to_delete):
                     try:
                         os.remove(filepath_to_delete)
@@ -1,24 +1,25 @@
 from bson import ObjectId
 from ..models import UserQuestion, TAdmin
+from app.main.help import Help
+from app.main.IdentityService import IdentityService
 from app.models.ActivityRecord import ActivityRecord
 from app.extensions import mongo
 from app.main.User import User 
 from datetime import datetime, UTC
 
 class TAdminService:
-    def view_help_requests(self, admin: TAdmin, status: str = UserQuestion.PENDING, limit: int = 100) -> tuple[list | None, str | None]:
+    def view_help_requests(self, admin: TAdmin, status: str = UserQuestion.PENDING, cursor: str | None = None,
+                           search: str | None = None) -> tuple[list[Help] | None, str | None, str | None]:
         """
-        Retrieves a list of user-submitted help requests, filtered by status.
-        (admin is an instance of TAdmin model from app.models)
+        Retrieves one page of user-submitted help requests, filtered by status, or the
+        requests matching `search` in their question or answer.
+        Returns (requests, next page cursor or None, error message or None).
         """
         try:
-            questions = UserQuestion.find_by_status(status, limit=limit)
-            # ActivityRecord(
-            #     userAccount=admin.email,
-            #     activityName="Viewed Help Requests",
-            #     details=f"Status: {status}, Limit: {limit}"
-            # ).addRecord()
-            return questions, None
+            if search and search.strip():
+                return Help.search(search.strip(), status=status), None, None
+            questions, next_cursor = Help.get_questions(status=status, cursor=cursor)
+            return questions, next_cursor, None
         except Exception as e:
             error_msg = f"Error viewing help requests by {admin.email}: {e}"
             # ActivityRecord(
@@ -26,7 +27,11 @@ class TAdminService:
             #     activityName="View Help Requests Error",
             #     details=str(e)
             # ).addRecord()
-            return None, error_msg
+            return None, None, error_msg
+
+    def pending_help_request_count(self) -> int:
+        """Number of unanswered help requests, from the maintained status counters."""
+        return Help.pending_count()
 
     def answer_help_request(self, admin: TAdmin, question_id_str: str, answer_content: str) -> tuple[bool, str]:
         """
@@ -36,25 +41,8 @@ class TAdminService:
         if not question_id_str or not answer_content or not answer_content.strip():
             return False, "Question ID and non-empty answer content are required."
         try:
-            question = UserQuestion.find_by_id(question_id_str)
-            if not question:
-                return False, f"Help Request with ID {question_id_str} not found."
-            if question.status != UserQuestion.PENDING:
-                return False, f"Help Request {question_id_str} is not pending (status: {question.status}). Cannot answer."
-            
-            # Assumes UserQuestion model (from models.py) has an instance method solveQuestion
-            success = question.solveQuestion(answer=answer_content.strip(), answered_by=admin.email)
-            if success:
-                return True, f"Successfully answered question {question_id_str}."
-            else:
-                # ActivityRecord(
-                #     userAccount=admin.email,
-                #     activityName="Answer Help Request Failed",
-                #     details=f"QID: {question_id_str} - solveQuestion method returned false."
-                # ).addRecord()
-                return False, f"Failed to update answer for question {question_id_str} (solveQuestion failed)."
+            return Help.answer_question(question_id_str, answer_content, admin.email)
         except Exception as e:
-            error_msg = f"Error answering question {question_id_str} by {admin.email}: {e}"
             # ActivityRecord(
             #     userAccount=admin.email,
             #     activityName="Answer Help Request Error",
@@ -192,6 +180,8 @@ class TAdminService:
                 {"$set": mongo_update_payload}
             )
             if result.modified_count > 0:
+                # Cached identities would keep the old role/email until their TTL runs out
+                IdentityService.invalidate(target_id, email=eadmin_to_edit.email)
                 # ActivityRecord(...)
                 return True, f"Admin user {eadmin_user_id} updated successfully."
             else:
@@ -220,6 +210,7 @@ class TAdminService:
             target_id = ObjectId(user_to_delete.user_id) if isinstance(user_to_delete.user_id, str) else user_to_delete.user_id
             result = mongo.db.users.delete_one({"_id": target_id})
             if result.deleted_count > 0:
+                IdentityService.invalidate(target_id, email=user_to_delete.email)
                 role_name = user_to_delete.role.name
                 msg = f"{role_name} {user_to_delete.email} (ID: {admin_user_id_to_delete}) deleted successfully."
                 # ActivityRecord(...)
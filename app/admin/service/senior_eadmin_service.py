@@ -1,32 +1,66 @@
 # app/admin/service/senior_eadmin_service.py
 from flask import current_app
 from bson import ObjectId
+from pymongo import UpdateOne
 from datetime import datetime, timezone
 from app.extensions import mongo
 from app.main.User import User # EAdmin 角色定义
 from app.admin.models import SeniorEAdmin # SeniorEAdmin 模型
+from app.workspace.service.OrganizationService import OrganizationService
+from app.workspace.utils import registration_counters
 # 导入状态常量
-from .Eadmin_service import PENDING_SEADMIN_APPROVAL, ACTIVE, REJECTED_BY_SEADMIN, PENDING_EADMIN_APPROVAL
+from app.pagination import fetch_page
+from .Eadmin_service import PENDING_SEADMIN_APPROVAL, ACTIVE, REJECTED_BY_SEADMIN, PENDING_EADMIN_APPROVAL, APPLICATION_QUEUE_PROJECTION, transition_registration_applications, page_registration_applications
 
 class SeniorEAdminService:
 
-    def get_pending_organizations_for_senior_approval(self, senior_eadmin: SeniorEAdmin):
+    def get_pending_organizations_for_senior_approval(self, senior_eadmin: SeniorEAdmin, cursor: str | None = None):
         """
-        获取等待 Senior EAdmin 审批的组织列表。
+        获取等待 Senior EAdmin 审批的组织列表（一页）。
         这些组织是已经被 EAdmin 批准过的。
+        Returns (organizations, next_cursor, error message).
         """
         if not senior_eadmin or senior_eadmin.role != User.Roles.SENIOR_EADMIN:
             current_app.logger.warning("Unauthorized attempt to view pending SEAdmin approvals.")
-            return [], "Unauthorized"
+            return [], None, "Unauthorized"
 
         try:
-            org_requests_collection = mongo.db.org_register_request
             # 查询状态为 "pending_seadmin_approval" 的申请
-            pending_organizations = list(org_requests_collection.find({"status": PENDING_SEADMIN_APPROVAL}).sort("submit_time", 1))
-            return pending_organizations, None
+            pending_organizations, next_cursor = page_registration_applications(PENDING_SEADMIN_APPROVAL, cursor)
+            return pending_organizations, next_cursor, None
         except Exception as e:
             current_app.logger.error(f"Error fetching organizations pending SEAdmin approval: {e}")
-            return [], "Database error while fetching requests."
+            return [], None, "Database error while fetching requests."
+
+    def get_decided_organizations(self, senior_eadmin: SeniorEAdmin, status: str, cursor: str | None = None):
+        """
+        One page of the organizations this Senior EAdmin approved (status ACTIVE) or
+        rejected (REJECTED_BY_SEADMIN), most recent decision first.
+        Returns (organizations, next_cursor, error message).
+        """
+        decided_by, decided_at = {
+            ACTIVE: ("seadmin_approved_by", "seadmin_approved_at"),
+            REJECTED_BY_SEADMIN: ("seadmin_rejected_by", "seadmin_rejected_at")
+        }[status]
+        try:
+            organizations, next_cursor = fetch_page(
+                mongo.db.org_register_request,
+                {"status": status, decided_by: senior_eadmin.email},
+                decided_at, cursor, current_app.config.get('ADMIN_QUEUE_PAGE_SIZE', 25),
+                APPLICATION_QUEUE_PROJECTION, descending=True
+            )
+            return organizations, next_cursor, None
+        except Exception as e:
+            current_app.logger.error(f"Error fetching organizations decided by {senior_eadmin.email}: {e}")
+            return [], None, "Database error while fetching your decisions."
+
+    def pending_organization_count(self) -> int:
+        """Size of the Senior EAdmin queue, from the maintained counters."""
+        try:
+            return registration_counters.counts().get(PENDING_SEADMIN_APPROVAL, 0)
+        except Exception as e:
+            current_app.logger.error(f"Error reading the pending organization count: {e}")
+            return 0
 
     def approve_organization_final(self, senior_eadmin: SeniorEAdmin, request_id_str: str) -> tuple[bool, str]:
         """
@@ -49,7 +83,7 @@ class SeniorEAdminService:
         try:
             # 1. 更新 org_register_request 状态为 active
             update_result_request = org_requests_collection.update_one(
-                {"_id": request_id},
+                {"_id": request_id, "status": PENDING_SEADMIN_APPROVAL},
                 {
                     "$set": {
                         "status": ACTIVE, # 最终批准状态
@@ -63,6 +97,8 @@ class SeniorEAdminService:
             if update_result_request.modified_count == 0:
                 # 可能在检查和更新之间状态被改变了
                 return False, "Failed to update organization request status. It might have been processed already."
+            OrganizationService.invalidate_organization_cache(org_request.get("organization_id"))
+            registration_counters.move(PENDING_SEADMIN_APPROVAL, ACTIVE)
 
             # 2. 更新 organizations 集合中的记录 (如果你的 EAdmin 审批步骤会创建或更新这个集合)
             #    如果 EAdmin 审批时只更新了 org_register_request，那么这一步需要确保 organizations 集合也同步
@@ -129,7 +165,7 @@ class SeniorEAdminService:
 
         try:
             update_result = org_requests_collection.update_one(
-                {"_id": request_id},
+                {"_id": request_id, "status": PENDING_SEADMIN_APPROVAL},
                 {
                     "$set": {
                         "status": REJECTED_BY_SEADMIN, # SEadmin 拒绝状态
@@ -143,6 +179,8 @@ class SeniorEAdminService:
 
             if update_result.modified_count == 0:
                 return False, "Failed to update organization request status for rejection."
+            OrganizationService.invalidate_organization_cache(org_request.get("organization_id"))
+            registration_counters.move(PENDING_SEADMIN_APPROVAL, REJECTED_BY_SEADMIN)
 
             # (可选) 更新 organizations 集合中的状态为 REJECTED_BY_SEADMIN
             organizations_collection = mongo.db.organizations
@@ -160,4 +198,66 @@ class SeniorEAdminService:
 
         except Exception as e:
             current_app.logger.error(f"Error during final rejection of org request {request_id_str} by SEAdmin {senior_eadmin.email}: {e}")
-            return False, "A database error occurred during final rejection."
\ No newline at end of file
+            return False, "A database error occurred during final rejection."
+
+    def approve_organizations_final(self, senior_eadmin: SeniorEAdmin, request_ids: list[str]) -> tuple[bool, dict[str, str]]:
+        """
+        Bulk final approval: one conditional update of the requests and one bulk write of
+        the matching organizations records. Returns (any approved, {request_id: outcome}).
+        """
+        if not senior_eadmin or senior_eadmin.role != User.Roles.SENIOR_EADMIN:
+            return False, {}
+
+        now_utc = datetime.now(timezone.utc)
+        outcomes, approved = transition_registration_applications(request_ids, PENDING_SEADMIN_APPROVAL, {
+            "status": ACTIVE,
+            "seadmin_approved_by": senior_eadmin.email,
+            "seadmin_approved_at": now_utc,
+            "last_updated_at": now_utc
+        })
+        organization_updates = [
+            UpdateOne(
+                {"organization_id": org_request["organization_id"]},
+                {
+                    "$set": {"status": ACTIVE, "name": org_request.get("organization_name"), "last_updated_at": now_utc},
+                    "$setOnInsert": {
+                        "organization_id": org_request["organization_id"],
+                        "created_oconvener": org_request.get("submit_user_id"),
+                        "created_at": now_utc
+                    }
+                },
+                upsert=True
+            )
+            for org_request in approved if org_request.get("organization_id")
+        ]
+        if organization_updates:
+            try:
+                mongo.db.organizations.bulk_write(organization_updates, ordered=False)
+            except Exception as e:
+                current_app.logger.error(f"Error updating organization records after bulk approval by SEAdmin {senior_eadmin.email}: {e}")
+
+        current_app.logger.info(f"{len(approved)} of {len(request_ids)} organization request(s) approved in bulk by Senior EAdmin {senior_eadmin.email}")
+        return bool(approved), outcomes
+
+    def reject_organizations_final(self, senior_eadmin: SeniorEAdmin, request_ids: list[str], rejection_reason: str) -> tuple[bool, dict[str, str]]:
+        """Bulk final rejection with one reason for all requests. Returns (any rejected, {request_id: outcome})."""
+        if not senior_eadmin or senior_eadmin.role != User.Roles.SENIOR_EADMIN:
+            return False, {}
+
+        now_utc = datetime.now(timezone.utc)
+        outcomes, rejected = transition_registration_applications(request_ids, PENDING_SEADMIN_APPROVAL, {
+            "status": REJECTED_BY_SEADMIN,
+            "rejection_reason": rejection_reason,
+            "seadmin_rejected_by": senior_eadmin.email,
+            "seadmin_rejected_at": now_utc,
+            "last_updated_at": now_utc
+        })
+        organization_ids = [org_request["organization_id"] for org_request in rejected if org_request.get("organization_id")]
+        if organization_ids:
+            mongo.db.organizations.update_many(
+                {"organization_id": {"$in": organization_ids}},
+                {"$set": {"status": REJECTED_BY_SEADMIN, "last_updated_at": now_utc}}
+            )
+
+        current_app.logger.info(f"{len(rejected)} of {len(request_ids)} organization request(s) rejected in bulk by Senior EAdmin {senior_eadmin.email}")
+        return bool(rejected), outcomes
@@ -1,10 +1,14 @@
 import random
 import string
 import re
-from datetime import datetime, timedelta, timezone
+from datetime import timedelta
 from flask_mail import Message
 from flask import current_app
-from app.extensions import mail, get_db
+from app.mail_queue import mail_queue
+from app.code_store import CodeStore
+
+# Login and organization setup codes; the OTP collection has a TTL index on expire_at
+otp_codes = CodeStore('OTP', code_field='otp', expiry_field='expire_at')
 
 
 # Check if a given string is a valid Email address
@@ -17,7 +21,7 @@ def generate_otp(length=6):
 	return ''.join(random.choices(string.digits, k=length))
 
 
-# Send OTP Email
+# Queue OTP Email; the background sender delivers it
 def send_otp_email(to_email, otp_code):
 	subject = "E-DBA Login Code"
 	body = (f"Your login verification code is: {otp_code}\n"
@@ -27,39 +31,21 @@ def send_otp_email(to_email, otp_code):
 	              sender=current_app.config['MAIL_USERNAME'],
 	              recipients=[to_email],
 	              body=body)
-	mail.send(msg)
+	mail_queue.enqueue(msg, category='otp')
 
 	return True
 
 
 # Save OTP info to database
 def store_otp(email, otp_code):
-	db = get_db()
-	expire_time = datetime.now(timezone.utc) + timedelta(minutes=5)
-	db.OTP.update_one(
-		{'email': email},
-		{'$set': {
-			'otp': otp_code,
-			'expire_at': expire_time
-		}},
-		upsert=True
-	)
+	otp_codes.issue(email, otp_code, timedelta(minutes=5))
 
 
-# Verify OTP validity
-def verify_otp(email, submitted_otp):
-	db = get_db()
-	record = db.OTP.find_one({'email': email})
-	if not record:
-		return False
-	if record['otp'] != submitted_otp:
-		return False
-	if datetime.utcnow() > record['expire_at']:
-		return False
-	return True
+# Verify OTP validity. The code is used up unless consume is False (the caller then calls clear_otp)
+def verify_otp(email, submitted_otp, consume=True):
+	return otp_codes.verify(email, submitted_otp, consume=consume) is not None
 
 
 # Clean used OTP
 def clear_otp(email):
-	db = get_db()
-	db.OTP.delete_one({'email': email})
\ No newline at end of file
+	otp_codes.discard(email)
\ No newline at end of file
@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+from .metrics import CACHE_REQUESTS
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Size-bounded, thread-safe in-process cache whose entries expire `ttl` seconds after
+    they were stored. The least recently used entry is evicted when the cache is full.
+    Each worker process has its own copy, so keep the TTL short for data other workers
+    may change. Lookups are counted in cache_requests_total{cache=name}.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 30.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, maxsize: int | None = None, ttl: float | None = None):
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if ttl is not None:
+                self.ttl = ttl
+            self._entries.clear()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > now:
+                self._entries.move_to_end(key)
+                value = entry[1]
+            else:
+                if entry is not _MISSING:
+                    del self._entries[key]
+                value = _MISSING
+        CACHE_REQUESTS.inc(cache=self.name, result="miss" if value is _MISSING else "hit")
+        return default if value is _MISSING else value
+
+    def set(self, key, value):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_where(self, predicate) -> int:
+        """Drops every entry whose value matches predicate(value); returns how many were dropped."""
+        with self._lock:
+            keys = [key for key, (_, value) in self._entries.items() if predicate(value)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from .extensions import mongo
+
+
+class CodeStore:
+    """
+    Short-lived verification codes, one per email, in a MongoDB collection with a TTL index
+    on the expiry field (declared in app/indexes.py), so expired codes are removed by the
+    server. A code is consumed atomically with find_one_and_delete, which makes it
+    single-use even when several workers verify at once. Every wrong guess increments the
+    code's attempt counter; after CODE_MAX_ATTEMPTS the code stops matching and the user
+    has to request a new one.
+    """
+
+    def __init__(self, collection_name: str, code_field: str, expiry_field: str):
+        self.collection_name = collection_name
+        self.code_field = code_field
+        self.expiry_field = expiry_field
+
+    @property
+    def collection(self):
+        return mongo.db[self.collection_name]
+
+    @staticmethod
+    def _max_attempts() -> int:
+        return current_app.config.get('CODE_MAX_ATTEMPTS', 5)
+
+    def issue(self, email: str, code: str, lifetime: timedelta, **extra) -> datetime:
+        """Stores a new code for the email, replacing any previous one. Returns its expiry time."""
+        now_utc = datetime.now(timezone.utc)
+        expires_at = now_utc + lifetime
+        self.collection.update_one(
+            {"email": email.lower()},
+            {"$set": {
+                self.code_field: code,
+                self.expiry_field: expires_at,
+                "created_at": now_utc,
+                "attempts": 0,
+                **extra
+            }},
+            upsert=True
+        )
+        return expires_at
+
+    def _valid_code_query(self, email: str, code: str) -> dict:
+        return {
+            "email": email.lower(),
+            self.code_field: code,
+            self.expiry_field: {"$gt": datetime.now(timezone.utc)},
+            # Codes stored before attempts were counted have no counter yet
+            "attempts": {"$not": {"$gte": self._max_attempts()}}
+        }
+
+    def _count_failed_attempt(self, email: str):
+        self.collection.update_one({"email": email.lower()}, {"$inc": {"attempts": 1}})
+
+    def verify(self, email: str, code: str, consume: bool = True) -> dict | None:
+        """
+        Returns the code document when the code is valid, else None. With consume=True the
+        code is deleted in the same operation, so it can only be used once.
+        """
+        if not email or not code:
+            return None
+        query = self._valid_code_query(email, code)
+        record = self.collection.find_one_and_delete(query) if consume else self.collection.find_one(query)
+        if record is None:
+            self._count_failed_attempt(email)
+        return record
+
+    def discard(self, email: str):
+        self.collection.delete_one({"email": email.lower()})
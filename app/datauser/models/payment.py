@@ -1,15 +1,35 @@
 from datetime import datetime
 from ...extensions import mongo
+from ...payment.BankAccount import BankAccount
+from ...payment.Ledger import Ledger, EXTERNAL_ACCOUNT, TRANSFER_OK, TRANSFER_REPLAYED, TRANSFER_ACCOUNT_NOT_FOUND
 
 class PaymentRecord:
     @staticmethod
-    def create(student_id, org_id, amount, pay_type, detail=None):
+    def create(student_id, org_id, amount, pay_type, detail=None, idempotency_key=None):
+        # Charge the organization's bank account through the ledger, then keep the record
+        # with the outcome so unpaid usage can be followed up.
+        result, entry = TRANSFER_ACCOUNT_NOT_FOUND, None
+        org_account = mongo.db.BANK_ACCOUNT.find_one({'organization_id': org_id}, {'_id': 1})
+        if org_account:
+            edba_account = BankAccount.get_edba_account()
+            result, entry = Ledger.transfer(
+                org_account['_id'],
+                edba_account._id if edba_account else EXTERNAL_ACCOUNT,
+                amount,
+                pay_type,
+                idempotency_key=f"payment:{idempotency_key}" if idempotency_key else None,
+                reference={'student_id': student_id, 'org_id': org_id, 'detail': detail}
+            )
+
         record = {
             'student_id': student_id,
             'org_id': org_id,
             'amount': amount,
             'pay_type': pay_type,  # 'download', 'record', 'identify'
             'detail': detail,
+            'status': 'paid' if result in (TRANSFER_OK, TRANSFER_REPLAYED) else 'unpaid',
+            'ledger_result': result,
+            'ledger_entry_id': entry['_id'] if entry else None,
             'created_at': datetime.utcnow()
         }
-        return mongo.db.payment_records.insert_one(record) 
\ No newline at end of file
+        return mongo.db.payment_records.insert_one(record) 
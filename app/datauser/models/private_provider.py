@@ -6,6 +6,7 @@ from ..models.service_config import ServiceConfig
 from ..models.course_info import CourseInfo
 from app.main.User import User
 import requests
+from app.instrumentation import http_timer
 from datetime import datetime, timezone
 import uuid
 
@@ -158,7 +159,8 @@ class PrivateDataProvider(User):
             config = config_entry["config"]
             url = f"{config['base_url'].rstrip('/')}/{config['path'].lstrip('/')}"
             method = config["method"].upper()
-            response = requests.request(method, url, json=test_input, timeout=3)
+            with http_timer():
+                response = requests.request(method, url, json=test_input, timeout=3)
             return {
                 "status": "success" if response.status_code < 400 else "failed",
                 "response": response.json()
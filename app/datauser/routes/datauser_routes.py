@@ -1,15 +1,20 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from flask import current_app as app
 from ..models.private_provider import PrivateDataProvider
 from ..models.service_config import ServiceConfig
 from ..models.course_info import CourseInfo
-from ..services.NotificationService import NotificationService
+from ..services.NotificationService import NotificationService, NOTIFICATION_PAGE_SIZE
+from ..services.NotificationBroker import notification_broker
 from flask import render_template
 from flask import g # Import g (was also 'request' earlier)
 from app.main.User import User # Ensure User is correctly imported if needed elsewhere
 from ...extensions import mongo
+from ...main.IdentityService import IdentityService
 from bson import ObjectId
 from datetime import datetime, timezone
+import json
+import queue
+import time
 
 datauser_bp = Blueprint("datauser", __name__, url_prefix="/api/datauser")
 
@@ -35,7 +40,7 @@ def set_g_user_for_datauser():
         g.user = None
         return # Allow the request to proceed; view functions can handle missing user
 
-    user_doc = mongo.db.users.find_one({"email": user_email})
+    user_doc = IdentityService.get_user_doc_by_email(user_email)
     print("🔍 User found (before_request):", user_doc)
     
     if user_doc:
@@ -169,19 +174,103 @@ def test_service(service_name):
 @datauser_bp.route("/notifications", methods=["GET"])
 def get_notifications():
     user_email = request.headers.get("X-User-Email") 
-    user_doc = mongo.db.users.find_one({"email": user_email})
+    user_doc = IdentityService.get_user_doc_by_email(user_email)
     if not user_doc:
         return jsonify({"error": "USER_NOT_FOUND"}), 404
     organization_name = str(user_doc["organization_name"])
-    notifications = NotificationService.get_user_notifications(organization_name)
-    return jsonify(notifications)
+    try:
+        limit = int(request.args.get("limit", NOTIFICATION_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "INVALID_LIMIT"}), 400
+    success, result = NotificationService.get_user_notifications(organization_name, request.args.get("cursor"), limit)
+    if not success:
+        return jsonify({"error": result}), 400
+    return jsonify(result)
+
+@datauser_bp.route("/notifications/unread-count", methods=["GET"])
+def get_unread_notification_count():
+    user_email = request.headers.get("X-User-Email")
+    user_doc = IdentityService.get_user_doc_by_email(user_email)
+    if not user_doc:
+        return jsonify({"error": "USER_NOT_FOUND"}), 404
+    return jsonify({"unread": NotificationService.unread_count(str(user_doc.get("organization_name")))})
+
+def _sse_event(notification: dict) -> str:
+    return f"id: {notification['_id']}\nevent: notification\ndata: {json.dumps(notification, default=str)}\n\n"
+
+@datauser_bp.route("/notifications/stream", methods=["GET"])
+def stream_notifications():
+    """
+    Server-sent events with the organization's new notifications. The connection ends after
+    NOTIFICATION_STREAM_MAX_SECONDS; EventSource then reconnects with Last-Event-ID and
+    receives what it missed.
+    """
+    # EventSource cannot send custom headers, so the email may come as a query parameter
+    user_email = request.headers.get("X-User-Email") or request.args.get("email")
+    user_doc = IdentityService.get_user_doc_by_email(user_email)
+    if not user_doc:
+        return jsonify({"error": "USER_NOT_FOUND"}), 404
+    organization_name = str(user_doc["organization_name"])
+    heartbeat = app.config.get('NOTIFICATION_STREAM_HEARTBEAT', 15)
+    max_seconds = app.config.get('NOTIFICATION_STREAM_MAX_SECONDS', 300)
+
+    # Subscribe before reading the backlog so nothing falls in between
+    subscriber = notification_broker.subscribe(organization_name)
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        missed = NotificationService.get_notifications_after(organization_name, last_event_id) if last_event_id else []
+    except Exception:
+        notification_broker.unsubscribe(organization_name, subscriber)
+        raise
+
+    replayed_ids = {notification["_id"] for notification in missed}
+
+    def events():
+        try:
+            yield "retry: 5000\n\n"
+            for notification in missed:
+                yield _sse_event(notification)
+            deadline = time.monotonic() + max_seconds
+            while time.monotonic() < deadline:
+                try:
+                    notification = subscriber.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if notification["_id"] not in replayed_ids:
+                    yield _sse_event(notification)
+        finally:
+            notification_broker.unsubscribe(organization_name, subscriber)
+
+    return Response(events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @datauser_bp.route("/notifications/mark-read/<notification_id>", methods=["POST"])
 def mark_notification_read(notification_id):
     user_email = request.headers.get("X-User-Email")
-    user_doc = mongo.db.users.find_one({"email": user_email})
+    user_doc = IdentityService.get_user_doc_by_email(user_email)
+    if not user_doc:
+        return jsonify({"error": "USER_NOT_FOUND"}), 404
+    success, msg = NotificationService.mark_as_read(notification_id, str(user_doc.get("organization_name")))
+    return jsonify({"success": success, "message": msg}), (200 if success else 400)
+
+@datauser_bp.route("/notifications/mark-read", methods=["POST"])
+def mark_notifications_read():
+    """Body: {"ids": [...]} or {"before": "<ISO timestamp>"} to mark everything up to that time."""
+    user_email = request.headers.get("X-User-Email")
+    user_doc = IdentityService.get_user_doc_by_email(user_email)
     if not user_doc:
         return jsonify({"error": "USER_NOT_FOUND"}), 404
-    user_id = str(user_doc["_id"])
-    success, msg = NotificationService.mark_as_read(notification_id)
-    return jsonify({"success": success, "message": msg}), (200 if success else 400)
\ No newline at end of file
+    data = request.get_json(silent=True) or {}
+    before = None
+    if data.get("before"):
+        try:
+            before = datetime.fromisoformat(data["before"].replace("Z", "+00:00"))
+        except (AttributeError, ValueError):
+            return jsonify({"success": False, "message": "Invalid 'before' timestamp."}), 400
+    ids = data.get("ids")
+    if ids is not None and not isinstance(ids, list):
+        return jsonify({"success": False, "message": "'ids' must be a list."}), 400
+    success, result = NotificationService.mark_many_as_read(str(user_doc.get("organization_name")), ids, before)
+    if not success:
+        return jsonify({"success": False, "message": result}), 400
+    return jsonify({"success": True, "marked": result, "message": f"{result} notification(s) marked as read."})
\ No newline at end of file
@@ -4,7 +4,11 @@ from ..models.service_config import ServiceConfig
 from ..services.interface_dispatcher import dispatch_service_request
 from ..models.public_consumer import PublicDataConsumer
 from ..models.private_consumer import PrivateDataConsumer
+from ..services.payment_service import charge_thesis_purchase
+from ..services.QuotaService import QuotaService, QUOTA_EXCEEDED
+from ...payment.Ledger import TRANSFER_OK, TRANSFER_REPLAYED, TRANSFER_INSUFFICIENT_FUNDS
 from ...extensions import mongo, get_db
+from ...main.IdentityService import IdentityService
 from datetime import datetime, timezone
 import requests
 import os
@@ -68,12 +72,7 @@ def check_quota():
     if not email:
         return jsonify({"error": "MISSING_EMAIL"}), 400
 
-    record = mongo.db.USER_QUOTA.find_one({"user_email": email}) or {}
-    return jsonify({
-        "used_today": record.get("used_today", 0),
-        "max_daily": record.get("max_daily", 5),
-        "last_used": record.get("last_used")
-    })
+    return jsonify(QuotaService.usage(email))
 
 # 4. Check Account Balance
 @consumer_bp.route("/bank/balance", methods=["POST"])
@@ -118,11 +117,10 @@ def download_thesis():
     if not all([title, email, password]):
         return jsonify({"error": "MISSING_FIELDS"}), 400
 
-    quota = mongo.db.USER_QUOTA.find_one({"user_email": email}) or {}
-    used = quota.get("used_today", 0)
-    max_daily = quota.get("max_daily", 5)
-    if used >= max_daily:
-        return jsonify({"error": "QUOTA_EXCEEDED", "used": used, "max": max_daily}), 403
+    # Users this worker already saw run out are refused without a database round-trip
+    if QuotaService.is_exhausted(email):
+        max_daily = QuotaService.max_daily(email)
+        return jsonify({"error": "QUOTA_EXCEEDED", "used": max_daily, "max": max_daily}), 403
 
     thesis = mongo.db.THESIS.find_one({"title": {"$regex": title, "$options": "i"}})
     if not thesis:
@@ -136,7 +134,7 @@ def download_thesis():
         return jsonify({"error": "PDF_NOT_AVAILABLE"}), 404
     pdf_path = file_entry["pdf_path"]
 
-    user_doc = mongo.db.users.find_one({"email": email})
+    user_doc = IdentityService.get_user_doc_by_email(email)
     if not user_doc:
         return jsonify({"error": "USER_NOT_FOUND"}), 404
     org_id = user_doc.get("organization_id")
@@ -149,27 +147,34 @@ def download_thesis():
     if not account:
         return jsonify({"error": "BANK_AUTH_FAILED"}), 403
 
-    if account.get("balance", 0) < price:
-        return jsonify({"error": "INSUFFICIENT_FUNDS"}), 402
-
-    mongo.db.BANK_ACCOUNT.update_one(
-        {"_id": account["_id"]},
-        {"$inc": {"balance": -price}}
-    )
-
-    mongo.db.THESIS_PURCHASE.insert_one({
-        "user_email": email,
-        "thesis_id": thesis_id,
-        "title": title,
-        "price": price,
-        "time": datetime.now(timezone.utc)
-    })
-
-    mongo.db.USER_QUOTA.update_one(
-        {"user_email": email},
-        {"$inc": {"used_today": 1}, "$set": {"last_used": datetime.now(timezone.utc)}},
-        upsert=True
-    )
+    # Atomic check-and-increment of today's quota; given back if the purchase does not go through
+    quota_status, quota = QuotaService.consume(email)
+    if quota_status == QUOTA_EXCEEDED:
+        return jsonify({"error": "QUOTA_EXCEEDED", "used": quota["max"], "max": quota["max"]}), 403
+
+    replayed = False
+    if price > 0:
+        result, entry = charge_thesis_purchase(account["_id"], email, thesis_id, price, request.headers.get("Idempotency-Key"))
+        if result not in (TRANSFER_OK, TRANSFER_REPLAYED):
+            QuotaService.release(email)
+            if result == TRANSFER_INSUFFICIENT_FUNDS:
+                return jsonify({"error": "INSUFFICIENT_FUNDS"}), 402
+            return jsonify({"error": "PAYMENT_FAILED", "detail": result}), 409
+        # Only a replay of this very thesis purchase was already counted against the quota
+        replayed = result == TRANSFER_REPLAYED and (entry or {}).get("reference", {}).get("thesis_id") == str(thesis_id)
+
+    if replayed:
+        # The download was already counted when the purchase was first made
+        QuotaService.release(email)
+
+    if not replayed:
+        mongo.db.THESIS_PURCHASE.insert_one({
+            "user_email": email,
+            "thesis_id": thesis_id,
+            "title": title,
+            "price": price,
+            "time": datetime.now(timezone.utc)
+        })
 
     # return PDF 
     file_entry = mongo.db.THESIS_FILES.find_one({
@@ -203,7 +208,7 @@ def download_thesis():
 @consumer_bp.route("/services/<org>", methods=["GET"])
 def get_services_by_org(org):
     email = request.headers.get("X-User-Email", "")
-    user_doc = mongo.db.users.find_one({"email": email})
+    user_doc = IdentityService.get_user_doc_by_email(email)
     if not user_doc:
         return jsonify({"error": "AUTH_REQUIRED"}), 401
 
@@ -252,7 +257,7 @@ def get_services_by_org(org):
 @consumer_bp.route("/services/available", methods=["GET"])
 def get_available_services():
     email = request.headers.get("X-User-Email", "")
-    user_doc = mongo.db.users.find_one({"email": email})
+    user_doc = IdentityService.get_user_doc_by_email(email)
     if not user_doc:
         return jsonify({"error": "AUTH_REQUIRED"}), 401
 
@@ -301,7 +306,7 @@ def get_available_services():
 @consumer_bp.route("/service/query/<org>/<service_name>", methods=["POST"])
 def use_service(org, service_name):
     email = get_user_email()
-    user_doc = mongo.db.users.find_one({"email": email})
+    user_doc = IdentityService.get_user_doc_by_email(email)
     if not user_doc:
         return jsonify({"error": "AUTH_REQUIRED"}), 401
 
@@ -1,7 +1,11 @@
 # ✅ Full Updated Version of datauser_routes_public.py
 from flask import Blueprint, request, jsonify, send_file
 from ..models.public_consumer import PublicDataConsumer
+from ..services.payment_service import charge_thesis_purchase
+from ..services.QuotaService import QuotaService, QUOTA_EXCEEDED
+from ...payment.Ledger import TRANSFER_OK, TRANSFER_REPLAYED, TRANSFER_INSUFFICIENT_FUNDS
 from ...extensions import mongo
+from ...main.IdentityService import IdentityService
 from datetime import datetime, timezone
 import os
 from flask import send_from_directory
@@ -56,12 +60,7 @@ def check_quota():
     if not email:
         return jsonify({"error": "MISSING_EMAIL"}), 400
 
-    record = mongo.db.USER_QUOTA.find_one({"user_email": email}) or {}
-    return jsonify({
-        "used_today": record.get("used_today", 0),
-        "max_daily": record.get("max_daily", 5),
-        "last_used": record.get("last_used")
-    })
+    return jsonify(QuotaService.usage(email))
 
 # 💰 4. Check Account Balance
 @public_bp.route("/bank/balance", methods=["POST"])
@@ -108,11 +107,10 @@ def download_thesis():
         return jsonify({"error": "MISSING_FIELDS"}), 400
 
     # ✅ 1. 配额检查
-    quota = mongo.db.USER_QUOTA.find_one({"user_email": email}) or {}
-    used = quota.get("used_today", 0)
-    max_daily = quota.get("max_daily", 5)
-    if used >= max_daily:
-        return jsonify({"error": "QUOTA_EXCEEDED", "used": used, "max": max_daily}), 403
+    # Users this worker already saw run out are refused without a database round-trip
+    if QuotaService.is_exhausted(email):
+        max_daily = QuotaService.max_daily(email)
+        return jsonify({"error": "QUOTA_EXCEEDED", "used": max_daily, "max": max_daily}), 403
 
     # ✅ 2. 查找论文
     thesis = mongo.db.THESIS.find_one({"title": {"$regex": title, "$options": "i"}})
@@ -128,7 +126,7 @@ def download_thesis():
     pdf_path = file_entry["pdf_path"]
 
     # ✅ 3. 查找用户所属组织 ID
-    user_doc = mongo.db.users.find_one({"email": email})
+    user_doc = IdentityService.get_user_doc_by_email(email)
     if not user_doc:
         return jsonify({"error": "USER_NOT_FOUND"}), 404
     org_id = user_doc.get("organization_id")
@@ -142,30 +140,36 @@ def download_thesis():
     if not account:
         return jsonify({"error": "BANK_AUTH_FAILED"}), 403
 
-    if account.get("balance", 0) < price:
-        return jsonify({"error": "INSUFFICIENT_FUNDS"}), 402
-
-    # ✅ 5. 扣款
-    mongo.db.BANK_ACCOUNT.update_one(
-        {"_id": account["_id"]},
-        {"$inc": {"balance": -price}}
-    )
-
-    # ✅ 6. 记录购买
-    mongo.db.THESIS_PURCHASE.insert_one({
-        "user_email": email,
-        "thesis_id": thesis_id,
-        "title": title,
-        "price": price,
-        "time": datetime.now(timezone.utc)
-    })
-
-    # ✅ 7. 更新配额
-    mongo.db.USER_QUOTA.update_one(
-        {"user_email": email},
-        {"$inc": {"used_today": 1}, "$set": {"last_used": datetime.now(timezone.utc)}},
-        upsert=True
-    )
+    # ✅ 5. 占用配额 (atomic check-and-increment; given back if the purchase does not go through)
+    quota_status, quota = QuotaService.consume(email)
+    if quota_status == QUOTA_EXCEEDED:
+        return jsonify({"error": "QUOTA_EXCEEDED", "used": quota["max"], "max": quota["max"]}), 403
+
+    # ✅ 6. 扣款
+    replayed = False
+    if price > 0:
+        result, entry = charge_thesis_purchase(account["_id"], email, thesis_id, price, request.headers.get("Idempotency-Key"))
+        if result not in (TRANSFER_OK, TRANSFER_REPLAYED):
+            QuotaService.release(email)
+            if result == TRANSFER_INSUFFICIENT_FUNDS:
+                return jsonify({"error": "INSUFFICIENT_FUNDS"}), 402
+            return jsonify({"error": "PAYMENT_FAILED", "detail": result}), 409
+        # Only a replay of this very thesis purchase was already counted against the quota
+        replayed = result == TRANSFER_REPLAYED and (entry or {}).get("reference", {}).get("thesis_id") == str(thesis_id)
+
+    if replayed:
+        # The download was already counted when the purchase was first made
+        QuotaService.release(email)
+
+    # ✅ 7. 记录购买
+    if not replayed:
+        mongo.db.THESIS_PURCHASE.insert_one({
+            "user_email": email,
+            "thesis_id": thesis_id,
+            "title": title,
+            "price": price,
+            "time": datetime.now(timezone.utc)
+        })
 
     # ✅ 8. 返回 PDF 文件
     file_entry = mongo.db.THESIS_FILES.find_one({
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify, send_file
 from pymongo import MongoClient
 from flask import Blueprint, request, jsonify
 import os
+from ..services.QuotaService import QuotaService
 
 mock_bp = Blueprint("mock", __name__, url_prefix="/mock")
 
@@ -185,16 +186,12 @@ def bank_withdraw():
 @mock_bp.route("/quota/check", methods=["POST"])
 def quota_check():
     email = request.json.get("email")
-    record = db["USER_QUOTA"].find_one({"user_email": email})
-    if not record:
-        return jsonify({"status": "ok", "remaining": 10})
-
-    used = record.get("used_today", 0)
-    max_allowed = record.get("max_daily", 5)
-    if used >= max_allowed:
+    usage = QuotaService.usage(email, db=db)
+    remaining = usage["max_daily"] - usage["used_today"]
+    if remaining <= 0:
         return jsonify({"status": "fail", "reason": "quota_exceeded"})
 
-    return jsonify({"status": "ok", "remaining": max_allowed - used})
+    return jsonify({"status": "ok", "remaining": remaining})
 
 @mock_bp.route("/course/info", methods=["POST"])
 def mock_course_info():
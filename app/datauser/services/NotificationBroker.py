@@ -0,0 +1,118 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from app.extensions import mongo
+from .NotificationService import NotificationService
+
+
+class NotificationBroker:
+    """
+    Pushes new notifications to the providers connected to the SSE stream.
+
+    One watcher thread per process looks for notifications created since its last look
+    (a single indexed _id range query every NOTIFICATION_STREAM_POLL_INTERVAL seconds,
+    however many providers are connected) and hands them to the subscribers of the
+    notification's organization. The watcher only runs while somebody is subscribed.
+    Notifications written by other processes are picked up the same way, so there is no
+    need for a shared message bus.
+    """
+    # ObjectIds from other processes may be a little out of order; re-read this window and skip what was seen
+    OVERLAP = timedelta(seconds=5)
+
+    def __init__(self):
+        self._subscribers: dict[str, set[queue.Queue]] = {}
+        self._lock = threading.Lock()
+        self._app = None
+        self._watcher_pid = None
+        self._seen: deque = deque()
+        self._seen_ids: set = set()
+        self.poll_interval = 2
+
+    def init_app(self, app):
+        self._app = app
+        self.poll_interval = app.config.get('NOTIFICATION_STREAM_POLL_INTERVAL', 2)
+
+    def subscribe(self, organization_name: str) -> queue.Queue:
+        subscriber = queue.Queue(maxsize=100)
+        with self._lock:
+            self._subscribers.setdefault(organization_name, set()).add(subscriber)
+        self._ensure_watcher()
+        return subscriber
+
+    def unsubscribe(self, organization_name: str, subscriber: queue.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(organization_name)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[organization_name]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, notification: dict):
+        """Delivers a serialized notification to the subscribers of its organization."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(notification.get("organization_name"), ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(notification)
+            except queue.Full:
+                # A stalled client; it catches up from Last-Event-ID when it reconnects
+                pass
+
+    def _remember(self, notification_id: ObjectId) -> bool:
+        """False if the notification was already delivered."""
+        if notification_id in self._seen_ids:
+            return False
+        self._seen.append(notification_id)
+        self._seen_ids.add(notification_id)
+        cutoff = datetime.now(timezone.utc) - 2 * self.OVERLAP
+        while self._seen and self._seen[0].generation_time < cutoff:
+            self._seen_ids.discard(self._seen.popleft())
+        return True
+
+    def poll_once(self, since: datetime) -> datetime:
+        """Publishes notifications created after `since`; returns the start of the next window."""
+        next_since = datetime.now(timezone.utc) - self.OVERLAP
+        with self._lock:
+            organizations = list(self._subscribers)
+        if not organizations:
+            return next_since
+        new_notifications = mongo.db.notifications.find(
+            {"_id": {"$gt": ObjectId.from_datetime(since)}, "organization_name": {"$in": organizations}}
+        ).sort("_id", 1)
+        for notification in new_notifications:
+            if self._remember(notification["_id"]):
+                self.publish(NotificationService.serialize(notification))
+        return next_since
+
+    def _ensure_watcher(self):
+        if self._watcher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+        threading.Thread(target=self._watch, name="notification-watcher", daemon=True).start()
+
+    def _watch(self):
+        since = datetime.now(timezone.utc) - self.OVERLAP
+        while True:
+            time.sleep(self.poll_interval)
+            if not self.subscriber_count():
+                since = datetime.now(timezone.utc) - self.OVERLAP
+                continue
+            try:
+                with self._app.app_context():
+                    since = self.poll_once(since)
+            except Exception as e:
+                self._app.logger.warning(f"Notification watcher failed: {e}")
+
+
+notification_broker = NotificationBroker()
@@ -1,33 +1,127 @@
 
 from bson import ObjectId
 from datetime import datetime, timezone
+from pymongo import DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
 from app.extensions import mongo
 
+NOTIFICATION_PAGE_SIZE = 20
+MAX_NOTIFICATION_PAGE_SIZE = 100
+# Fields the provider dashboard shows
+NOTIFICATION_PROJECTION = {
+    "title": 1, "message": 1, "type": 1, "service_display_name": 1, "link_to_action": 1,
+    "organization_id": 1, "is_read": 1, "read_at": 1, "created_at": 1
+}
+
 class NotificationService:
     @staticmethod
-    def get_user_notifications(organization_name: str):
-        notifications = list(mongo.db.notifications.find(
-            {"organization_name": organization_name}
-        ).sort("created_at", -1))
-        for n in notifications:
-            n["_id"] = str(n["_id"])
+    def dedupe_key(notification_type: str, user_id, subject: str) -> str:
+        """Identifies 'the same' notification, e.g. one configuration request per provider and service."""
+        return f"{notification_type}:{user_id}:{subject}"
+
+    @staticmethod
+    def fan_out(notification_docs: list[dict]) -> tuple[list[dict], int]:
+        """
+        Writes many notifications in one unordered bulk upsert keyed on each document's
+        dedupe_key. A notification whose key already exists is left as it is, so repeating
+        a fan-out does not duplicate anything. Returns (the documents that were created,
+        number already present).
+        """
+        if not notification_docs:
+            return [], 0
+        operations = [
+            UpdateOne({"dedupe_key": doc["dedupe_key"]}, {"$setOnInsert": doc}, upsert=True)
+            for doc in notification_docs
+        ]
+        try:
+            created_indexes = set(mongo.db.notifications.bulk_write(operations, ordered=False).upserted_ids)
+        except BulkWriteError as e:
+            # Two concurrent fan-outs may race on the same key; the unique index keeps one
+            duplicate_errors = [error for error in e.details.get("writeErrors", []) if error.get("code") == 11000]
+            if len(duplicate_errors) != len(e.details.get("writeErrors", [])):
+                raise
+            created_indexes = {upserted["index"] for upserted in e.details.get("upserted", [])}
+        created_docs = [doc for index, doc in enumerate(notification_docs) if index in created_indexes]
+        return created_docs, len(notification_docs) - len(created_docs)
+
+    @staticmethod
+    def serialize(n: dict) -> dict:
+        n["_id"] = str(n["_id"])
+        if "user_id" in n:
             n["user_id"] = str(n["user_id"])
-            n["organization_id"] = str(n["organization_id"]) if "organization_id" in n else None
-            n["created_at"] = n.get("created_at").isoformat() if n.get("created_at") else None
-            n["read_at"] = n.get("read_at").isoformat() if n.get("read_at") else None
-        return notifications
-
-    @staticmethod
-    def mark_as_read(notification_id: str):
-        notif = mongo.db.notifications.find_one({
-            "_id": ObjectId(notification_id),
-        })
-        if not notif:
-            return False, "Notification not found or not owned by user."
-        if notif.get("is_read"):
-            return True, "Already marked as read."
-        mongo.db.notifications.update_one(
-            {"_id": ObjectId(notification_id)},
+        n["organization_id"] = str(n["organization_id"]) if "organization_id" in n else None
+        n["created_at"] = n.get("created_at").isoformat() if n.get("created_at") else None
+        n["read_at"] = n.get("read_at").isoformat() if n.get("read_at") else None
+        return n
+
+    @staticmethod
+    def get_user_notifications(organization_name: str, cursor: str | None = None, limit: int = NOTIFICATION_PAGE_SIZE) -> tuple[bool, dict | str]:
+        """
+        One page of the organization's notifications, newest first. `cursor` is the
+        next_cursor of the previous page (the last notification id), so each page is one
+        range scan on the (organization_name, _id) index.
+        Returns (True, {"notifications", "next_cursor"}) or (False, error message).
+        """
+        limit = max(1, min(int(limit), MAX_NOTIFICATION_PAGE_SIZE))
+        query = {"organization_name": organization_name}
+        if cursor:
+            if not ObjectId.is_valid(cursor):
+                return False, "Invalid cursor."
+            query["_id"] = {"$lt": ObjectId(cursor)}
+        notifications = list(
+            mongo.db.notifications.find(query, NOTIFICATION_PROJECTION).sort("_id", DESCENDING).limit(limit + 1)
+        )
+        next_cursor = str(notifications[limit - 1]["_id"]) if len(notifications) > limit else None
+        return True, {
+            "notifications": [NotificationService.serialize(n) for n in notifications[:limit]],
+            "next_cursor": next_cursor
+        }
+
+    @staticmethod
+    def get_notifications_after(organization_name: str, last_id: str, limit: int = 100) -> list[dict]:
+        """Notifications created after last_id (oldest first); used to catch up a reconnecting stream."""
+        if not ObjectId.is_valid(last_id):
+            return []
+        notifications = mongo.db.notifications.find(
+            {"organization_name": organization_name, "_id": {"$gt": ObjectId(last_id)}}
+        ).sort("_id", 1).limit(limit)
+        return [NotificationService.serialize(n) for n in notifications]
+
+    @staticmethod
+    def unread_count(organization_name: str) -> int:
+        """Answered from the (organization_name, is_read) index without loading documents."""
+        return mongo.db.notifications.count_documents({"organization_name": organization_name, "is_read": {"$ne": True}})
+
+    @staticmethod
+    def mark_as_read(notification_id: str, organization_name: str):
+        if not ObjectId.is_valid(notification_id):
+            return False, "Invalid notification id."
+        result = mongo.db.notifications.update_one(
+            {"_id": ObjectId(notification_id), "organization_name": organization_name, "is_read": {"$ne": True}},
             {"$set": {"is_read": True, "read_at": datetime.now(timezone.utc)}}
         )
-        return True, "Notification marked as read."
\ No newline at end of file
+        if result.modified_count:
+            return True, "Notification marked as read."
+        # Nothing changed: already read, or not this organization's notification
+        if mongo.db.notifications.count_documents({"_id": ObjectId(notification_id), "organization_name": organization_name}, limit=1):
+            return True, "Already marked as read."
+        return False, "Notification not found or not owned by user."
+
+    @staticmethod
+    def mark_many_as_read(organization_name: str, notification_ids: list[str] | None = None, before: datetime | None = None) -> tuple[bool, int | str]:
+        """
+        Marks the given notifications, or all created at or before `before`, as read with one
+        update_many. Returns (True, number of notifications marked) or (False, error message).
+        """
+        # Same unread test as mark_as_read, so notifications without an is_read field are included
+        query = {"organization_name": organization_name, "is_read": {"$ne": True}}
+        if notification_ids is not None:
+            if not all(ObjectId.is_valid(notification_id) for notification_id in notification_ids):
+                return False, "Invalid notification id."
+            query["_id"] = {"$in": [ObjectId(notification_id) for notification_id in notification_ids]}
+        elif before is not None:
+            query["created_at"] = {"$lte": before}
+        else:
+            return False, "Give notification ids or a 'before' timestamp."
+        result = mongo.db.notifications.update_many(query, {"$set": {"is_read": True, "read_at": datetime.now(timezone.utc)}})
+        return True, result.modified_count
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.cache import TTLCache
+from app.extensions import mongo
+
+# consume() results
+QUOTA_OK = "QUOTA_OK"
+QUOTA_EXCEEDED = "QUOTA_EXCEEDED"
+
+
+class QuotaService:
+    """
+    Daily download quota per user.
+
+    Usage is counted in one USER_QUOTA document per (user_email, day), where day is the
+    UTC date, so the count starts from zero every day without a reset job; old day
+    documents are removed by a TTL index on expire_at. consume() is a single conditional
+    upsert that only increments while used < max_daily, so concurrent downloads cannot go
+    over the limit. A user's max_daily comes from their limit document (the USER_QUOTA
+    document without a day) or QUOTA_DEFAULT_MAX_DAILY.
+
+    Users who ran out are remembered in-process for QUOTA_EXHAUSTED_CACHE_TTL seconds so
+    their further requests are refused without a database round-trip.
+    """
+    _limits = TTLCache("quota_limits", maxsize=10000, ttl=60)
+    _exhausted = TTLCache("quota_exhausted", maxsize=10000, ttl=60)
+
+    @classmethod
+    def init_app(cls, app):
+        cls._limits.configure(ttl=app.config.get('QUOTA_LIMIT_CACHE_TTL', 60))
+        cls._exhausted.configure(ttl=app.config.get('QUOTA_EXHAUSTED_CACHE_TTL', 60))
+
+    @staticmethod
+    def today() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    @staticmethod
+    def _collection(db=None):
+        return (db if db is not None else mongo.db)["USER_QUOTA"]
+
+    @classmethod
+    def max_daily(cls, email: str, db=None) -> int:
+        limit = cls._limits.get(email)
+        if limit is None:
+            limit_doc = cls._collection(db).find_one({"user_email": email, "day": {"$exists": False}}, {"max_daily": 1})
+            limit = (limit_doc or {}).get("max_daily", current_app.config.get('QUOTA_DEFAULT_MAX_DAILY', 5))
+            cls._limits.set(email, limit)
+        return limit
+
+    @classmethod
+    def set_max_daily(cls, email: str, max_daily: int):
+        cls._collection().update_one(
+            {"user_email": email, "day": {"$exists": False}},
+            {"$set": {"user_email": email, "max_daily": max_daily}},
+            upsert=True
+        )
+        cls._limits.delete(email)
+        cls._exhausted.delete((email, cls.today()))
+
+    @classmethod
+    def is_exhausted(cls, email: str) -> bool:
+        """In-process check only: True if this worker saw the user run out of quota today."""
+        return cls._exhausted.get((email, cls.today())) is not None
+
+    @classmethod
+    def consume(cls, email: str) -> tuple[str, dict]:
+        """
+        Uses one download from today's quota. Returns (QUOTA_OK or QUOTA_EXCEEDED,
+        {"used", "max"}); "used" is None when the refusal came from the in-process cache.
+        """
+        day = cls.today()
+        limit = cls.max_daily(email)
+        if limit <= 0 or cls.is_exhausted(email):
+            return QUOTA_EXCEEDED, {"used": None, "max": limit}
+        now_utc = datetime.now(timezone.utc)
+        try:
+            # Matches today's document only while it is under the limit. If it is at the limit,
+            # the upsert tries to insert a second document for the day and the unique index refuses it.
+            quota_doc = cls._collection().find_one_and_update(
+                {"user_email": email, "day": day, "used": {"$lt": limit}},
+                {
+                    "$inc": {"used": 1},
+                    "$set": {"last_used": now_utc},
+                    "$setOnInsert": {"expire_at": now_utc + timedelta(days=2)}
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            quota_doc = None
+        if quota_doc is None:
+            cls._exhausted.set((email, day), True)
+            return QUOTA_EXCEEDED, {"used": limit, "max": limit}
+        return QUOTA_OK, {"used": quota_doc["used"], "max": limit}
+
+    @classmethod
+    def release(cls, email: str):
+        """Gives back a download consumed today, e.g. when the purchase then failed."""
+        day = cls.today()
+        cls._collection().update_one({"user_email": email, "day": day, "used": {"$gt": 0}}, {"$inc": {"used": -1}})
+        cls._exhausted.delete((email, day))
+
+    @classmethod
+    def usage(cls, email: str, db=None) -> dict:
+        """Today's usage, as shown by the /quota endpoints."""
+        quota_doc = cls._collection(db).find_one({"user_email": email, "day": cls.today()}, {"used": 1, "last_used": 1}) or {}
+        return {
+            "used_today": quota_doc.get("used", 0),
+            "max_daily": cls.max_daily(email, db),
+            "last_used": quota_doc.get("last_used")
+        }
@@ -1,4 +1,24 @@
+import time
+from urllib.parse import urlparse
 import requests
+from app.instrumentation import http_timer
+from app.metrics import DISPATCHER_REQUESTS, DISPATCHER_LATENCY
+
+
+def _send(method: str, url: str, payload: dict):
+    """Calls a provider endpoint and records its latency and outcome per provider host."""
+    provider = urlparse(url).netloc or "unknown"
+    started_at = time.perf_counter()
+    outcome = "error"
+    try:
+        with http_timer():
+            res = requests.post(url, json=payload, timeout=5) if method == "post" else requests.get(url, params=payload, timeout=5)
+        outcome = "ok" if res.status_code < 400 else "http_error"
+        return res
+    finally:
+        DISPATCHER_REQUESTS.inc(provider=provider, outcome=outcome)
+        DISPATCHER_LATENCY.observe(time.perf_counter() - started_at, provider=provider)
+
 
 def dispatch_service_request(config: dict, input_data) -> dict:
     """
@@ -26,7 +46,7 @@ def dispatch_service_request(config: dict, input_data) -> dict:
                 payload = build_payload(item)
                 print(f"[Dispatcher] POST {url} with payload: {payload}")
                 try:
-                    res = requests.post(url, json=payload, timeout=5) if method == "post" else requests.get(url, params=payload, timeout=5)
+                    res = _send(method, url, payload)
                     try:
                         responses.append(res.json())
                     except:
@@ -39,12 +59,9 @@ def dispatch_service_request(config: dict, input_data) -> dict:
         payload = build_payload(input_data)
         print(f"[Dispatcher] {method.upper()} {url} with payload: {payload}")
 
-        if method == "post":
-            res = requests.post(url, json=payload, timeout=5)
-        elif method == "get":
-            res = requests.get(url, params=payload, timeout=5)
-        else:
+        if method not in ("post", "get"):
             return {"error": f"Unsupported HTTP method: {method}"}
+        res = _send(method, url, payload)
 
         try:
             return res.json()
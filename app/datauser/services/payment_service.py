@@ -1,4 +1,6 @@
 from ..models.payment import PaymentRecord
+from ...payment.BankAccount import BankAccount
+from ...payment.Ledger import Ledger, EXTERNAL_ACCOUNT, TRANSFER_REPLAYED, TRANSFER_KEY_CONFLICT
 
 def pay_for_download(student_id, org_id, thesis_id):
     PaymentRecord.create(student_id, org_id, 10, 'download', detail={'thesis_id': thesis_id})
@@ -7,4 +9,23 @@ def pay_for_record(student_id, org_id, record_id):
     PaymentRecord.create(student_id, org_id, 10, 'record', detail={'record_id': record_id})
 
 def pay_for_identify(student_id, org_id, identify_id):
-    PaymentRecord.create(student_id, org_id, 50, 'identify', detail={'identify_id': identify_id}) 
\ No newline at end of file
+    PaymentRecord.create(student_id, org_id, 50, 'identify', detail={'identify_id': identify_id}) 
+
+def charge_thesis_purchase(account_id, email, thesis_id, price, request_key=None):
+    """
+    Moves the thesis price from the buyer's organization account to EDBA. A repeated
+    request_key for the same thesis and price is not charged again; a replay that does
+    not match the requested thesis returns TRANSFER_KEY_CONFLICT.
+    """
+    edba_account = BankAccount.get_edba_account()
+    result, entry = Ledger.transfer(
+        account_id,
+        edba_account._id if edba_account else EXTERNAL_ACCOUNT,
+        price,
+        "thesis_purchase",
+        idempotency_key=f"thesis:{email}:{thesis_id}:{price}:{request_key}" if request_key else None,
+        reference={'user_email': email, 'thesis_id': str(thesis_id)}
+    )
+    if result == TRANSFER_REPLAYED and (entry or {}).get("reference", {}).get("thesis_id") != str(thesis_id):
+        return TRANSFER_KEY_CONFLICT, entry
+    return result, entry
@@ -1,7 +1,10 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from flask_pymongo import PyMongo, MongoClient
 from flask_login import LoginManager
 from flask_mail import Mail
-from flask import g
+from flask import g, current_app
 
 
 mongo = PyMongo()
@@ -44,3 +47,45 @@ def close_db(e=None):
    the `db_client` is stored under the key 'db_client'.
     """
     g.pop('db', None)
+
+
+_parallel_executor = None
+_parallel_executor_lock = threading.Lock()
+
+def _get_parallel_executor():
+    global _parallel_executor
+    if _parallel_executor is None:
+        with _parallel_executor_lock:
+            if _parallel_executor is None:
+                _parallel_executor = ThreadPoolExecutor(
+                    max_workers=current_app.config.get('PARALLEL_QUERY_WORKERS', 8),
+                    thread_name_prefix="edba-query"
+                )
+    return _parallel_executor
+
+
+def run_parallel(*calls):
+    """
+    Runs independent callables (typically read-only queries) concurrently and returns
+    their results in the same order.
+
+    Each call runs inside an application context of the current app and with a copy of
+    the caller's context variables, so `mongo.db`, `current_app` and per-request
+    instrumentation keep working. The first exception raised by a call is re-raised.
+    """
+    if len(calls) <= 1:
+        return [call() for call in calls]
+
+    app = current_app._get_current_object()
+
+    def bind(call):
+        ctx = contextvars.copy_context()
+
+        def run_in_app_context():
+            with app.app_context():
+                return call()
+        return lambda: ctx.run(run_in_app_context)
+
+    executor = _get_parallel_executor()
+    futures = [executor.submit(bind(call)) for call in calls]
+    return [future.result() for future in futures]
@@ -0,0 +1,231 @@
+import click
+from flask.cli import AppGroup
+from pymongo import ASCENDING, DESCENDING, TEXT
+from pymongo.errors import OperationFailure, PyMongoError
+from .extensions import mongo
+
+
+class IndexSpec:
+    """One declared index: the collection, its key pattern and create_index options."""
+
+    def __init__(self, collection: str, keys: list[tuple[str, int]], **options):
+        self.collection = collection
+        self.keys = keys
+        self.options = options
+
+    @property
+    def key(self) -> tuple:
+        # The server reports a text index under its internal _fts/_ftsx keys, whatever the fields
+        if any(direction == TEXT for _, direction in self.keys):
+            return (("_fts", TEXT), ("_ftsx", 1))
+        return tuple((field, direction) for field, direction in self.keys)
+
+    def describe(self) -> str:
+        fields = ", ".join(
+            f"{field} {direction if isinstance(direction, str) else 'asc' if direction == ASCENDING else 'desc'}"
+            for field, direction in self.keys
+        )
+        unique = " unique" if self.options.get("unique") else ""
+        ttl = f" ttl={self.options['expireAfterSeconds']}s" if "expireAfterSeconds" in self.options else ""
+        return f"{self.collection}({fields}){unique}{ttl}"
+
+
+# Every index the application relies on. Keep the key order of compound indexes in line
+# with the queries: equality fields first, then the sort/range field.
+INDEXES = [
+    # Users, login codes and organization membership
+    IndexSpec("users", [("email", ASCENDING)]),
+    IndexSpec("users", [("organization_id", ASCENDING), ("email", ASCENDING)]),
+    IndexSpec("users", [("organization_id", ASCENDING), ("access_level", ASCENDING)]),
+    IndexSpec("OTP", [("email", ASCENDING)]),
+    IndexSpec("OTP", [("expire_at", ASCENDING)], expireAfterSeconds=0),
+    IndexSpec("mail_verificationsl_verifications", [("email", ASCENDING)]),
+    IndexSpec("mail_verificationsl_verifications", [("expires_at", ASCENDING)], expireAfterSeconds=0),
+    IndexSpec("workspaces", [("organization_id", ASCENDING)]),
+    IndexSpec("activity_log", [("userAccount", ASCENDING), ("activityTime", DESCENDING)]),
+    IndexSpec("activity_log", [("activityTime", DESCENDING)]),
+
+    # Organization registration and approval
+    IndexSpec("org_register_request", [("organization_id", ASCENDING), ("status", ASCENDING)]),
+    IndexSpec("org_register_request", [("organization_name", ASCENDING)]),
+    # Approval queues page through (submit_time, _id) within one status
+    IndexSpec("org_register_request", [("status", ASCENDING), ("submit_time", ASCENDING), ("_id", ASCENDING)]),
+    # Senior E-Admin decision histories, newest decision first
+    IndexSpec("org_register_request", [("seadmin_approved_by", ASCENDING), ("status", ASCENDING), ("seadmin_approved_at", DESCENDING), ("_id", DESCENDING)]),
+    IndexSpec("org_register_request", [("seadmin_rejected_by", ASCENDING), ("status", ASCENDING), ("seadmin_rejected_at", DESCENDING), ("_id", DESCENDING)]),
+
+    # Data services
+    IndexSpec("COURSE_INFO", [("provider_email", ASCENDING)]),
+    IndexSpec("SERVICE_CONFIG", [("organization", ASCENDING), ("service_name", ASCENDING)]),
+    IndexSpec("SERVICE_CONFIG", [("provider_email", ASCENDING), ("service_name", ASCENDING)]),
+    IndexSpec("POLICIES", [("consumer_email", ASCENDING), ("service_name", ASCENDING)]),
+    IndexSpec("POLICIES", [("organization", ASCENDING)]),
+    IndexSpec("platform_policies", [("created_at", DESCENDING)]),
+    IndexSpec("USER_QUOTA", [("user_email", ASCENDING), ("day", ASCENDING)], unique=True),
+    IndexSpec("USER_QUOTA", [("expire_at", ASCENDING)], expireAfterSeconds=0),
+    # Thesis downloads: the PDF lookup by title and each user's purchases
+    IndexSpec("THESIS_FILES", [("title", ASCENDING)]),
+    IndexSpec("THESIS_PURCHASE", [("user_email", ASCENDING), ("time", DESCENDING)]),
+    # Student record and identity checks look a student up by id and name
+    IndexSpec("STUDENT_RECORD", [("id", ASCENDING), ("name", ASCENDING)]),
+    IndexSpec("STUDENT_AUTH", [("id", ASCENDING), ("name", ASCENDING)]),
+    IndexSpec("notifications", [("organization_name", ASCENDING), ("_id", DESCENDING)]),
+    IndexSpec("notifications", [("organization_name", ASCENDING), ("is_read", ASCENDING)]),
+    IndexSpec("notifications", [("organization_id", ASCENDING)]),
+    IndexSpec("notifications", [("dedupe_key", ASCENDING)], unique=True, partialFilterExpression={"dedupe_key": {"$exists": True}}),
+    # Help desk pages walk (created_at, _id) newest first, per user or per status
+    IndexSpec("help", [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    IndexSpec("help", [("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    IndexSpec("help", [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    IndexSpec("help", [("question", TEXT), ("answer", TEXT)]),
+
+    # Payments
+    IndexSpec("BANK_ACCOUNT", [("organization_id", ASCENDING)]),
+    IndexSpec("BANK_ACCOUNT", [("account", ASCENDING)]),
+    IndexSpec("LEDGER_ENTRIES", [("idempotency_key", ASCENDING)], unique=True),
+    IndexSpec("LEDGER_ENTRIES", [("debit_account", ASCENDING), ("posted_at", ASCENDING)]),
+    IndexSpec("LEDGER_ENTRIES", [("credit_account", ASCENDING), ("posted_at", ASCENDING)]),
+    IndexSpec("LEDGER_ENTRIES", [("status", ASCENDING), ("created_at", ASCENDING)]),
+    IndexSpec("BALANCE_SNAPSHOTS", [("account_id", ASCENDING), ("as_of", DESCENDING)]),
+    # One settlement per reference (import job + chunk), claimed by inserting it
+    IndexSpec("FEE_SETTLEMENTS", [("reference", ASCENDING)], unique=True,
+              partialFilterExpression={"reference": {"$type": "string"}}, name="reference_unique"),
+    IndexSpec("payment_records", [("student_id", ASCENDING), ("created_at", DESCENDING)]),
+    IndexSpec("payment_records", [("org_id", ASCENDING), ("created_at", DESCENDING)]),
+
+    # Outbound mail queue; delivered messages are kept for a week
+    IndexSpec("mail_outbox", [("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+    IndexSpec("mail_outbox", [("status", ASCENDING), ("claimed_at", ASCENDING)]),
+    IndexSpec("mail_outbox", [("sent_at", ASCENDING)], expireAfterSeconds=7 * 24 * 3600),
+
+    # Shared rate limiter state (RATE_LIMIT_BACKEND = "mongo"); idle keys expire
+    IndexSpec("rate_limits", [("expire_at", ASCENDING)], expireAfterSeconds=0),
+
+    # Per-status document counters (app/status_counters.py)
+    IndexSpec("counters", [("collection", ASCENDING)]),
+
+    # Background jobs
+    IndexSpec("jobs", [("status", ASCENDING), ("created_at", ASCENDING)]),
+    IndexSpec("jobs", [("status", ASCENDING), ("heartbeat_at", ASCENDING)]),
+]
+
+
+class IndexRegistry:
+    """
+    Creates and checks the indexes declared in INDEXES. create_index is a no-op for an
+    index that already exists with the same options, so ensure() is safe to run on every start.
+    """
+
+    @classmethod
+    def specs(cls, collections: list[str] | None = None) -> list[IndexSpec]:
+        return [spec for spec in INDEXES if not collections or spec.collection in collections]
+
+    @classmethod
+    def ensure(cls, collections: list[str] | None = None) -> tuple[list[str], list[str]]:
+        """Creates the declared indexes. Returns (created or confirmed indexes, error messages)."""
+        ensured, errors = [], []
+        for spec in cls.specs(collections):
+            try:
+                mongo.db[spec.collection].create_index(spec.keys, **spec.options)
+                ensured.append(spec.describe())
+            except OperationFailure as e:
+                # e.g. an existing index with the same keys but different options
+                errors.append(f"{spec.describe()}: {e}")
+        return ensured, errors
+
+    @classmethod
+    def _existing(cls, collection: str) -> dict[tuple, dict]:
+        return {
+            # text/hashed indexes have string directions
+            tuple((field, direction if isinstance(direction, str) else int(direction)) for field, direction in info["key"]): dict(info, name=name)
+            for name, info in mongo.db[collection].index_information().items()
+            if name != "_id_"
+        }
+
+    @classmethod
+    def _usage(cls, collection: str) -> dict[str, int] | None:
+        """Operation counts per index name since the server started, or None where $indexStats is unavailable."""
+        try:
+            return {stat["name"]: stat["accesses"]["ops"] for stat in mongo.db[collection].aggregate([{"$indexStats": {}}])}
+        except (PyMongoError, NotImplementedError):
+            return None
+
+    @classmethod
+    def verify(cls) -> dict[str, list[str]]:
+        """
+        Compares the database with INDEXES. Returns {"missing", "mismatched", "undeclared",
+        "unused"}; "unused" lists declared indexes that have served no operation.
+        """
+        report = {"missing": [], "mismatched": [], "undeclared": [], "unused": []}
+        by_collection: dict[str, list[IndexSpec]] = {}
+        for spec in INDEXES:
+            by_collection.setdefault(spec.collection, []).append(spec)
+
+        for collection, specs in by_collection.items():
+            existing = cls._existing(collection)
+            usage = cls._usage(collection)
+            declared_keys = set()
+            for spec in specs:
+                declared_keys.add(spec.key)
+                info = existing.get(spec.key)
+                if info is None:
+                    report["missing"].append(spec.describe())
+                    continue
+                if bool(info.get("unique")) != bool(spec.options.get("unique")):
+                    report["mismatched"].append(f"{spec.describe()} (existing index '{info['name']}' differs in uniqueness)")
+                if info.get("expireAfterSeconds") != spec.options.get("expireAfterSeconds"):
+                    report["mismatched"].append(f"{spec.describe()} (existing index '{info['name']}' differs in TTL)")
+                if usage is not None and usage.get(info["name"], 0) == 0:
+                    report["unused"].append(spec.describe())
+            for key, info in existing.items():
+                if key not in declared_keys:
+                    report["undeclared"].append(f"{collection}.{info['name']}")
+        return report
+
+
+def ensure_indexes_on_start(app):
+    """Called from create_app when ENSURE_INDEXES_ON_START is set."""
+    with app.app_context():
+        try:
+            ensured, errors = IndexRegistry.ensure()
+        except PyMongoError as e:
+            app.logger.error(f"Could not ensure indexes on start: {e}")
+            return
+        for error in errors:
+            app.logger.error(f"Index creation failed: {error}")
+        app.logger.info(f"Ensured {len(ensured)} indexes.")
+
+
+indexes_cli = AppGroup('indexes', help="Create and check the MongoDB indexes declared in app/indexes.py.")
+
+
+@indexes_cli.command('ensure')
+@click.option('--collection', '-c', multiple=True, help="Only this collection (repeatable).")
+def ensure_command(collection):
+    """Create any declared index that does not exist yet."""
+    ensured, errors = IndexRegistry.ensure(list(collection) or None)
+    for line in ensured:
+        click.echo(f"ok       {line}")
+    for line in errors:
+        click.echo(f"FAILED   {line}", err=True)
+    if errors:
+        raise SystemExit(1)
+
+
+@indexes_cli.command('verify')
+@click.option('--strict', is_flag=True, help="Exit with an error when indexes are missing or mismatched.")
+def verify_command(strict):
+    """Report missing, mismatched, undeclared and unused indexes."""
+    report = IndexRegistry.verify()
+    labels = {
+        "missing": "Missing (run `flask indexes ensure`)",
+        "mismatched": "Mismatched options",
+        "undeclared": "Present in the database but not declared",
+        "unused": "Declared but unused since the server started"
+    }
+    for section, label in labels.items():
+        click.echo(f"{label}: {len(report[section])}")
+        for line in report[section]:
+            click.echo(f"  {line}")
+    if strict and (report["missing"] or report["mismatched"]):
+        raise SystemExit(1)
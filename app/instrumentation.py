@@ -0,0 +1,138 @@
+import contextvars
+import json
+import time
+from contextlib import contextmanager
+from flask import current_app, request
+from pymongo import monitoring
+
+# Metrics of the request being handled; None outside requests (e.g. background jobs)
+_request_metrics = contextvars.ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """Database and outbound HTTP work done while handling one request (shared with run_parallel workers)."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.db_count = 0
+        self.db_ms = 0.0
+        self.http_count = 0
+        self.http_ms = 0.0
+        self.commands: dict[str, int] = {}
+        self._pending: dict[int, str] = {}
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started_at) * 1000.0
+
+    def repeated_commands(self, threshold: int) -> dict[str, int]:
+        return {key: count for key, count in self.commands.items() if count >= threshold}
+
+
+def current_metrics() -> RequestMetrics | None:
+    return _request_metrics.get()
+
+
+class DbCommandListener(monitoring.CommandListener):
+    """Counts commands and their server round-trip time against the current request."""
+
+    def started(self, event):
+        metrics = _request_metrics.get()
+        if metrics is not None:
+            collection = event.command.get(event.command_name)
+            key = f"{event.command_name} {collection}" if isinstance(collection, str) else event.command_name
+            metrics._pending[event.request_id] = key
+
+    def _finished(self, event):
+        metrics = _request_metrics.get()
+        if metrics is None:
+            return
+        key = metrics._pending.pop(event.request_id, event.command_name)
+        metrics.db_count += 1
+        metrics.db_ms += event.duration_micros / 1000.0
+        metrics.commands[key] = metrics.commands.get(key, 0) + 1
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event)
+
+
+@contextmanager
+def http_timer():
+    """Wrap outbound HTTP calls so their time is reported with the request."""
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics = _request_metrics.get()
+        if metrics is not None:
+            metrics.http_count += 1
+            metrics.http_ms += (time.perf_counter() - started_at) * 1000.0
+
+
+class RequestInstrumentation:
+    """
+    Per-request counters for MongoDB commands, DB time and outbound HTTP time. Every
+    response carries them in a Server-Timing header and each request is logged as one
+    JSON line; a command repeated REQUEST_N_PLUS_ONE_THRESHOLD times or more within a
+    request is logged as a likely N+1 pattern.
+    """
+
+    def __init__(self, app=None):
+        self.listener = DbCommandListener()
+        self.enabled = False
+        self.n_plus_one_threshold = 20
+        self.server_timing = True
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('REQUEST_INSTRUMENTATION_ENABLED', True)
+        if not self.enabled:
+            return
+        self.n_plus_one_threshold = app.config.get('REQUEST_N_PLUS_ONE_THRESHOLD', 20)
+        self.server_timing = app.config.get('SERVER_TIMING_HEADER', True)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    def command_listeners(self) -> list:
+        return [self.listener] if self.enabled else []
+
+    def _start_request(self):
+        _request_metrics.set(RequestMetrics())
+
+    def _finish_request(self, response):
+        metrics = _request_metrics.get()
+        _request_metrics.set(None)
+        if metrics is None:
+            return response
+        total_ms = metrics.elapsed_ms()
+
+        if self.server_timing:
+            response.headers.add('Server-Timing', ", ".join([
+                f'db;dur={metrics.db_ms:.1f};desc="{metrics.db_count} commands"',
+                f'http;dur={metrics.http_ms:.1f};desc="{metrics.http_count} calls"',
+                f'total;dur={total_ms:.1f}'
+            ]))
+
+        repeated = metrics.repeated_commands(self.n_plus_one_threshold)
+        current_app.logger.info(json.dumps({
+            "event": "request",
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.endpoint,
+            "status": response.status_code,
+            "duration_ms": round(total_ms, 1),
+            "db_commands": metrics.db_count,
+            "db_ms": round(metrics.db_ms, 1),
+            "http_calls": metrics.http_count,
+            "http_ms": round(metrics.http_ms, 1),
+            "n_plus_one": repeated or None
+        }))
+        if repeated:
+            current_app.logger.warning(f"Possible N+1 queries in {request.endpoint}: {repeated}")
+        return response
+
+
+request_instrumentation = RequestInstrumentation()
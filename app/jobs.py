@@ -0,0 +1,315 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from pymongo import ReturnDocument
+from flask import current_app
+from .extensions import mongo
+from .metrics import JOBS_FINISHED, JOB_DURATION, JOB_QUEUE_DEPTH
+
+# Job Status Constants
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+class JobFailed(Exception):
+    """Raised by a handler to stop a job with a user facing error message."""
+
+
+class JobLost(Exception):
+    """Raised when another worker has taken over the job we were running."""
+
+
+class JobContext:
+    """
+    Handed to a job handler. Tracks the last committed chunk (cursor) so that an
+    interrupted job can pick up where it stopped.
+    """
+
+    def __init__(self, engine: 'JobEngine', job: dict):
+        self._engine = engine
+        self.job = job
+
+    @property
+    def job_id(self) -> str:
+        return str(self.job['_id'])
+
+    @property
+    def cursor(self) -> int:
+        return self.job.get('cursor', 0)
+
+    @property
+    def payload(self) -> dict:
+        return self.job.get('payload', {})
+
+    def set_total(self, total: int):
+        self._update({"$set": {"total": total}})
+        self.job['total'] = total
+
+    def commit_chunk(self, cursor: int, processed: int, results: dict[str, list] | None = None, counters: dict[str, int] | None = None):
+        """
+        Persists the outcome of one chunk together with the new cursor in a single write,
+        so a chunk is either fully recorded or will be re-run after a restart.
+        """
+        now_utc = datetime.now(timezone.utc)
+        update = {
+            "$set": {"cursor": cursor, "heartbeat_at": now_utc, "updated_at": now_utc},
+            "$inc": {"processed": processed}
+        }
+        for key, value in (counters or {}).items():
+            update["$inc"][f"counters.{key}"] = value
+        result_limit = self._engine.result_limit
+        pushes = {
+            f"results.{key}": {"$each": items, "$slice": result_limit}
+            for key, items in (results or {}).items() if items
+        }
+        if pushes:
+            update["$push"] = pushes
+        self._update(update)
+        self.job['cursor'] = cursor
+        self.job['processed'] = self.job.get('processed', 0) + processed
+
+    def _update(self, update: dict):
+        result = self._engine.collection().update_one(
+            {"_id": self.job['_id'], "worker_id": self._engine.worker_id, "status": JOB_RUNNING},
+            update
+        )
+        if result.matched_count == 0:
+            raise JobLost(f"Job {self.job_id} is no longer owned by worker {self._engine.worker_id}.")
+
+
+class JobEngine:
+    """
+    Small background job runner backed by the `jobs` collection.
+
+    Handlers are registered per job type and are called with a JobContext inside an
+    application context on a local thread pool. Progress, partial results and failures
+    live on the job document, which is what the polling endpoints read.
+    """
+    COLLECTION = "jobs"
+
+    def __init__(self, app=None):
+        self._handlers = {}
+        self._executor = None
+        self._app = None
+        self._sweeper = None
+        self._sweep_tasks = []
+        self._workers_pid = None
+        self._workers_lock = threading.Lock()
+        # Jobs handed to this process's pool and not finished yet; the sweep leaves them alone
+        self._submitted = set()
+        self._submitted_lock = threading.Lock()
+        self.max_workers = 2
+        self.sweep_interval = 60
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.result_limit = 5000
+        self.stale_after = timedelta(minutes=2)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._app = app
+        self.result_limit = app.config.get('JOB_RESULT_LIMIT', 5000)
+        self.stale_after = app.config.get('JOB_STALE_AFTER', timedelta(minutes=2))
+        self.max_workers = app.config.get('JOB_WORKERS', 2)
+        self.sweep_interval = app.config.get('JOB_SWEEP_INTERVAL', 60) if app.config.get('JOB_RESUME_ON_START', True) else None
+        app.extensions['job_engine'] = self
+        JOB_QUEUE_DEPTH.set_function(self.queue_depth)
+        # Workers start with the first request a process serves, so CLI commands such as
+        # `flask indexes ensure` never pick up jobs while they run
+        app.before_request(self._ensure_workers)
+
+    def _ensure_workers(self):
+        """Starts the thread pool and the sweeper in this process; forked workers start their own."""
+        if self._workers_pid == os.getpid():
+            return
+        with self._workers_lock:
+            if self._workers_pid == os.getpid():
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="edba-job")
+            if self.sweep_interval:
+                self._start_sweeper(self.sweep_interval)
+            self._workers_pid = os.getpid()
+
+    @classmethod
+    def collection(cls):
+        return mongo.db[cls.COLLECTION]
+
+    def register(self, job_type: str, handler):
+        """handler(ctx: JobContext) -> dict | None; the returned dict is stored as the job summary."""
+        self._handlers[job_type] = handler
+
+    def register_sweep(self, task):
+        """task() is called in an application context on every sweep, e.g. to finish work a crash left behind."""
+        if task not in self._sweep_tasks:
+            self._sweep_tasks.append(task)
+
+    def submit(self, job_type: str, owner_id: str, payload: dict) -> str:
+        if job_type not in self._handlers:
+            raise ValueError(f"No handler registered for job type '{job_type}'.")
+        now_utc = datetime.now(timezone.utc)
+        job_doc = {
+            "type": job_type,
+            "owner_id": owner_id,
+            "payload": payload,
+            "status": JOB_QUEUED,
+            "cursor": 0,
+            "processed": 0,
+            "total": None,
+            "counters": {},
+            "results": {},
+            "error": None,
+            "created_at": now_utc,
+            "updated_at": now_utc
+        }
+        job_id = self.collection().insert_one(job_doc).inserted_id
+        self._ensure_workers()
+        self._dispatch(job_id)
+        return str(job_id)
+
+    def _dispatch(self, job_id: ObjectId) -> bool:
+        """Hands the job to the local pool unless this process already holds it."""
+        with self._submitted_lock:
+            if job_id in self._submitted:
+                return False
+            self._submitted.add(job_id)
+        self._executor.submit(self._run, job_id)
+        return True
+
+    def get(self, job_id: str, owner_id: str | None = None) -> dict | None:
+        if not ObjectId.is_valid(job_id):
+            return None
+        query = {"_id": ObjectId(job_id)}
+        if owner_id is not None:
+            query["owner_id"] = owner_id
+        return self.collection().find_one(query, {"payload": 0})
+
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for or holding a local worker thread."""
+        return self._executor._work_queue.qsize() if self._executor else 0
+
+    def resume_interrupted(self) -> int:
+        """
+        Re-submits queued jobs and running jobs whose worker stopped sending heartbeats,
+        skipping those already waiting for or running on this process's pool.
+        """
+        stale_before = datetime.now(timezone.utc) - self.stale_after
+        resumable = self.collection().find({
+            "$or": [
+                {"status": JOB_QUEUED, "created_at": {"$lt": stale_before}},
+                {"status": JOB_RUNNING, "heartbeat_at": {"$lt": stale_before}}
+            ]
+        }, {"_id": 1})
+        count = 0
+        for job in resumable:
+            if self._dispatch(job['_id']):
+                count += 1
+        return count
+
+    def _claim(self, job_id: ObjectId) -> dict | None:
+        now_utc = datetime.now(timezone.utc)
+        stale_before = now_utc - self.stale_after
+        return self.collection().find_one_and_update(
+            {
+                "_id": job_id,
+                "$or": [
+                    {"status": JOB_QUEUED},
+                    {"status": JOB_RUNNING, "heartbeat_at": {"$lt": stale_before}}
+                ]
+            },
+            {
+                "$set": {"status": JOB_RUNNING, "worker_id": self.worker_id, "heartbeat_at": now_utc, "updated_at": now_utc},
+                "$inc": {"attempts": 1}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _finish(self, job_id: ObjectId, status: str, summary: dict | None = None, error: str | None = None):
+        now_utc = datetime.now(timezone.utc)
+        self.collection().update_one(
+            {"_id": job_id, "worker_id": self.worker_id},
+            {"$set": {"status": status, "summary": summary, "error": error, "finished_at": now_utc, "updated_at": now_utc}}
+        )
+
+    def _heartbeat(self, job_id: ObjectId, stop: threading.Event):
+        """Refreshes heartbeat_at while the handler runs, so a long chunk is not taken for a dead worker."""
+        interval = self.stale_after.total_seconds() / 4
+        while not stop.wait(interval):
+            try:
+                with self._app.app_context():
+                    result = self.collection().update_one(
+                        {"_id": job_id, "worker_id": self.worker_id, "status": JOB_RUNNING},
+                        {"$set": {"heartbeat_at": datetime.now(timezone.utc)}}
+                    )
+                if result.matched_count == 0:
+                    return
+            except Exception as e:
+                self._app.logger.warning(f"Heartbeat for job {job_id} failed: {e}")
+
+    def _run(self, job_id: ObjectId):
+        try:
+            self._run_claimed(job_id)
+        finally:
+            with self._submitted_lock:
+                self._submitted.discard(job_id)
+
+    def _run_claimed(self, job_id: ObjectId):
+        with self._app.app_context():
+            job = self._claim(job_id)
+            if not job:
+                return
+            handler = self._handlers.get(job['type'])
+            if handler is None:
+                self._finish(job_id, JOB_FAILED, error=f"No handler registered for job type '{job['type']}'.")
+                return
+            started_at = time.monotonic()
+            status = JOB_FAILED
+            stop_heartbeat = threading.Event()
+            threading.Thread(target=self._heartbeat, args=(job_id, stop_heartbeat), daemon=True,
+                             name=f"edba-job-heartbeat-{job_id}").start()
+            try:
+                summary = handler(JobContext(self, job))
+                self._finish(job_id, JOB_COMPLETED, summary=summary)
+                status = JOB_COMPLETED
+            except JobLost as e:
+                current_app.logger.warning(str(e))
+                status = "lost"
+            except JobFailed as e:
+                self._finish(job_id, JOB_FAILED, error=str(e))
+            except Exception as e:
+                current_app.logger.error(f"Job {job_id} ({job['type']}) crashed: {e}", exc_info=True)
+                self._finish(job_id, JOB_FAILED, error=f"Unexpected error: {e}")
+            finally:
+                stop_heartbeat.set()
+            JOBS_FINISHED.inc(type=job['type'], status=status)
+            JOB_DURATION.observe(time.monotonic() - started_at, type=job['type'])
+
+    def _start_sweeper(self, interval: int):
+        def sweep():
+            try:
+                with self._app.app_context():
+                    self.resume_interrupted()
+            except Exception as e:
+                self._app.logger.warning(f"Job sweep failed: {e}")
+            for task in self._sweep_tasks:
+                try:
+                    with self._app.app_context():
+                        task()
+                except Exception as e:
+                    self._app.logger.warning(f"Sweep task {getattr(task, '__qualname__', task)} failed: {e}")
+            self._sweeper = threading.Timer(interval, sweep)
+            self._sweeper.daemon = True
+            self._sweeper.start()
+
+        self._sweeper = threading.Timer(0, sweep)
+        self._sweeper.daemon = True
+        self._sweeper.start()
+
+
+job_engine = JobEngine()
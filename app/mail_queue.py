@@ -0,0 +1,257 @@
+import os
+import smtplib
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from flask import current_app
+from flask_mail import Message
+from pymongo import ReturnDocument
+from .extensions import mongo, mail
+from .metrics import MAIL_MESSAGES, MAIL_SEND_DURATION
+
+# Outbox Status Constants
+MAIL_QUEUED = "queued"
+MAIL_SENDING = "sending"
+MAIL_SENT = "sent"
+MAIL_FAILED = "failed"
+
+# Errors that mean the SMTP connection is gone; the message is retried on a new connection
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, socket.timeout)
+
+
+class MailQueue:
+    """
+    Outbound mail queue backed by the `mail_outbox` collection.
+
+    enqueue() stores the message and wakes the background sender, so request handlers do
+    not wait for SMTP. The sender claims due messages in batches and delivers them over
+    one SMTP connection that stays open between batches (closed after
+    MAIL_QUEUE_IDLE_TIMEOUT seconds without mail). Failed deliveries are retried with
+    exponential backoff until MAIL_QUEUE_MAX_ATTEMPTS; the outcome is kept on the outbox
+    document. Every process runs its own sender; claims are atomic, so each message is
+    sent by one of them.
+    """
+    COLLECTION = "mail_outbox"
+
+    def __init__(self, app=None):
+        self._app = None
+        self._wakeup = threading.Event()
+        self._sender_pid = None
+        self._sender_lock = threading.Lock()
+        self._connection = None
+        self._last_used = 0.0
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.enabled = True
+        self.batch_size = 50
+        self.poll_interval = 5
+        self.max_attempts = 5
+        self.retry_base = 30
+        self.idle_timeout = 60
+        self.claim_timeout = timedelta(minutes=5)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._app = app
+        self.enabled = app.config.get('MAIL_QUEUE_ENABLED', True)
+        self.batch_size = app.config.get('MAIL_QUEUE_BATCH_SIZE', 50)
+        self.poll_interval = app.config.get('MAIL_QUEUE_POLL_INTERVAL', 5)
+        self.max_attempts = app.config.get('MAIL_QUEUE_MAX_ATTEMPTS', 5)
+        self.retry_base = app.config.get('MAIL_QUEUE_RETRY_BASE', 30)
+        self.idle_timeout = app.config.get('MAIL_QUEUE_IDLE_TIMEOUT', 60)
+        self.claim_timeout = app.config.get('MAIL_QUEUE_CLAIM_TIMEOUT', timedelta(minutes=5))
+        app.extensions['mail_queue'] = self
+        if self.enabled:
+            # Started by the first request a process serves (or the first enqueue), not by
+            # CLI commands that merely create the app
+            app.before_request(self._ensure_sender)
+
+    @classmethod
+    def collection(cls):
+        return mongo.db[cls.COLLECTION]
+
+    @staticmethod
+    def _serialize_sender(sender):
+        """A (name, address) sender is stored as a two-item list, an address as a string."""
+        if isinstance(sender, (tuple, list)) and len(sender) == 2:
+            return [str(sender[0]), str(sender[1])]
+        if isinstance(sender, str):
+            return sender
+        raise ValueError(f"Mail sender must be an address or a (name, address) pair, got {sender!r}; check MAIL_DEFAULT_SENDER.")
+
+    @classmethod
+    def _serialize(cls, message: Message) -> dict:
+        return {
+            "subject": message.subject,
+            "sender": cls._serialize_sender(message.sender),
+            "recipients": list(message.recipients),
+            "cc": list(message.cc or []),
+            "bcc": list(message.bcc or []),
+            "reply_to": message.reply_to,
+            "body": message.body,
+            "html": message.html
+        }
+
+    @staticmethod
+    def _deserialize(doc: dict) -> Message:
+        sender = doc["sender"]
+        return Message(
+            subject=doc["subject"],
+            sender=tuple(sender) if isinstance(sender, list) else sender,
+            recipients=doc["recipients"],
+            cc=doc.get("cc") or None,
+            bcc=doc.get("bcc") or None,
+            reply_to=doc.get("reply_to"),
+            body=doc.get("body"),
+            html=doc.get("html")
+        )
+
+    def enqueue(self, message: Message, category: str = "general") -> str:
+        """Stores the message for delivery and returns its outbox id. Attachments are not supported."""
+        if message.attachments:
+            raise ValueError("Queued messages cannot carry attachments.")
+        now_utc = datetime.now(timezone.utc)
+        outbox_doc = {
+            "message": self._serialize(message),
+            "category": category,
+            "status": MAIL_QUEUED,
+            "attempts": 0,
+            "next_attempt_at": now_utc,
+            "last_error": None,
+            "created_at": now_utc,
+            "updated_at": now_utc
+        }
+        message_id = self.collection().insert_one(outbox_doc).inserted_id
+        MAIL_MESSAGES.inc(category=category, status=MAIL_QUEUED)
+        if self.enabled:
+            self._ensure_sender()
+            self._wakeup.set()
+        else:
+            # Queue disabled (e.g. in scripts): deliver right away on a one-off connection
+            self.process_batch(limit=1, message_id=message_id)
+            self.close_connection()
+        return str(message_id)
+
+    def status(self, message_id: str) -> dict | None:
+        if not ObjectId.is_valid(message_id):
+            return None
+        return self.collection().find_one(
+            {"_id": ObjectId(message_id)},
+            {"status": 1, "attempts": 1, "last_error": 1, "sent_at": 1, "next_attempt_at": 1, "category": 1}
+        )
+
+    # --- sender ---
+
+    def _ensure_sender(self):
+        """Starts the sender thread in this process; forked workers start their own on first use."""
+        if self._sender_pid == os.getpid():
+            return
+        with self._sender_lock:
+            if self._sender_pid == os.getpid():
+                return
+            self._sender_pid = os.getpid()
+            threading.Thread(target=self._run_sender, name="mail-sender", daemon=True).start()
+
+    def _run_sender(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                with self._app.app_context():
+                    # Keep going while full batches come back, so a burst drains without waiting
+                    while self.process_batch() == self.batch_size:
+                        pass
+                    if self._connection is not None and time.monotonic() - self._last_used > self.idle_timeout:
+                        self.close_connection()
+            except Exception as e:
+                self._app.logger.error(f"Mail sender loop failed: {e}", exc_info=True)
+                self.close_connection()
+
+    def _claim(self, message_id: ObjectId | None = None) -> dict | None:
+        now_utc = datetime.now(timezone.utc)
+        query = {
+            "$or": [
+                {"status": MAIL_QUEUED, "next_attempt_at": {"$lte": now_utc}},
+                # The sender that claimed it stopped before recording the outcome
+                {"status": MAIL_SENDING, "claimed_at": {"$lt": now_utc - self.claim_timeout}}
+            ]
+        }
+        if message_id is not None:
+            query["_id"] = message_id
+        return self.collection().find_one_and_update(
+            query,
+            {
+                "$set": {"status": MAIL_SENDING, "worker_id": self.worker_id, "claimed_at": now_utc, "updated_at": now_utc},
+                "$inc": {"attempts": 1}
+            },
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _get_connection(self):
+        if self._connection is None:
+            connection = mail.connect()
+            connection.__enter__()
+            self._connection = connection
+        return self._connection
+
+    def close_connection(self):
+        connection, self._connection = self._connection, None
+        if connection is not None and connection.host is not None:
+            try:
+                connection.host.quit()
+            except Exception:
+                connection.host.close()
+
+    def _deliver(self, message: Message):
+        started_at = time.perf_counter()
+        try:
+            self._get_connection().send(message)
+        except CONNECTION_ERRORS:
+            # Server closed the idle connection: reconnect once before counting a failure
+            self.close_connection()
+            self._get_connection().send(message)
+        finally:
+            self._last_used = time.monotonic()
+            MAIL_SEND_DURATION.observe(time.perf_counter() - started_at)
+
+    def _finish(self, outbox_doc: dict, error: Exception | None = None):
+        now_utc = datetime.now(timezone.utc)
+        if error is None:
+            status, update = MAIL_SENT, {"status": MAIL_SENT, "sent_at": now_utc, "last_error": None}
+        elif outbox_doc["attempts"] >= self.max_attempts:
+            status, update = MAIL_FAILED, {"status": MAIL_FAILED, "failed_at": now_utc, "last_error": str(error)}
+        else:
+            delay = self.retry_base * 2 ** (outbox_doc["attempts"] - 1)
+            status, update = MAIL_QUEUED, {
+                "status": MAIL_QUEUED,
+                "next_attempt_at": now_utc + timedelta(seconds=delay),
+                "last_error": str(error)
+            }
+        update["updated_at"] = now_utc
+        self.collection().update_one({"_id": outbox_doc["_id"], "worker_id": self.worker_id}, {"$set": update})
+        MAIL_MESSAGES.inc(category=outbox_doc.get("category", "general"), status="retry" if status == MAIL_QUEUED else status)
+
+    def process_batch(self, limit: int | None = None, message_id: ObjectId | None = None) -> int:
+        """Claims and delivers up to `limit` due messages. Returns how many were claimed."""
+        claimed = 0
+        for _ in range(limit or self.batch_size):
+            outbox_doc = self._claim(message_id)
+            if outbox_doc is None:
+                break
+            claimed += 1
+            try:
+                self._deliver(self._deserialize(outbox_doc["message"]))
+            except Exception as e:
+                current_app.logger.warning(f"Mail {outbox_doc['_id']} to {outbox_doc['message']['recipients']} failed (attempt {outbox_doc['attempts']}): {e}")
+                self.close_connection()
+                self._finish(outbox_doc, error=e)
+            else:
+                self._finish(outbox_doc)
+        return claimed
+
+
+mail_queue = MailQueue()
@@ -0,0 +1,116 @@
+import copy
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import g, has_app_context
+from ..cache import TTLCache
+from ..extensions import mongo
+from .User import User
+
+
+class IdentityService:
+    """
+    Single place to resolve user documents by id or email. Lookups are memoized for the
+    current request (on `g`) and kept in a short-TTL, size-bounded in-process cache, so
+    the user_loader, the admin routes and the datauser hooks share one database read.
+    Code that changes a user document must call invalidate()/invalidate_organization().
+    Callers get their own copy of the document and may modify it.
+    """
+    _cache = TTLCache("users", maxsize=10000, ttl=30)
+
+    @classmethod
+    def init_app(cls, app):
+        cls._cache.configure(maxsize=app.config.get('USER_CACHE_SIZE', 10000), ttl=app.config.get('USER_CACHE_TTL', 30))
+
+    @staticmethod
+    def _request_memo() -> dict | None:
+        if not has_app_context():
+            return None
+        if '_identity_docs' not in g:
+            g._identity_docs = {}
+        return g._identity_docs
+
+    @classmethod
+    def _lookup(cls, key: tuple, query: dict) -> dict | None:
+        memo = cls._request_memo()
+        if memo is not None and key in memo:
+            user_doc = memo[key]
+        else:
+            user_doc = cls._cache.get(key)
+            if user_doc is None:
+                user_doc = mongo.db.users.find_one(query)
+                # Unknown users are not cached, so a newly registered account is found at once.
+                if user_doc is not None:
+                    cls._cache.set(("id", str(user_doc["_id"])), user_doc)
+                    if user_doc.get("email"):
+                        cls._cache.set(("email", user_doc["email"]), user_doc)
+            if memo is not None:
+                memo[key] = user_doc
+        return copy.deepcopy(user_doc) if user_doc is not None else None
+
+    @classmethod
+    def get_user_doc(cls, user_id) -> dict | None:
+        try:
+            object_id = user_id if isinstance(user_id, ObjectId) else ObjectId(user_id)
+        except (InvalidId, TypeError):
+            return None
+        return cls._lookup(("id", str(object_id)), {"_id": object_id})
+
+    @classmethod
+    def get_user_doc_by_email(cls, email: str) -> dict | None:
+        if not email:
+            return None
+        return cls._lookup(("email", email), {"email": email})
+
+    @staticmethod
+    def build_user(user_doc: dict) -> User:
+        """Wraps a user document in the model class of its role."""
+        from app.workspace.models import OConvener
+        from app.admin.models import TAdmin, EAdmin, SeniorEAdmin
+        try:
+            role = int(user_doc.get('role'))
+        except (TypeError, ValueError):
+            return User(user_doc)
+        if role == User.Roles.O_CONVENER.value:
+            return OConvener(user_doc)
+        elif role == User.Roles.E_ADMIN.value:
+            return EAdmin(user_doc)
+        elif role == User.Roles.T_ADMIN.value:
+            return TAdmin(user_doc)
+        elif role == User.Roles.SENIOR_EADMIN.value:
+            return SeniorEAdmin(user_doc)
+        return User(user_doc)
+
+    @classmethod
+    def load_user(cls, user_id: str) -> User | None:
+        """Flask-Login user_loader."""
+        user_doc = cls.get_user_doc(user_id)
+        return cls.build_user(user_doc) if user_doc else None
+
+    @classmethod
+    def _forget_request_memo(cls):
+        if has_app_context():
+            g.pop('_identity_docs', None)
+
+    @classmethod
+    def invalidate(cls, user_id=None, email: str | None = None):
+        cls.invalidate_many([user_id] if user_id is not None else [], [email] if email else [])
+
+    @classmethod
+    def invalidate_many(cls, user_ids=(), emails=()):
+        """Drops several users at once with a single scan of the cache, e.g. after a bulk import."""
+        user_ids = {str(user_id) for user_id in user_ids if user_id is not None}
+        emails = {email for email in emails if email}
+        if not user_ids and not emails:
+            return
+        cls._cache.delete_where(lambda doc: str(doc["_id"]) in user_ids or doc.get("email") in emails)
+        for user_id in user_ids:
+            cls._cache.delete(("id", user_id))
+        for email in emails:
+            cls._cache.delete(("email", email))
+        cls._forget_request_memo()
+
+    @classmethod
+    def invalidate_organization(cls, organization_id: str):
+        """Drops the cached documents of every member of an organization (e.g. after a rename)."""
+        cls._cache.delete_where(lambda doc: doc.get("organization_id") == organization_id)
+        cls._forget_request_memo()
@@ -1,81 +1,142 @@
 from datetime import datetime
 from bson import ObjectId
+from flask import current_app
+from pymongo import ReturnDocument
 from .. import mongo
+from ..pagination import fetch_page
+from ..status_counters import StatusCounters
+
+HELP_PENDING = "pending"
+HELP_ANSWERED = "answered"
+
+# Pending/answered badges come from these counters instead of counting the collection
+help_counters = StatusCounters("help")
+
 
 class Help:
-    def __init__(self, question, user_id, answer=None, created_at=None, updated_at=None, _id=None, answered_at=None):
+    """
+    A help desk question in the `help` collection, the one store behind /help, /help/admin
+    and the T-Admin dashboard. Lists are paged newest first with keyset cursors on
+    (created_at, _id) and T-Admins search question and answer bodies through a text index.
+    """
+
+    def __init__(self, question, user_id, answer=None, created_at=None, updated_at=None, _id=None, answered_at=None,
+                 status=HELP_PENDING, answered_by=None):
         self.question = question
         self.user_id = user_id
         self.answer = answer
         self._id = _id
+        self.status = status
+        self.answered_by = answered_by
         self.created_at = created_at or datetime.utcnow()
-        self.updated_at = updated_at or datetime.utcnow()
-        self.answered_at = updated_at or datetime.utcnow()
+        self.updated_at = updated_at or self.created_at
+        self.answered_at = answered_at
+
+    @classmethod
+    def from_document(cls, help_data):
+        if not help_data:
+            return None
+        return cls(
+            _id=help_data.get('_id'),
+            question=help_data.get('question'),
+            user_id=help_data.get('user_id'),
+            answer=help_data.get('answer'),
+            created_at=help_data.get('created_at'),
+            updated_at=help_data.get('updated_at'),
+            answered_at=help_data.get('answered_at'),
+            status=help_data.get('status') or (HELP_ANSWERED if help_data.get('answer') else HELP_PENDING),
+            answered_by=help_data.get('answered_by')
+        )
+
+    @staticmethod
+    def page_size():
+        return current_app.config.get('HELP_PAGE_SIZE', 20)
+
     @staticmethod
     def create(question, user_id):
+        now = datetime.utcnow()
         help_data = {
             'question': question,
             'user_id': user_id,
-            'created_at': datetime.utcnow(),
-            'updated_at': datetime.utcnow(),
-            'status': "pending"
+            'created_at': now,
+            'updated_at': now,
+            'status': HELP_PENDING
         }
         result = mongo.db.help.insert_one(help_data)
+        help_counters.move(None, HELP_PENDING)
         return result.inserted_id
 
     @staticmethod
     def get_by_id(help_id):
-        help_data = mongo.db.help.find_one({'_id': ObjectId(help_id)})
-        if help_data:
-            return Help(
-                _id=help_data.get('_id'),
-                question=help_data['question'],
-                user_id=help_data['user_id'],
-                answer=help_data.get('answer'),
-                created_at=help_data['created_at'],
-                updated_at=help_data['updated_at']
-            )
-        return None
+        if not ObjectId.is_valid(help_id):
+            return None
+        return Help.from_document(mongo.db.help.find_one({'_id': ObjectId(help_id)}))
 
     @staticmethod
-    def get_user_questions(user_id):
-        questions = []
-        for help_data in mongo.db.help.find({'user_id': str(user_id)}).sort('created_at', -1):
-            questions.append(Help(
-                _id=help_data.get('_id'),
-                question=help_data['question'],
-                user_id=help_data['user_id'],
-                answer=help_data.get('answer'),
-                created_at=help_data['created_at'],
-                updated_at=help_data['updated_at']
-            ))
-        return questions
+    def get_user_questions(user_id, cursor=None, limit=None):
+        """One page of a user's questions, newest first. Returns (questions, next_cursor or None)."""
+        docs, next_cursor = fetch_page(
+            mongo.db.help, {'user_id': str(user_id)}, 'created_at', cursor, limit or Help.page_size(), descending=True
+        )
+        return [Help.from_document(doc) for doc in docs], next_cursor
 
     @staticmethod
-    def get_all_questions():
-        questions = []
-        for help_data in mongo.db.help.find().sort('created_at', -1):
-            questions.append(Help(
-                _id=help_data.get('_id'),
-                question=help_data['question'],
-                user_id=help_data['user_id'],
-                answer=help_data.get('answer'),
-                created_at=help_data['created_at'],
-                updated_at=help_data['updated_at'],
-            ))
-        return questions
-    
-    def save(self, help_id: ObjectId, answer: str, answer_by: str):
-        print(help_id)
-        print(answer)
-        mongo.db.help.update_one(
-            {'_id': help_id},
+    def get_questions(status=None, cursor=None, limit=None):
+        """One page of all questions, or of those in `status`, newest first. Returns (questions, next_cursor or None)."""
+        query = {'status': status} if status else {}
+        docs, next_cursor = fetch_page(mongo.db.help, query, 'created_at', cursor, limit or Help.page_size(), descending=True)
+        return [Help.from_document(doc) for doc in docs], next_cursor
+
+    @staticmethod
+    def search(text, status=None, limit=None):
+        """Questions whose question or answer matches `text` (MongoDB text search), best match first."""
+        query = {'$text': {'$search': text}}
+        if status:
+            query['status'] = status
+        docs = mongo.db.help.find(query, {'score': {'$meta': 'textScore'}}) \
+            .sort([('score', {'$meta': 'textScore'})]) \
+            .limit(limit or current_app.config.get('HELP_SEARCH_LIMIT', 50))
+        return [Help.from_document(doc) for doc in docs]
+
+    @staticmethod
+    def answer_question(help_id, answer, answered_by):
+        """
+        Answers a question that has not been answered yet. The conditional update makes
+        a second answer to the same question fail instead of overwriting the first.
+        Returns (success, message).
+        """
+        if not ObjectId.is_valid(help_id):
+            return False, "Question not found."
+        if not answer or not answer.strip():
+            return False, "The answer cannot be empty."
+        now = datetime.utcnow()
+        previous = mongo.db.help.find_one_and_update(
+            {'_id': ObjectId(help_id), 'status': {'$ne': HELP_ANSWERED}},
             {
                 '$set': {
-                    'answer': answer,
-                    'answered_at': datetime.utcnow(),
-                    'answered_by': answer_by,
-                    'status': "answered"
+                    'answer': answer.strip(),
+                    'answered_at': now,
+                    'answered_by': answered_by,
+                    'updated_at': now,
+                    'status': HELP_ANSWERED
                 }
-            }
-        ) 
\ No newline at end of file
+            },
+            projection={'status': 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        if previous is None:
+            if mongo.db.help.count_documents({'_id': ObjectId(help_id)}, limit=1):
+                return False, "This question has already been answered."
+            return False, "Question not found."
+        help_counters.move(previous.get('status'), HELP_ANSWERED)
+        return True, "Answer submitted successfully."
+
+    @staticmethod
+    def status_counts():
+        """{status: number of questions} from the maintained counters."""
+        counts = help_counters.counts()
+        return {HELP_PENDING: counts.get(HELP_PENDING, 0), HELP_ANSWERED: counts.get(HELP_ANSWERED, 0)}
+
+    @staticmethod
+    def pending_count():
+        return Help.status_counts()[HELP_PENDING]
@@ -1,9 +1,10 @@
+import time
 from flask import jsonify, render_template, request, redirect, url_for, flash
+from pymongo.errors import PyMongoError
 from . import main_bp
 from ..extensions import mongo
 from flask_login import login_required, current_user
-from .help import Help
-from bson import ObjectId
+from .help import Help, HELP_PENDING, HELP_ANSWERED
 from .User import User
 
 
@@ -18,8 +19,13 @@ def home():
 
 @main_bp.route("/ping")
 def ping():
-    mongo.db.ping.insert_one({"ping": "pong"})
-    return jsonify({"message": "pong"})
+    """Liveness probe: checks the database with a server ping instead of writing a document."""
+    started_at = time.perf_counter()
+    try:
+        mongo.cx.admin.command("ping")
+    except PyMongoError as e:
+        return jsonify({"message": "database unavailable", "error": str(e)}), 503
+    return jsonify({"message": "pong", "db_ms": round((time.perf_counter() - started_at) * 1000, 2)})
 
 @main_bp.route('/help', methods=['GET', 'POST'])
 @login_required
@@ -33,28 +39,24 @@ def help_page():
             flash('Your question has been submitted successfully!', 'success')
             return redirect(url_for('main.help_page'))
 
-    # For regular users, show their questions
-    user_questions = Help.get_user_questions(current_user.user_id)
-    return render_template('help/help.html', questions=user_questions)
+    # For regular users, show one page of their questions
+    cursor = request.args.get('cursor')
+    user_questions, next_cursor = Help.get_user_questions(current_user.user_id, cursor=cursor)
+    return render_template('help/help.html', questions=user_questions, cursor=cursor, next_cursor=next_cursor)
 
 @main_bp.route('/help/answer/<help_id>', methods=['POST'])
 @login_required
 def answer_question(help_id):
-    print(help_id)
     if current_user.role.value != 1:  # Only TAdmin can answer
         flash('You are not authorized to answer questions.', 'error')
         return redirect(url_for('main.help_page'))
-    
-    answer = request.form.get('answer')
 
-    help_entry = Help.get_by_id(help_id)
-    if not help_entry:
-        flash('Question not found.', 'error')
-        return redirect(url_for('main.admin_help_page'))
-    
-    help_entry.answer = answer
-    help_entry.save(ObjectId(help_id), answer=help_entry.answer, answer_by=current_user.username)
-    flash('Answer submitted successfully.', 'success')
+    success, message = Help.answer_question(help_id, request.form.get('answer'), current_user.username)
+    flash(message, 'success' if success else 'error')
+    next_page = request.form.get('next')
+    # Only same-site paths, e.g. the T-Admin dashboard the form was posted from
+    if next_page and next_page.startswith('/') and not next_page.startswith('//'):
+        return redirect(next_page)
     return redirect(url_for('main.admin_help_page'))
 
 @main_bp.route('/help/admin')
@@ -63,9 +65,18 @@ def admin_help_page():
     if current_user.role.value != 1:  # Only TAdmin can access
         flash('You are not authorized to view this page.', 'error')
         return redirect(url_for('main.home'))
-    
-    questions = Help.get_all_questions()
-    return render_template('help/admin_help.html', questions=questions)
+
+    status = request.args.get('status') or None
+    if status not in (None, HELP_PENDING, HELP_ANSWERED):
+        status = None
+    search_text = request.args.get('q', '').strip()
+    cursor = request.args.get('cursor')
+    if search_text:
+        questions, next_cursor = Help.search(search_text, status=status), None
+    else:
+        questions, next_cursor = Help.get_questions(status=status, cursor=cursor)
+    return render_template('help/admin_help.html', questions=questions, status_filter=status, search_text=search_text,
+                           cursor=cursor, next_cursor=next_cursor, status_counts=Help.status_counts())
 
 # @main_bp.route("/search")
 # def search():
@@ -0,0 +1,350 @@
+import glob
+import json
+import math
+import os
+import threading
+import time
+from flask import Response, g, request
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), registry: 'MetricsRegistry' = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._samples: dict[tuple, any] = {}
+        self._lock = threading.Lock()
+        (registry or metrics_registry).register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "help": self.documentation,
+                "labelnames": list(self.labelnames),
+                "samples": [[list(key), value] for key, value in self._samples.items()]
+            }
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._samples[key] = self._samples.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """Gauges are summed over the live worker processes in multiprocess mode."""
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._function = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._samples[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._samples[key] = self._samples.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function):
+        """Read the (unlabelled) value from function() whenever the metrics are collected."""
+        self._function = function
+
+    def snapshot(self) -> dict:
+        if self._function is not None:
+            try:
+                self.set(self._function())
+            except Exception:
+                pass
+        return super().snapshot()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            sample = self._samples.get(key)
+            if sample is None:
+                sample = self._samples[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample["buckets"][position] += 1
+                    break
+            sample["sum"] += value
+            sample["count"] += 1
+
+    def snapshot(self) -> dict:
+        data = super().snapshot()
+        data["buckets"] = list(self.buckets)
+        return data
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra: tuple = ()) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """
+    Holds the process' metrics and renders them in the Prometheus text exposition format.
+    With METRICS_MULTIPROC_DIR set, every worker writes its samples to
+    <dir>/metrics-<pid>.json (every METRICS_FLUSH_INTERVAL seconds and on each scrape) and
+    /metrics merges all files, so any worker can answer the scrape. Clear the directory on
+    deploy, as counters of exited workers are kept.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self.multiproc_dir = None
+        self.flush_interval = 5
+        self._flusher_pid = None
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered.")
+        self._metrics[metric.name] = metric
+
+    def collect(self) -> dict[str, dict]:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    # --- multiprocess mode ---
+
+    def _process_file(self, pid: int) -> str:
+        return os.path.join(self.multiproc_dir, f"metrics-{pid}.json")
+
+    def flush(self):
+        if not self.multiproc_dir:
+            return
+        path = self._process_file(os.getpid())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.collect(), f)
+        os.replace(tmp_path, path)
+
+    def ensure_flusher(self):
+        """Starts the flush thread in this process; called per request so forked workers get their own."""
+        if not self.multiproc_dir or self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+
+        def run():
+            while True:
+                time.sleep(self.flush_interval)
+                try:
+                    self.flush()
+                except OSError:
+                    pass
+
+        threading.Thread(target=run, name="metrics-flusher", daemon=True).start()
+
+    @staticmethod
+    def _alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def _merged(self) -> dict[str, dict]:
+        self.flush()
+        merged: dict[str, dict] = {}
+        for path in glob.glob(os.path.join(self.multiproc_dir, "metrics-*.json")):
+            try:
+                pid = int(os.path.basename(path)[len("metrics-"):-len(".json")])
+                with open(path, encoding='utf-8') as f:
+                    snapshot = json.load(f)
+            except (ValueError, OSError):
+                continue
+            alive = self._alive(pid)
+            for name, data in snapshot.items():
+                if data["kind"] == "gauge" and not alive:
+                    continue
+                target = merged.setdefault(name, dict(data, samples={}))
+                for key, value in data["samples"]:
+                    key = tuple(key)
+                    if data["kind"] == "histogram":
+                        current = target["samples"].setdefault(key, {"buckets": [0] * len(value["buckets"]), "sum": 0.0, "count": 0})
+                        current["buckets"] = [a + b for a, b in zip(current["buckets"], value["buckets"])]
+                        current["sum"] += value["sum"]
+                        current["count"] += value["count"]
+                    else:
+                        target["samples"][key] = target["samples"].get(key, 0.0) + value
+        for data in merged.values():
+            data["samples"] = [[list(key), value] for key, value in data["samples"].items()]
+        return merged
+
+    def render(self) -> str:
+        snapshots = self._merged() if self.multiproc_dir else self.collect()
+        lines = []
+        for name, data in sorted(snapshots.items()):
+            lines.append(f"# HELP {name} {data['help']}")
+            lines.append(f"# TYPE {name} {data['kind']}")
+            labelnames = data["labelnames"]
+            for key, value in sorted(data["samples"], key=lambda sample: sample[0]):
+                if data["kind"] == "histogram":
+                    cumulative = 0
+                    for bound, count in zip(data["buckets"], value["buckets"]):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(labelnames, key, (('le', _format_value(bound)),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(labelnames, key, (('le', '+Inf'),))} {value['count']}")
+                    lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(value['sum'])}")
+                    lines.append(f"{name}_count{_format_labels(labelnames, key)} {value['count']}")
+                else:
+                    lines.append(f"{name}{_format_labels(labelnames, key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+# Requests
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time spent handling a request.", ("blueprint", "endpoint", "method", "status"))
+
+# Outbound service dispatcher
+DISPATCHER_REQUESTS = Counter(
+    "dispatcher_requests_total", "Calls to organization service endpoints.", ("provider", "outcome"))
+DISPATCHER_LATENCY = Histogram(
+    "dispatcher_request_duration_seconds", "Latency of calls to organization service endpoints.", ("provider",))
+
+# Requests refused by the rate limiter
+RATE_LIMITED = Counter("rate_limited_requests_total", "Requests refused with 429, by limit scope and endpoint.", ("scope", "endpoint"))
+
+# Caches: hit ratio = hits / (hits + misses)
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by result (hit or miss).", ("cache", "result"))
+
+# Background jobs
+JOBS_FINISHED = Counter("jobs_finished_total", "Background jobs finished, by type and final status.", ("type", "status"))
+JOB_DURATION = Histogram(
+    "job_duration_seconds", "Run time of background jobs.", ("type",), buckets=(1, 5, 15, 60, 300, 900, 3600))
+JOB_QUEUE_DEPTH = Gauge("job_queue_depth", "Jobs waiting for a local worker thread.")
+
+# Outbound mail queue: status is queued, sent, retry or failed
+MAIL_MESSAGES = Counter("mail_messages_total", "Outbound mail messages by category and status.", ("category", "status"))
+MAIL_SEND_DURATION = Histogram("mail_send_duration_seconds", "Time spent handing one message to the SMTP server.")
+
+# MongoDB connection pool
+MONGO_POOL_OPEN = Gauge("mongo_pool_connections", "Open connections in the MongoDB pool.", ("address",))
+MONGO_POOL_CHECKED_OUT = Gauge("mongo_pool_checked_out", "MongoDB connections currently in use.", ("address",))
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures_total", "Failed attempts to get a MongoDB connection.", ("address", "reason"))
+
+
+def _address(event) -> str:
+    host, port = event.address
+    return f"{host}:{port}"
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        MONGO_POOL_OPEN.inc(address=_address(event))
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_OPEN.dec(address=_address(event))
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        MONGO_POOL_CHECKOUT_FAILURES.inc(address=_address(event), reason=str(event.reason))
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_CHECKED_OUT.inc(address=_address(event))
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.dec(address=_address(event))
+
+
+class Metrics:
+    """Flask extension: request latency histograms and the /metrics endpoint."""
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.pool_listener = PoolMetricsListener()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        if not self.enabled:
+            return
+        metrics_registry.multiproc_dir = app.config.get('METRICS_MULTIPROC_DIR')
+        metrics_registry.flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', 5)
+        if metrics_registry.multiproc_dir:
+            os.makedirs(metrics_registry.multiproc_dir, exist_ok=True)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    def event_listeners(self) -> list:
+        return [self.pool_listener] if self.enabled else []
+
+    def _start_request(self):
+        g._metrics_started_at = time.perf_counter()
+        metrics_registry.ensure_flusher()
+
+    def _finish_request(self, response):
+        started_at = g.pop('_metrics_started_at', None)
+        if started_at is not None and request.endpoint != 'metrics':
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - started_at,
+                blueprint=request.blueprint or "", endpoint=request.endpoint or "unmatched",
+                method=request.method, status=response.status_code
+            )
+        return response
+
+    @staticmethod
+    def metrics_view():
+        return Response(metrics_registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+metrics = Metrics()
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(doc: dict, field: str) -> str:
+    """'<field value in epoch ms>.<_id>' of the last document on a page; the time is empty when the field is missing."""
+    value = doc.get(field)
+    millis = "" if value is None else str((value.replace(tzinfo=timezone.utc) - _EPOCH) // timedelta(milliseconds=1))
+    return f"{millis}.{doc['_id']}"
+
+
+def cursor_filter(cursor: str, field: str, descending: bool = False) -> dict | None:
+    """
+    Query for the documents after `cursor` in (field, _id) order, or None when the cursor
+    is malformed. Documents without the field sort before all others, as in MongoDB.
+    """
+    millis, _, doc_id = cursor.partition(".")
+    if not ObjectId.is_valid(doc_id) or (millis and not millis.lstrip("-").isdigit()):
+        return None
+    doc_id = ObjectId(doc_id)
+    beyond = "$lt" if descending else "$gt"
+    if not millis:
+        missing_field_after = {field: None, "_id": {beyond: doc_id}}
+        return missing_field_after if descending else {"$or": [missing_field_after, {field: {"$ne": None}}]}
+    value = _EPOCH + timedelta(milliseconds=int(millis))
+    after = [{field: {beyond: value}}, {field: value, "_id": {beyond: doc_id}}]
+    if descending:
+        after.append({field: None})
+    return {"$or": after}
+
+
+def fetch_page(collection, query: dict, field: str, cursor: str | None, limit: int,
+               projection: dict | None = None, descending: bool = False) -> tuple[list[dict], str | None]:
+    """
+    One page of `query` ordered by (field, _id) with keyset pagination: `cursor` is the
+    next_cursor of the previous page, so with an index on (equality fields, field, _id)
+    every page is a single range scan however deep it is. A malformed cursor starts from
+    the first page. Returns (documents, next_cursor or None on the last page).
+    """
+    after = cursor_filter(cursor, field, descending) if cursor else None
+    if after:
+        query = {"$and": [query, after]}
+    direction = -1 if descending else 1
+    docs = list(collection.find(query, projection).sort([(field, direction), ("_id", direction)]).limit(limit + 1))
+    next_cursor = encode_cursor(docs[limit - 1], field) if len(docs) > limit else None
+    return docs[:limit], next_cursor
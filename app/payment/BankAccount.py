@@ -2,6 +2,9 @@ from datetime import datetime
 from typing import Optional
 from bson import ObjectId
 from ..extensions import mongo
+from .Ledger import Ledger, EXTERNAL_ACCOUNT, TRANSFER_OK, TRANSFER_REPLAYED
+
+EDBA_ACCOUNT_NUMBER = "596117071864958"
 
 class BankAccount:
     def __init__(self, account_number: str, account_holder: str, organization_id: str, balance: float = 0.0):
@@ -60,34 +63,38 @@ class BankAccount:
         account._id = result.inserted_id
         return account
 
-    def deposit(self, amount: float) -> bool:
+    @classmethod
+    def get_edba_account(cls) -> Optional['BankAccount']:
+        """Get the EDBA account that collects membership fees and purchases"""
+        account_data = mongo.db.BANK_ACCOUNT.find_one({"account": EDBA_ACCOUNT_NUMBER})
+        if account_data:
+            return cls.from_dict(account_data)
+        return None
+
+    def _refresh_balance(self):
+        account_data = mongo.db.BANK_ACCOUNT.find_one({"_id": self._id}, {"balance": 1, "updated_at": 1})
+        if account_data:
+            self.balance = account_data.get("balance", self.balance)
+
+    def deposit(self, amount: float, idempotency_key: Optional[str] = None) -> bool:
         if amount <= 0:
             return False
-        self.balance += amount
-        self.updated_at = datetime.utcnow()
-        mongo.db.BANK_ACCOUNT.update_one(
-            {"_id": self._id},
-            {"$set": {"balance": self.balance, "updated_at": self.updated_at}}
-        )
-        return True
+        result, _ = Ledger.transfer(EXTERNAL_ACCOUNT, self._id, amount, "deposit", idempotency_key=idempotency_key)
+        self._refresh_balance()
+        return result in (TRANSFER_OK, TRANSFER_REPLAYED)
 
-    def withdraw(self, amount: float) -> bool:
-        if amount <= 0 or amount > self.balance:
+    def withdraw(self, amount: float, idempotency_key: Optional[str] = None) -> bool:
+        if amount <= 0:
             return False
-        self.balance -= amount
-        self.updated_at = datetime.utcnow()
-        mongo.db.BANK_ACCOUNT.update_one(
-            {"_id": self._id},
-            {"$set": {"balance": self.balance, "updated_at": self.updated_at}}
-        )
-        return True
+        result, _ = Ledger.transfer(self._id, EXTERNAL_ACCOUNT, amount, "withdrawal", idempotency_key=idempotency_key)
+        self._refresh_balance()
+        return result in (TRANSFER_OK, TRANSFER_REPLAYED)
 
-    def transfer_membership_fee(self, edba_account: '596117071864958', amount: float) -> bool:
+    def transfer_membership_fee(self, edba_account: 'BankAccount', amount: float, idempotency_key: Optional[str] = None) -> bool:
         """Transfer membership fee to EDBA account"""
-        if not self.withdraw(amount):
-            return False
-        if not edba_account.deposit(amount):
-            # If deposit fails, rollback withdrawal
-            self.deposit(amount)
+        if amount <= 0:
             return False
-        return True
+        result, _ = Ledger.transfer(self._id, edba_account._id, amount, "membership_fee", idempotency_key=idempotency_key)
+        self._refresh_balance()
+        edba_account._refresh_balance()
+        return result in (TRANSFER_OK, TRANSFER_REPLAYED)
@@ -0,0 +1,187 @@
+from datetime import datetime, timezone
+from typing import Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from ..extensions import mongo
+from .BankAccount import BankAccount
+from .Ledger import Ledger, TRANSFER_OK, TRANSFER_REPLAYED
+
+SETTLEMENT_PENDING = "pending"
+SETTLEMENT_SETTLED = "settled"
+SETTLEMENT_REJECTED = "rejected"
+
+
+class FeeSettlement:
+    """
+    Settles the membership fees of a batch of members with one ledger transfer from the
+    organization account to the EDBA account, instead of a withdraw/deposit pair per member.
+    The per-member breakdown is kept on the settlement document in FEE_SETTLEMENTS.
+    """
+    COLLECTION = "FEE_SETTLEMENTS"
+    MAX_ATTEMPTS = 3
+
+    @classmethod
+    def collection(cls):
+        return mongo.db[cls.COLLECTION]
+
+    @classmethod
+    def _select_payable_lines(cls, balance: float, lines: list[dict]) -> tuple[list[dict], float]:
+        """Walks the lines in order and keeps every fee that still fits in the remaining balance."""
+        payable = []
+        remaining = balance
+        total = 0.0
+        for line in lines:
+            if line['fee'] <= remaining:
+                payable.append(line)
+                remaining -= line['fee']
+                total += line['fee']
+        return payable, round(total, 2)
+
+    @staticmethod
+    def _ledger_key(settlement: dict) -> str:
+        # Settlements made before per-attempt keys used the bare settlement id
+        attempt = settlement.get('attempt')
+        return f"fee-settlement:{settlement['_id']}:{attempt}" if attempt else f"fee-settlement:{settlement['_id']}"
+
+    @staticmethod
+    def _paid_lines(settlement: dict) -> tuple[str, set]:
+        refunded = {line_id for refund in settlement.get('refunds', []) for line_id in refund['line_ids']}
+        return str(settlement['_id']), {line['line_id'] for line in settlement['lines'] if line['line_id'] not in refunded}
+
+    @classmethod
+    def _resume(cls, settlement: dict) -> Optional[tuple[Optional[str], set]]:
+        """
+        Outcome of an existing settlement for the same reference, or None when the caller
+        should (re)try charging it. A pending settlement is in flight: its ledger entry is
+        finished with Ledger.recover_entry instead of charging the fees a second time.
+        """
+        now_utc = datetime.now(timezone.utc)
+        if settlement['status'] == SETTLEMENT_SETTLED:
+            return cls._paid_lines(settlement)
+        if settlement['status'] == SETTLEMENT_PENDING:
+            recovered = Ledger.recover_entry(cls._ledger_key(settlement)) if settlement.get('lines') else None
+            if recovered is None:
+                # Claimed but no transfer was started; charge it now under the same document
+                return None
+            result, entry = recovered
+            if result in (TRANSFER_OK, TRANSFER_REPLAYED):
+                cls.collection().update_one({"_id": settlement['_id']}, {"$set": {"status": SETTLEMENT_SETTLED, "ledger_entry_id": entry['_id'], "updated_at": now_utc}})
+                return cls._paid_lines(settlement)
+            cls.collection().update_one({"_id": settlement['_id'], "status": SETTLEMENT_PENDING}, {"$set": {"status": SETTLEMENT_REJECTED, "failure": result, "updated_at": now_utc}})
+        # Rejected before: retry on the same document, unless another run claimed the retry first
+        claimed = cls.collection().update_one({"_id": settlement['_id'], "status": SETTLEMENT_REJECTED}, {"$set": {"status": SETTLEMENT_PENDING, "updated_at": now_utc}})
+        return None if claimed.modified_count else (None, set())
+
+    @classmethod
+    def settle(cls, payer: BankAccount, payee: BankAccount, organization_id: str, lines: list[dict], reference: Optional[str] = None) -> tuple[Optional[str], set]:
+        """
+        lines: [{"line_id": ..., "email": ..., "fee": ...}] in the order they should be charged.
+        Reads the payer balance once, keeps the fees that fit (same outcome as charging them one by
+        one), and moves their total with a single balance-guarded ledger transfer.
+        A `reference` (e.g. import job + chunk) makes the call idempotent: the settlement
+        document for it is claimed by inserting it under a unique index, and a repeated call
+        returns the paid lines of that settlement (finishing it first if it is still pending)
+        instead of charging again.
+        Returns (settlement id, line ids that were paid).
+        """
+        lines = [line for line in lines if line['fee'] > 0]
+        if not lines:
+            return None, set()
+
+        now_utc = datetime.now(timezone.utc)
+        settlement = {
+            "organization_id": organization_id,
+            "payer_account": payer.account_number,
+            "payee_account": payee.account_number,
+            "reference": reference,
+            "total": 0.0,
+            "refunded": 0.0,
+            "lines": [],
+            "refunds": [],
+            "attempt": 0,
+            "status": SETTLEMENT_PENDING,
+            "created_at": now_utc,
+            "updated_at": now_utc
+        }
+        try:
+            cls.collection().insert_one(settlement)
+        except DuplicateKeyError:
+            settlement = cls.collection().find_one({"reference": reference})
+            outcome = cls._resume(settlement)
+            if outcome is not None:
+                return outcome
+
+        accounts = mongo.db.BANK_ACCOUNT
+        for _ in range(cls.MAX_ATTEMPTS):
+            payer_doc = accounts.find_one({"_id": payer._id}, {"balance": 1})
+            payable, total = cls._select_payable_lines(payer_doc.get("balance", 0.0), lines) if payer_doc else ([], 0.0)
+            if not payable:
+                cls.collection().update_one({"_id": settlement['_id']}, {"$set": {"status": SETTLEMENT_REJECTED, "failure": "NOTHING_PAYABLE", "updated_at": now_utc}})
+                return None, set()
+
+            # Record what this attempt charges before the transfer, so a re-run can finish it
+            settlement = cls.collection().find_one_and_update(
+                {"_id": settlement['_id']},
+                {
+                    "$set": {
+                        "status": SETTLEMENT_PENDING,
+                        "total": total,
+                        "lines": [{"line_id": line['line_id'], "email": line['email'], "fee": line['fee']} for line in payable],
+                        "updated_at": now_utc
+                    },
+                    "$inc": {"attempt": 1}
+                },
+                return_document=ReturnDocument.AFTER
+            )
+
+            # The ledger debit is guarded by the balance; if another charge got there first,
+            # re-read the balance and select again.
+            result, entry = Ledger.transfer(
+                payer._id, payee._id, total, "membership_fee",
+                idempotency_key=cls._ledger_key(settlement),
+                reference={"settlement_id": str(settlement['_id']), "organization_id": organization_id}
+            )
+            if result not in (TRANSFER_OK, TRANSFER_REPLAYED):
+                cls.collection().update_one({"_id": settlement['_id']}, {"$set": {"status": SETTLEMENT_REJECTED, "failure": result, "updated_at": now_utc}})
+                continue
+
+            cls.collection().update_one({"_id": settlement['_id']}, {"$set": {"status": SETTLEMENT_SETTLED, "ledger_entry_id": entry['_id'], "updated_at": now_utc}})
+            payer.balance = payer_doc.get("balance", 0.0) - total
+            payee.balance += total
+            return str(settlement['_id']), {line['line_id'] for line in payable}
+        return None, set()
+
+    @classmethod
+    def refund(cls, settlement_id: str, payer: BankAccount, payee: BankAccount, line_ids: set) -> float:
+        """Returns the fees of lines whose member could not be written back to the organization."""
+        if not settlement_id or not line_ids:
+            return 0.0
+        settlement = cls.collection().find_one({"_id": ObjectId(settlement_id)})
+        if not settlement:
+            return 0.0
+        already_refunded = {line_id for refund in settlement.get('refunds', []) for line_id in refund['line_ids']}
+        refundable_ids = [line['line_id'] for line in settlement['lines'] if line['line_id'] in line_ids and line['line_id'] not in already_refunded]
+        amount = round(sum(line['fee'] for line in settlement['lines'] if line['line_id'] in refundable_ids), 2)
+        if amount <= 0:
+            return 0.0
+
+        now_utc = datetime.now(timezone.utc)
+        result, entry = Ledger.transfer(
+            payee._id, payer._id, amount, "membership_fee_refund",
+            idempotency_key=f"fee-refund:{settlement['_id']}:{len(settlement.get('refunds', []))}",
+            reference={"settlement_id": settlement_id, "line_ids": refundable_ids}
+        )
+        if result not in (TRANSFER_OK, TRANSFER_REPLAYED):
+            return 0.0
+        cls.collection().update_one(
+            {"_id": settlement['_id']},
+            {
+                "$inc": {"refunded": amount},
+                "$push": {"refunds": {"line_ids": refundable_ids, "amount": amount, "ledger_entry_id": entry['_id'], "created_at": now_utc}},
+                "$set": {"updated_at": now_utc}
+            }
+        )
+        payer.balance += amount
+        payee.balance -= amount
+        return amount
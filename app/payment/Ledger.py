@@ -0,0 +1,302 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import click
+from bson import ObjectId
+from flask import current_app
+from flask.cli import AppGroup
+from pymongo import DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from ..extensions import mongo
+from ..indexes import IndexRegistry
+
+# Ledger entry status
+ENTRY_PENDING = "pending"
+ENTRY_POSTED = "posted"
+ENTRY_FAILED = "failed"
+
+# Result codes returned by Ledger.transfer
+TRANSFER_OK = "OK"
+TRANSFER_REPLAYED = "REPLAYED"
+TRANSFER_INSUFFICIENT_FUNDS = "INSUFFICIENT_FUNDS"
+TRANSFER_ACCOUNT_NOT_FOUND = "ACCOUNT_NOT_FOUND"
+TRANSFER_INVALID_AMOUNT = "INVALID_AMOUNT"
+TRANSFER_IN_PROGRESS = "IN_PROGRESS"
+TRANSFER_KEY_CONFLICT = "IDEMPOTENCY_KEY_CONFLICT"
+
+# Counterparty for money entering or leaving the platform (bank deposits, withdrawals)
+EXTERNAL_ACCOUNT = "EXTERNAL"
+
+
+class Ledger:
+    """
+    Append-only double-entry ledger for BANK_ACCOUNT balances.
+
+    Every movement of money is one LEDGER_ENTRIES document naming the account that is
+    debited and the account that is credited. Balances on BANK_ACCOUNT are only ever
+    changed with $inc, the debit guarded by `balance >= amount`, and each account keeps
+    the ids of entries it has applied but not yet seen posted in `ledger_pending`, which
+    makes every step safe to retry. BALANCE_SNAPSHOTS lets a balance be rebuilt from the
+    last snapshot plus the entries posted after it instead of from the full history.
+    """
+    ENTRIES = "LEDGER_ENTRIES"
+    SNAPSHOTS = "BALANCE_SNAPSHOTS"
+    SNAPSHOT_EVERY = 100                  # snapshot an account after this many applied entries
+    SNAPSHOT_LAG = timedelta(seconds=30)  # entries posted within this window are left to the next snapshot
+    _indexes_ready = False
+
+    @classmethod
+    def entries(cls):
+        return mongo.db[cls.ENTRIES]
+
+    @classmethod
+    def snapshots(cls):
+        return mongo.db[cls.SNAPSHOTS]
+
+    @classmethod
+    def ensure_indexes(cls):
+        """The ledger indexes are declared in app/indexes.py."""
+        _, errors = IndexRegistry.ensure([cls.ENTRIES, cls.SNAPSHOTS])
+        if errors:
+            raise OperationFailure("; ".join(errors))
+
+    @classmethod
+    def transfer(cls, from_account_id, to_account_id, amount: float, kind: str,
+                 idempotency_key: Optional[str] = None, reference: Optional[dict] = None) -> tuple[str, Optional[dict]]:
+        """
+        Moves `amount` from one BANK_ACCOUNT to another (either side may be EXTERNAL_ACCOUNT).
+        Calling again with the same idempotency_key returns the original entry instead of
+        moving the money twice; reusing the key for a different kind, amount or accounts
+        returns TRANSFER_KEY_CONFLICT. Returns (result code, entry document).
+        """
+        amount = round(float(amount), 2)
+        if amount <= 0:
+            return TRANSFER_INVALID_AMOUNT, None
+        if not cls._indexes_ready:
+            # Idempotency relies on the unique key index, so make sure it exists before the first entry.
+            cls.ensure_indexes()
+            cls._indexes_ready = True
+
+        now_utc = datetime.now(timezone.utc)
+        entry = {
+            "_id": ObjectId(),
+            "idempotency_key": idempotency_key or f"{kind}:{uuid.uuid4().hex}",
+            "kind": kind,
+            "amount": amount,
+            "debit_account": from_account_id,
+            "credit_account": to_account_id,
+            "reference": reference or {},
+            "status": ENTRY_PENDING,
+            "created_at": now_utc,
+            "posted_at": None
+        }
+        try:
+            cls.entries().insert_one(entry)
+        except DuplicateKeyError:
+            existing = cls.entries().find_one({"idempotency_key": entry["idempotency_key"]})
+            if existing and any(existing.get(field) != entry[field] for field in ("kind", "amount", "debit_account", "credit_account")):
+                # The key was used for a different transfer; replaying that one would hand out its result for free
+                return TRANSFER_KEY_CONFLICT, existing
+            if existing and existing["status"] == ENTRY_POSTED:
+                return TRANSFER_REPLAYED, existing
+            if existing and existing["status"] == ENTRY_FAILED:
+                return existing.get("failure", TRANSFER_INSUFFICIENT_FUNDS), existing
+            return TRANSFER_IN_PROGRESS, existing
+
+        return cls._apply(entry)
+
+    @classmethod
+    def _apply(cls, entry: dict) -> tuple[str, dict]:
+        entry_id = entry["_id"]
+        amount = entry["amount"]
+        accounts = mongo.db.BANK_ACCOUNT
+
+        for account_id in (entry["debit_account"], entry["credit_account"]):
+            if account_id != EXTERNAL_ACCOUNT:
+                cls._ensure_opening_snapshot(account_id)
+
+        if entry["debit_account"] != EXTERNAL_ACCOUNT:
+            debited = accounts.find_one_and_update(
+                {"_id": entry["debit_account"], "balance": {"$gte": amount}, "ledger_pending": {"$ne": entry_id}},
+                {"$inc": {"balance": -amount, "ledger_entry_count": 1}, "$push": {"ledger_pending": entry_id}},
+                projection={"ledger_entry_count": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if debited is None and not accounts.count_documents({"_id": entry["debit_account"], "ledger_pending": entry_id}, limit=1):
+                exists = accounts.count_documents({"_id": entry["debit_account"]}, limit=1)
+                return cls._fail(entry, TRANSFER_INSUFFICIENT_FUNDS if exists else TRANSFER_ACCOUNT_NOT_FOUND)
+            cls._maybe_snapshot(entry["debit_account"], debited)
+
+        if entry["credit_account"] != EXTERNAL_ACCOUNT:
+            credited = accounts.find_one_and_update(
+                {"_id": entry["credit_account"], "ledger_pending": {"$ne": entry_id}},
+                {"$inc": {"balance": amount, "ledger_entry_count": 1}, "$push": {"ledger_pending": entry_id}},
+                projection={"ledger_entry_count": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if credited is None and not accounts.count_documents({"_id": entry["credit_account"]}, limit=1):
+                # Give the money back to the payer before failing the entry.
+                if entry["debit_account"] != EXTERNAL_ACCOUNT:
+                    accounts.update_one({"_id": entry["debit_account"], "ledger_pending": entry_id},
+                                        {"$inc": {"balance": amount}, "$pull": {"ledger_pending": entry_id}})
+                return cls._fail(entry, TRANSFER_ACCOUNT_NOT_FOUND)
+            cls._maybe_snapshot(entry["credit_account"], credited)
+
+        posted_at = datetime.now(timezone.utc)
+        cls.entries().update_one({"_id": entry_id, "status": ENTRY_PENDING}, {"$set": {"status": ENTRY_POSTED, "posted_at": posted_at}})
+        accounts.update_many(
+            {"_id": {"$in": [entry["debit_account"], entry["credit_account"]]}},
+            {"$pull": {"ledger_pending": entry_id}}
+        )
+        entry.update(status=ENTRY_POSTED, posted_at=posted_at)
+        return TRANSFER_OK, entry
+
+    @classmethod
+    def _fail(cls, entry: dict, code: str) -> tuple[str, dict]:
+        cls.entries().update_one({"_id": entry["_id"], "status": ENTRY_PENDING}, {"$set": {"status": ENTRY_FAILED, "failure": code}})
+        entry.update(status=ENTRY_FAILED, failure=code)
+        return code, entry
+
+    @classmethod
+    def recover_pending(cls, older_than: Optional[timedelta] = None) -> int:
+        """
+        Finishes entries left pending by a crashed process and clears ids of posted entries
+        that a crash left in an account's ledger_pending. Each step is guarded, so
+        re-applying is safe. Runs on every job engine sweep and as `flask ledger recover`.
+        """
+        if older_than is None:
+            older_than = current_app.config.get('LEDGER_RECOVER_AFTER', timedelta(minutes=5))
+        cutoff = datetime.now(timezone.utc) - older_than
+        count = 0
+        for entry in cls.entries().find({"status": ENTRY_PENDING, "created_at": {"$lt": cutoff}}):
+            cls._apply(entry)
+            count += 1
+        cls._release_posted_pending()
+        return count
+
+    @classmethod
+    def recover_entry(cls, idempotency_key: str) -> Optional[tuple[str, dict]]:
+        """
+        Finishes the entry with this key now if it is still pending, whatever its age, for
+        callers that know its original process is gone. Returns (result code, entry), or
+        None when no entry has that key.
+        """
+        entry = cls.entries().find_one({"idempotency_key": idempotency_key})
+        if entry is None:
+            return None
+        if entry["status"] == ENTRY_PENDING:
+            return cls._apply(entry)
+        if entry["status"] == ENTRY_POSTED:
+            return TRANSFER_REPLAYED, entry
+        return entry.get("failure", TRANSFER_INSUFFICIENT_FUNDS), entry
+
+    @classmethod
+    def _release_posted_pending(cls) -> int:
+        """Pulls posted entries from ledger_pending; their balance changes are already applied."""
+        released = 0
+        for account in mongo.db.BANK_ACCOUNT.find({"ledger_pending.0": {"$exists": True}}, {"ledger_pending": 1}):
+            posted_ids = [
+                entry["_id"]
+                for entry in cls.entries().find({"_id": {"$in": account["ledger_pending"]}, "status": ENTRY_POSTED}, {"_id": 1})
+            ]
+            if posted_ids:
+                mongo.db.BANK_ACCOUNT.update_one({"_id": account["_id"]}, {"$pull": {"ledger_pending": {"$in": posted_ids}}})
+                released += len(posted_ids)
+        return released
+
+    @classmethod
+    def _ensure_opening_snapshot(cls, account_id):
+        """Accounts that pre-date the ledger get their current balance recorded as the starting point."""
+        # Mongo keeps dates to the millisecond; step back one so entries posted in the same
+        # millisecond as this read still count as "after" the opening balance.
+        now_utc = datetime.now(timezone.utc)
+        read_at = now_utc.replace(microsecond=now_utc.microsecond // 1000 * 1000) - timedelta(milliseconds=1)
+        account = mongo.db.BANK_ACCOUNT.find_one({"_id": account_id, "ledger_opened": {"$ne": True}}, {"balance": 1})
+        if not account:
+            return
+        opened = mongo.db.BANK_ACCOUNT.update_one({"_id": account_id, "ledger_opened": {"$ne": True}}, {"$set": {"ledger_opened": True}})
+        if opened.modified_count:
+            cls.snapshots().insert_one({
+                "account_id": account_id,
+                "balance": account.get("balance", 0.0),
+                "as_of": read_at,
+                "kind": "opening"
+            })
+
+    @classmethod
+    def _maybe_snapshot(cls, account_id, account_doc: Optional[dict]):
+        if account_doc and account_doc.get("ledger_entry_count", 0) % cls.SNAPSHOT_EVERY == 0:
+            cls.take_snapshot(account_id)
+
+    @classmethod
+    def _posted_delta(cls, account_id, after: datetime, until: datetime) -> float:
+        pipeline = [
+            {"$match": {
+                "status": ENTRY_POSTED,
+                "posted_at": {"$gt": after, "$lte": until},
+                "$or": [{"debit_account": account_id}, {"credit_account": account_id}]
+            }},
+            {"$group": {"_id": None, "delta": {"$sum": {
+                "$cond": [{"$eq": ["$credit_account", account_id]}, "$amount", {"$multiply": ["$amount", -1]}]
+            }}}}
+        ]
+        result = list(cls.entries().aggregate(pipeline))
+        return result[0]["delta"] if result else 0.0
+
+    @classmethod
+    def balance_as_of(cls, account_id, as_of: Optional[datetime] = None) -> Optional[float]:
+        """Balance computed from the latest snapshot before `as_of` plus the entries posted since."""
+        as_of = as_of or datetime.now(timezone.utc)
+        snapshot = cls.snapshots().find_one({"account_id": account_id, "as_of": {"$lte": as_of}}, sort=[("as_of", DESCENDING)])
+        if not snapshot:
+            return None
+        return round(snapshot["balance"] + cls._posted_delta(account_id, snapshot["as_of"], as_of), 2)
+
+    @classmethod
+    def take_snapshot(cls, account_id) -> Optional[dict]:
+        as_of = datetime.now(timezone.utc) - cls.SNAPSHOT_LAG
+        balance = cls.balance_as_of(account_id, as_of)
+        if balance is None:
+            return None
+        snapshot = {"account_id": account_id, "balance": balance, "as_of": as_of, "kind": "periodic"}
+        cls.snapshots().insert_one(snapshot)
+        return snapshot
+
+    @classmethod
+    def rebuild_balance(cls, account_id, apply: bool = False) -> Optional[float]:
+        """
+        Recomputes an account balance from the ledger. With apply=True the stored balance is
+        corrected, which is only safe while no transfer for the account is in flight.
+        """
+        balance = cls.balance_as_of(account_id)
+        if balance is not None and apply:
+            mongo.db.BANK_ACCOUNT.update_one({"_id": account_id, "ledger_pending.0": {"$exists": False}}, {"$set": {"balance": balance}})
+        return balance
+
+
+ledger_cli = AppGroup('ledger', help="Recover and check the payment ledger.")
+
+
+def _account_id(account_id: str):
+    return ObjectId(account_id) if ObjectId.is_valid(account_id) else account_id
+
+
+@ledger_cli.command('recover')
+@click.option('--older-than', default=5, show_default=True, help="Only entries pending for at least this many minutes.")
+def recover_command(older_than):
+    """Finish ledger entries left pending by a crashed process."""
+    count = Ledger.recover_pending(timedelta(minutes=older_than))
+    click.echo(f"Re-applied {count} pending ledger entries.")
+
+
+@ledger_cli.command('rebuild-balance')
+@click.argument('account_id')
+@click.option('--apply', is_flag=True, help="Store the rebuilt balance on the account (only while no transfer is in flight).")
+def rebuild_balance_command(account_id, apply):
+    """Recompute an account balance from its snapshots and posted entries."""
+    account_id = _account_id(account_id)
+    stored = (mongo.db.BANK_ACCOUNT.find_one({"_id": account_id}, {"balance": 1}) or {}).get("balance")
+    balance = Ledger.rebuild_balance(account_id, apply=apply)
+    if balance is None:
+        raise click.ClickException(f"No ledger snapshot for account {account_id}.")
+    click.echo(f"{account_id}: ledger {balance}, stored {stored}{' (corrected)' if apply and stored != balance else ''}")
@@ -0,0 +1,274 @@
+import atexit
+import contextvars
+import json
+import random
+import threading
+import click
+from flask import current_app, request
+from flask.cli import AppGroup
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+
+AUDITED_COMMANDS = ("find", "aggregate", "count", "distinct")
+# Session and transport fields that explain does not accept inside the explained command
+EXPLAIN_DROP_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "readConcern", "writeConcern"}
+
+# Commands sampled during the current request; None outside audited requests
+_request_audit = contextvars.ContextVar("query_audit_request", default=None)
+# Set while the auditor runs its own explain commands, so they are not audited in turn
+_explaining = contextvars.ContextVar("query_audit_explaining", default=False)
+
+
+class NewCollectionScan(AssertionError):
+    """Raised after a request that ran a COLLSCAN query shape missing from the baseline."""
+
+
+def query_shape(value):
+    """Replaces the values of a filter, sort or pipeline with '?' and keeps its structure."""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)) and any(isinstance(item, dict) for item in value):
+        return [query_shape(item) for item in value]
+    return "?"
+
+
+def shape_key(command_name: str, command: dict) -> str:
+    collection = command.get(command_name)
+    if command_name == "find":
+        shape = {"filter": query_shape(command.get("filter", {})), "sort": list((command.get("sort") or {}).keys())}
+    elif command_name == "aggregate":
+        shape = {"pipeline": query_shape(command.get("pipeline", []))}
+    elif command_name == "distinct":
+        shape = {"key": command.get("key"), "query": query_shape(command.get("query", {}))}
+    else:
+        shape = {"query": query_shape(command.get("query", {}))}
+    return f"{command_name} {collection} {json.dumps(shape, sort_keys=True)}"
+
+
+def plan_summary(explain: dict) -> dict:
+    """Winning plan stages and execution counts from find/count/distinct or aggregate explain output."""
+    planner, stats = explain.get("queryPlanner"), explain.get("executionStats") or {}
+    if planner is None:
+        for stage in explain.get("stages", []):
+            if "$cursor" in stage:
+                planner = stage["$cursor"].get("queryPlanner")
+                stats = stage["$cursor"].get("executionStats") or {}
+                break
+    stages = []
+
+    def walk(node: dict):
+        if not isinstance(node, dict):
+            return
+        node = node.get("queryPlan", node)
+        if node.get("stage"):
+            stages.append(node["stage"])
+        walk(node.get("inputStage"))
+        for child in node.get("inputStages", []):
+            walk(child)
+
+    walk((planner or {}).get("winningPlan", {}))
+    if "COLLSCAN" in stages:
+        stage = "COLLSCAN"
+    elif "IXSCAN" in stages:
+        stage = "IXSCAN"
+    else:
+        stage = stages[-1] if stages else "UNKNOWN"
+    return {
+        "stage": stage,
+        "stages": stages,
+        "docs_examined": stats.get("totalDocsExamined"),
+        "returned": stats.get("nReturned")
+    }
+
+
+class _RequestAudit:
+    def __init__(self):
+        self.pending: dict[int, tuple[str, str, dict]] = {}
+        self.sampled: list[tuple[str, str, dict, float]] = []
+
+
+class QueryAuditListener(monitoring.CommandListener):
+    """Collects sampled read commands of the current request; explain runs after the response."""
+
+    def __init__(self, audit: 'QueryAudit'):
+        self._audit = audit
+
+    def started(self, event):
+        buffer = _request_audit.get()
+        if buffer is None or _explaining.get() or event.command_name not in AUDITED_COMMANDS:
+            return
+        if random.random() >= self._audit.sample_rate:
+            return
+        buffer.pending[event.request_id] = (event.database_name, event.command_name, dict(event.command))
+
+    def succeeded(self, event):
+        buffer = _request_audit.get()
+        if buffer is None:
+            return
+        pending = buffer.pending.pop(event.request_id, None)
+        if pending:
+            buffer.sampled.append(pending + (event.duration_micros / 1000.0,))
+
+    def failed(self, event):
+        buffer = _request_audit.get()
+        if buffer is not None:
+            buffer.pending.pop(event.request_id, None)
+
+
+class QueryAudit:
+    """
+    Query plan auditor for tests and staging. When QUERY_AUDIT_ENABLED is set, sampled
+    find/aggregate/count/distinct commands are grouped by query shape per endpoint; the
+    first time a shape is seen it is explained (executionStats) to record its plan stage
+    and documents examined versus returned. COLLSCAN shapes that are not listed in the
+    QUERY_AUDIT_BASELINE file are logged, or raised with QUERY_AUDIT_FAIL_ON_NEW_COLLSCAN.
+    """
+
+    def __init__(self, app=None):
+        self.listener = QueryAuditListener(self)
+        self.enabled = False
+        self.sample_rate = 1.0
+        self.fail_on_new_collscan = False
+        self.baseline: set[str] = set()
+        self._plans: dict[str, dict] = {}
+        self._stats: dict[str, dict[str, dict]] = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.cli.add_command(query_audit_cli)
+        self.enabled = app.config.get('QUERY_AUDIT_ENABLED', False)
+        if not self.enabled:
+            return
+        self.sample_rate = app.config.get('QUERY_AUDIT_SAMPLE_RATE', 1.0)
+        self.fail_on_new_collscan = app.config.get('QUERY_AUDIT_FAIL_ON_NEW_COLLSCAN', False)
+        self.baseline = self.load_baseline(app.config.get('QUERY_AUDIT_BASELINE'))
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        report_path = app.config.get('QUERY_AUDIT_REPORT_PATH')
+        if report_path:
+            atexit.register(self.dump, report_path)
+
+    def command_listeners(self) -> list:
+        """Passed to the MongoClient; the listener is only installed while auditing is enabled."""
+        return [self.listener] if self.enabled else []
+
+    @staticmethod
+    def load_baseline(path: str | None) -> set[str]:
+        if not path:
+            return set()
+        try:
+            with open(path, encoding='utf-8') as f:
+                return set(json.load(f))
+        except FileNotFoundError:
+            return set()
+
+    def _start_request(self):
+        _request_audit.set(_RequestAudit())
+
+    def _finish_request(self, response):
+        buffer = _request_audit.get()
+        _request_audit.set(None)
+        if not buffer or not buffer.sampled:
+            return response
+        endpoint = request.endpoint or request.path
+        new_collscans = []
+        for database_name, command_name, command, duration_ms in buffer.sampled:
+            key = shape_key(command_name, command)
+            plan = self._plans.get(key)
+            if plan is None:
+                plan = self._explain(database_name, command)
+                self._plans[key] = plan
+                if plan["stage"] == "COLLSCAN" and key not in self.baseline:
+                    new_collscans.append(key)
+            self._record(endpoint, key, plan, duration_ms)
+
+        for key in new_collscans:
+            current_app.logger.warning(f"COLLSCAN in {endpoint}: {key} (examined {self._plans[key]['docs_examined']}, returned {self._plans[key]['returned']})")
+        if new_collscans and self.fail_on_new_collscan:
+            raise NewCollectionScan(f"{endpoint} ran collection scans not in the baseline: {new_collscans}")
+        return response
+
+    def _explain(self, database_name: str, command: dict) -> dict:
+        explained = {key: value for key, value in command.items() if not key.startswith('$') and key not in EXPLAIN_DROP_FIELDS}
+        token = _explaining.set(True)
+        try:
+            from .extensions import mongo
+            result = mongo.cx[database_name].command({"explain": explained, "verbosity": "executionStats"})
+            return plan_summary(result)
+        except PyMongoError as e:
+            current_app.logger.debug(f"Query audit could not explain {explained}: {e}")
+            return {"stage": "UNKNOWN", "stages": [], "docs_examined": None, "returned": None}
+        finally:
+            _explaining.reset(token)
+
+    def _record(self, endpoint: str, key: str, plan: dict, duration_ms: float):
+        with self._lock:
+            entry = self._stats.setdefault(endpoint, {}).setdefault(key, {
+                "shape": key, "stage": plan["stage"], "docs_examined": plan["docs_examined"],
+                "returned": plan["returned"], "count": 0, "total_ms": 0.0, "max_ms": 0.0
+            })
+            entry["count"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+
+    def report(self, top: int = 10) -> dict[str, list[dict]]:
+        """Per endpoint, the query shapes ordered by collection scans first, then by total time."""
+        with self._lock:
+            return {
+                endpoint: sorted(
+                    (dict(entry, total_ms=round(entry["total_ms"], 3), max_ms=round(entry["max_ms"], 3)) for entry in shapes.values()),
+                    key=lambda entry: (entry["stage"] != "COLLSCAN", -entry["total_ms"])
+                )[:top]
+                for endpoint, shapes in self._stats.items()
+            }
+
+    def collection_scans(self) -> list[str]:
+        return sorted(key for key, plan in self._plans.items() if plan["stage"] == "COLLSCAN")
+
+    def reset(self):
+        with self._lock:
+            self._plans.clear()
+            self._stats.clear()
+
+    def dump(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"collection_scans": self.collection_scans(), "routes": self.report(top=1000)}, f, indent=2)
+
+
+query_audit = QueryAudit()
+
+query_audit_cli = AppGroup('query-audit', help="Inspect query audit reports written to QUERY_AUDIT_REPORT_PATH.")
+
+
+@query_audit_cli.command('report')
+@click.argument('report_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--top', default=5, show_default=True, help="Query shapes shown per route.")
+@click.option('--baseline', type=click.Path(dir_okay=False), help="Known COLLSCAN shapes (JSON list); defaults to QUERY_AUDIT_BASELINE.")
+@click.option('--write-baseline', is_flag=True, help="Store the report's collection scans as the new baseline.")
+def report_command(report_path, top, baseline, write_baseline):
+    """Print the top query shapes per route and fail on collection scans missing from the baseline."""
+    with open(report_path, encoding='utf-8') as f:
+        report = json.load(f)
+    baseline = baseline or current_app.config.get('QUERY_AUDIT_BASELINE')
+
+    for endpoint, shapes in sorted(report.get("routes", {}).items()):
+        click.echo(endpoint)
+        for entry in shapes[:top]:
+            click.echo(f"  {entry['stage']:<9} x{entry['count']:<5} {entry['total_ms']:>9.1f} ms  "
+                       f"examined {entry['docs_examined']} / returned {entry['returned']}  {entry['shape']}")
+
+    if write_baseline:
+        if not baseline:
+            raise click.UsageError("No baseline path given and QUERY_AUDIT_BASELINE is not set.")
+        with open(baseline, 'w', encoding='utf-8') as f:
+            json.dump(report.get("collection_scans", []), f, indent=2)
+        click.echo(f"Wrote {len(report.get('collection_scans', []))} collection scans to {baseline}.")
+        return
+
+    new_collscans = [key for key in report.get("collection_scans", []) if key not in QueryAudit.load_baseline(baseline)]
+    for key in new_collscans:
+        click.echo(f"NEW COLLSCAN  {key}", err=True)
+    if new_collscans:
+        raise SystemExit(1)
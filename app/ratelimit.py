@@ -0,0 +1,203 @@
+import math
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from flask import current_app, g, jsonify, request
+from flask_login import current_user
+from pymongo import ReturnDocument
+from .extensions import mongo
+from .metrics import RATE_LIMITED
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class Limit:
+    """`count` requests per `period` seconds, e.g. parsed from '60/minute'."""
+
+    def __init__(self, count: int, period: int):
+        if count <= 0 or period <= 0:
+            raise ValueError("Rate limits need a positive count and period.")
+        self.count = count
+        self.period = period
+
+    @property
+    def emission_interval(self) -> float:
+        return self.period / self.count
+
+    @classmethod
+    def parse(cls, text: str) -> 'Limit':
+        match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*", text)
+        if not match:
+            raise ValueError(f"Invalid rate limit '{text}', expected e.g. '60/minute'.")
+        count, multiplier, unit = match.groups()
+        return cls(int(count), int(multiplier or 1) * PERIODS[unit])
+
+    def policy(self) -> str:
+        return f"{self.count};w={self.period}"
+
+
+class RateLimitResult:
+    def __init__(self, allowed: bool, limit: Limit, remaining: int, reset_after: float, retry_after: float):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset_after = reset_after
+        self.retry_after = retry_after
+
+
+def _gcra_result(allowed: bool, tat: float, now: float, limit: Limit) -> RateLimitResult:
+    """Derives remaining requests and waiting times from the theoretical arrival time (TAT)."""
+    interval = limit.emission_interval
+    remaining = max(0, math.floor((now - (tat - limit.period)) / interval)) if allowed else 0
+    retry_after = 0.0 if allowed else max(0.0, tat - limit.period + interval - now)
+    return RateLimitResult(allowed, limit, min(remaining, limit.count), max(0.0, tat - now), retry_after)
+
+
+class MemoryBackend:
+    """GCRA state in this process. Each worker limits on its own, so the effective limit scales with the worker count."""
+
+    def __init__(self, max_keys: int = 100000):
+        self._tats: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.max_keys = max_keys
+
+    def hit(self, key: str, limit: Limit) -> RateLimitResult:
+        now = time.time()
+        with self._lock:
+            tat = max(self._tats.get(key, now), now)
+            new_tat = tat + limit.emission_interval
+            allowed = new_tat - limit.period <= now
+            if allowed:
+                self._tats[key] = new_tat
+                if len(self._tats) > self.max_keys:
+                    self._prune(now)
+        return _gcra_result(allowed, new_tat if allowed else tat, now, limit)
+
+    def _prune(self, now: float):
+        # Keys whose TAT has passed are back at full capacity and need no state
+        for key in [key for key, tat in self._tats.items() if tat <= now]:
+            del self._tats[key]
+
+
+class MongoBackend:
+    """
+    GCRA state in the `rate_limits` collection, shared by all workers. Each hit is one
+    find_one_and_update with an aggregation pipeline, so the check and the update are
+    atomic; documents of idle keys are removed by a TTL index on expire_at.
+    """
+    COLLECTION = "rate_limits"
+
+    def hit(self, key: str, limit: Limit) -> RateLimitResult:
+        now = time.time()
+        interval = limit.emission_interval
+        new_tat = {"$add": [{"$max": [{"$ifNull": ["$tat", now]}, now]}, interval]}
+        allowed = {"$lte": [{"$subtract": [new_tat, limit.period]}, now]}
+        doc = mongo.db[self.COLLECTION].find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"allowed": allowed}},
+                {"$set": {
+                    "tat": {"$cond": ["$allowed", new_tat, {"$ifNull": ["$tat", now]}]},
+                    "expire_at": datetime.now(timezone.utc) + timedelta(seconds=limit.period)
+                }}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return _gcra_result(doc["allowed"], doc["tat"], now, limit)
+
+
+class RateLimiter:
+    """
+    Request rate limiting for the data user blueprints, using the generic cell rate
+    algorithm (GCRA): every key has a theoretical arrival time that advances by
+    period/count per request, which allows bursts of up to `count` requests and then
+    evenly spaced ones.
+
+    Requests are limited per client IP and, for logged in users, per user and per
+    organization of that user, as configured in RATE_LIMITS. The user comes from the
+    session, never from request headers or arguments, so anonymous clients are only
+    limited by IP (behind proxies see PROXY_FIX_X_FOR); RATE_LIMIT_ENDPOINTS overrides them for single endpoints. Responses carry
+    RateLimit-Limit/-Remaining/-Reset/-Policy headers for the tightest limit, and refused
+    requests get 429 with Retry-After. RATE_LIMIT_BACKEND is "memory" (per worker) or
+    "mongo" (shared between workers).
+    """
+
+    def __init__(self, app=None, blueprints=()):
+        self.enabled = False
+        self.backend = MemoryBackend()
+        self.limits: dict[str, Limit] = {}
+        self.endpoint_limits: dict[str, dict[str, Limit]] = {}
+        self.blueprints: set[str] = set()
+        if app is not None:
+            self.init_app(app, blueprints)
+
+    def init_app(self, app, blueprints=()):
+        self.enabled = app.config.get('RATE_LIMIT_ENABLED', True)
+        if not self.enabled:
+            return
+        self.backend = MongoBackend() if app.config.get('RATE_LIMIT_BACKEND', 'memory') == 'mongo' else MemoryBackend()
+        self.limits = {scope: Limit.parse(text) for scope, text in app.config.get('RATE_LIMITS', {}).items()}
+        self.endpoint_limits = {
+            endpoint: {scope: Limit.parse(text) for scope, text in limits.items()}
+            for endpoint, limits in app.config.get('RATE_LIMIT_ENDPOINTS', {}).items()
+        }
+        self.blueprints = {blueprint.name for blueprint in blueprints}
+        app.before_request(self._check)
+        app.after_request(self._add_headers)
+
+    @staticmethod
+    def _user_doc() -> dict | None:
+        """The logged in user's document, or None for anonymous requests."""
+        if not current_user.is_authenticated:
+            return None
+        from .main.IdentityService import IdentityService
+        return IdentityService.get_user_doc(current_user.get_id())
+
+    def _keys(self, limits: dict[str, Limit]) -> list[tuple[str, str, Limit]]:
+        keys = []
+        if "ip" in limits:
+            keys.append(("ip", f"ip:{request.remote_addr}", limits["ip"]))
+        user_doc = self._user_doc() if ("user" in limits or "organization" in limits) else None
+        if user_doc and "user" in limits:
+            keys.append(("user", f"user:{user_doc['_id']}", limits["user"]))
+        if user_doc and user_doc.get("organization_id") and "organization" in limits:
+            keys.append(("organization", f"org:{user_doc['organization_id']}", limits["organization"]))
+        return keys
+
+    def _check(self):
+        if request.blueprint not in self.blueprints:
+            return None
+        limits = {**self.limits, **self.endpoint_limits.get(request.endpoint, {})}
+        tightest = None
+        for scope, key, limit in self._keys(limits):
+            # Endpoint-specific limits count separately from the blueprint-wide ones
+            if request.endpoint in self.endpoint_limits and scope in self.endpoint_limits[request.endpoint]:
+                key = f"{key}:{request.endpoint}"
+            result = self.backend.hit(key, limit)
+            if not result.allowed:
+                RATE_LIMITED.inc(scope=scope, endpoint=request.endpoint or "")
+                current_app.logger.info(f"Rate limited {key} on {request.endpoint} (retry after {result.retry_after:.1f}s)")
+                g._rate_limit = result
+                response = jsonify({"error": "RATE_LIMITED", "scope": scope, "retry_after": math.ceil(result.retry_after)})
+                response.status_code = 429
+                response.headers["Retry-After"] = str(math.ceil(result.retry_after))
+                return response
+            if tightest is None or result.remaining < tightest.remaining:
+                tightest = result
+        g._rate_limit = tightest
+        return None
+
+    @staticmethod
+    def _add_headers(response):
+        result = g.pop('_rate_limit', None)
+        if result is not None:
+            response.headers["RateLimit-Limit"] = str(result.limit.count)
+            response.headers["RateLimit-Remaining"] = str(result.remaining)
+            response.headers["RateLimit-Reset"] = str(math.ceil(result.reset_after))
+            response.headers["RateLimit-Policy"] = result.limit.policy()
+        return response
+
+
+rate_limiter = RateLimiter()
@@ -151,54 +151,55 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 
-    // Open the Edit Member Modal and populate fields
-    document.querySelectorAll('.btn-open-edit-member-modal').forEach(button => {
-        button.addEventListener('click', function() {
-            if (!editMemberModalEl || !editMemberFormEl_no_ajax) {
-                console.error("Error: Not find the modal");
-                return;
-            }
+    // Open the Edit Member Modal and populate fields. Member rows are loaded after the page,
+    // so listen on the document instead of on each button.
+    document.addEventListener('click', function(event) {
+        const button = event.target.closest('.btn-open-edit-member-modal');
+        if (!button) return;
+        if (!editMemberModalEl || !editMemberFormEl_no_ajax) {
+            console.error("Error: Not find the modal");
+            return;
+        }
 
-            editMemberFormEl_no_ajax.reset();
+        editMemberFormEl_no_ajax.reset();
 
-            const memberId = this.dataset.memberId;
-            const email = this.dataset.email;
-            const username = this.dataset.username;
-            const accessPublic = this.dataset.accessPublic === 'true';
-            const accessConsume = this.dataset.accessConsume === 'true';
-            const accessProvide = this.dataset.accessProvide === 'true';
+        const memberId = button.dataset.memberId;
+        const email = button.dataset.email;
+        const username = button.dataset.username;
+        const accessPublic = button.dataset.accessPublic === 'true';
+        const accessConsume = button.dataset.accessConsume === 'true';
+        const accessProvide = button.dataset.accessProvide === 'true';
 
-            const editEmailInput = document.getElementById('edit_modal_member_email');
-            const editUsernameInput = document.getElementById('edit_modal_member_username');
+        const editEmailInput = document.getElementById('edit_modal_member_email');
+        const editUsernameInput = document.getElementById('edit_modal_member_username');
 
-            if (editEmailInput) editEmailInput.value = email || '';
-            if (editUsernameInput) editUsernameInput.value = username || '';
+        if (editEmailInput) editEmailInput.value = email || '';
+        if (editUsernameInput) editUsernameInput.value = username || '';
 
-            if (editPublicAccessCheckboxEl) editPublicAccessCheckboxEl.checked = accessPublic;
-            if (editPrivateConsumeCheckboxEl) editPrivateConsumeCheckboxEl.checked = accessConsume;
-            if (editPrivateProvideCheckboxEl) editPrivateProvideCheckboxEl.checked = accessProvide;
+        if (editPublicAccessCheckboxEl) editPublicAccessCheckboxEl.checked = accessPublic;
+        if (editPrivateConsumeCheckboxEl) editPrivateConsumeCheckboxEl.checked = accessConsume;
+        if (editPrivateProvideCheckboxEl) editPrivateProvideCheckboxEl.checked = accessProvide;
 
-            // Recalculate fee
-            if (typeof calculateFeeForModal === "function") {
-                calculateFeeForModal(editAccessCheckboxesEl, editFeeInputEl, editFeeStructure);
-            }
+        // Recalculate fee
+        if (typeof calculateFeeForModal === "function") {
+            calculateFeeForModal(editAccessCheckboxesEl, editFeeInputEl, editFeeStructure);
+        }
 
-            // Set the form action for the edit member request
-            if (memberId && typeof SCRIPT_DATA !== 'undefined' && SCRIPT_DATA.editMemberBaseUrl) {
-                if (SCRIPT_DATA.editMemberBaseUrl.includes('MEMBER_ID_PLACEHOLDER')) {
-                    editMemberFormEl_no_ajax.action = SCRIPT_DATA.editMemberBaseUrl.replace('MEMBER_ID_PLACEHOLDER', memberId);
-                } else {
-                    console.error("SCRIPT_DATA.editMemberBaseUrl not contain 'MEMBER_ID_PLACEHOLDER'.");
-                    editMemberFormEl_no_ajax.action = "";
-                }
+        // Set the form action for the edit member request
+        if (memberId && typeof SCRIPT_DATA !== 'undefined' && SCRIPT_DATA.editMemberBaseUrl) {
+            if (SCRIPT_DATA.editMemberBaseUrl.includes('MEMBER_ID_PLACEHOLDER')) {
+                editMemberFormEl_no_ajax.action = SCRIPT_DATA.editMemberBaseUrl.replace('MEMBER_ID_PLACEHOLDER', memberId);
             } else {
-                console.error("The action for editing the form cannot be set. memberId or script_data.editMemberBaseUrl is missing.");
+                console.error("SCRIPT_DATA.editMemberBaseUrl not contain 'MEMBER_ID_PLACEHOLDER'.");
                 editMemberFormEl_no_ajax.action = "";
             }
+        } else {
+            console.error("The action for editing the form cannot be set. memberId or script_data.editMemberBaseUrl is missing.");
+            editMemberFormEl_no_ajax.action = "";
+        }
 
-            // Show the modal
-            editMemberModalEl.style.display = 'flex';
-        });
+        // Show the modal
+        editMemberModalEl.style.display = 'flex';
     });
 
     if (editModalCloseBtnsEl) {
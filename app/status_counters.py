@@ -0,0 +1,91 @@
+import click
+from datetime import datetime, timezone
+from flask.cli import AppGroup
+from pymongo import UpdateOne
+from .extensions import mongo
+
+
+class StatusCounters:
+    """
+    Number of documents per status of one collection, kept in the `counters` collection
+    so dashboards can show queue sizes without counting. Code that changes a document's
+    status calls move() after its conditional write succeeded. The counts are built from
+    the collection on first use, and rebuild() (`flask counters rebuild`) recounts them
+    should they ever drift, e.g. after documents were edited by hand.
+    """
+    COLLECTION = "counters"
+    instances: list['StatusCounters'] = []
+
+    def __init__(self, collection_name: str, status_field: str = "status"):
+        self.collection_name = collection_name
+        self.status_field = status_field
+        StatusCounters.instances.append(self)
+
+    @property
+    def collection(self):
+        return mongo.db[self.COLLECTION]
+
+    def _counter_id(self, status: str) -> str:
+        return f"{self.collection_name}:{self.status_field}:{status}"
+
+    def move(self, from_status: str | None, to_status: str | None, count: int = 1):
+        """Records `count` documents leaving from_status for to_status (None for inserted/deleted documents)."""
+        if count <= 0 or from_status == to_status:
+            return
+        updates = [
+            UpdateOne(
+                {"_id": self._counter_id(status)},
+                {"$inc": {"count": delta}, "$setOnInsert": {"collection": self.collection_name, "status": status}},
+                upsert=True
+            )
+            for status, delta in ((from_status, -count), (to_status, count)) if status is not None
+        ]
+        self.collection.bulk_write(updates, ordered=False)
+
+    def counts(self) -> dict[str, int]:
+        """{status: number of documents}; statuses without documents may be missing or 0."""
+        counter_docs = list(self.collection.find({"collection": self.collection_name}, {"status": 1, "count": 1}))
+        # The marker document (no status) is written by rebuild(); without it the counts were never built
+        if not any("status" not in counter_doc for counter_doc in counter_docs):
+            return self.rebuild()
+        return {counter_doc["status"]: counter_doc.get("count", 0) for counter_doc in counter_docs if "status" in counter_doc}
+
+    def rebuild(self) -> dict[str, int]:
+        """Recounts the statuses from the collection itself and stores the result."""
+        counts = {
+            group["_id"]: group["count"]
+            for group in mongo.db[self.collection_name].aggregate([
+                {"$group": {"_id": f"${self.status_field}", "count": {"$sum": 1}}}
+            ])
+            if group["_id"] is not None
+        }
+        stale = [
+            counter_doc["status"]
+            for counter_doc in self.collection.find({"collection": self.collection_name, "status": {"$exists": True}}, {"status": 1})
+        ]
+        updates = [
+            UpdateOne(
+                {"_id": self._counter_id(status)},
+                {"$set": {"collection": self.collection_name, "status": status, "count": counts.get(status, 0)}},
+                upsert=True
+            )
+            for status in set(counts) | set(stale)
+        ]
+        updates.append(UpdateOne(
+            {"_id": f"{self.collection_name}:{self.status_field}"},
+            {"$set": {"collection": self.collection_name, "rebuilt_at": datetime.now(timezone.utc)}},
+            upsert=True
+        ))
+        self.collection.bulk_write(updates, ordered=False)
+        return counts
+
+
+counters_cli = AppGroup('counters', help="Maintain the per-status document counters.")
+
+
+@counters_cli.command('rebuild')
+def rebuild_command():
+    """Recount every status counter from its collection."""
+    for counters in StatusCounters.instances:
+        for status, count in sorted(counters.rebuild().items()):
+            click.echo(f"{counters.collection_name}.{counters.status_field}={status}: {count}")
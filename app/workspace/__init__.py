@@ -9,7 +9,8 @@ def check_identity():
 	if request.endpoint and (
         request.endpoint.startswith('auth.') or
         request.endpoint == 'static' or 
-        request.endpoint == 'main.index' 
+        request.endpoint == 'main.index' or
+        request.endpoint in ('main.ping', 'metrics')
     ):  return
 	if not current_user.is_authenticated:
 		return redirect(url_for("auth.login"))
@@ -1,13 +1,16 @@
-from flask import request, flash, redirect, url_for, session, current_app, send_file # 新增 send_file
+from flask import request, flash, redirect, url_for, session, current_app, send_file, jsonify # 新增 send_file
 from flask_login import login_required, current_user
 from bson import ObjectId
-from io import BytesIO
 from . import workspace_bp
 from ..service.MemberService import MemberService
+from ..service.ImportJobService import ImportJobService
+from ..service.MemberDirectoryService import MemberDirectoryService
+from ..service.RosterReader import RosterReader
 from ..service.OrganizationService import OrganizationService 
 from ..models import OConvener 
 from app.main.User import User 
 from app.extensions import mongo 
+from app.jobs import JOB_COMPLETED, JOB_FAILED
 from app.auth.utils import is_valid_email
 from ..utils import ACTIVE, PENDING_EADMIN_APPROVAL, PENDING_SEADMIN_APPROVAL, REJECTED_BY_EADMIN, REJECTED_BY_SEADMIN, NOT_SUBMITTED
 
@@ -113,46 +116,62 @@ def oconvener_upload_members_excel_route():
         flash('No Excel file selected for upload.', 'danger')
         return redirect(request.referrer or url_for('workspace.oconvener_dashboard_page'))
 
-    if file and (file.filename.lower().endswith('.xlsx') or file.filename.lower().endswith('.xls')):
-        try:
-            file_stream = BytesIO(file.read())
-            file_level_success, summary_msg, successful_emails, failed_details = MemberService.add_members_from_excel(
-                current_oconvener_obj, 
-                file_stream
-            )
-            if not file_level_success:
-                flash(summary_msg, "danger")
-            else:
-                msg_type = "info"
-                if len(failed_details) > 0 and len(successful_emails) == 0 : msg_type = "warning"
-                elif len(failed_details) > 0 and len(successful_emails) > 0: msg_type = "warning"
-                elif len(successful_emails) > 0: msg_type = "success"
-                flash(summary_msg, msg_type)
-
-                if successful_emails:
-                    display_limit = 5
-                    success_msg = f"Successfully added/associated ({len(successful_emails)}): {', '.join(successful_emails[:display_limit])}"
-                    if len(successful_emails) > display_limit:
-                        success_msg += f"... and {len(successful_emails) - display_limit} more."
-                    flash(success_msg, "success")
-                
-                if failed_details:
-                    flash(f"Found {len(failed_details)} entries that could not be processed (details below):", "warning")
-                    display_failure_limit = 10 
-                    for i, failure in enumerate(failed_details):
-                        if i < display_failure_limit:
-                            flash(f"Failed - Identifier: {failure.get('email', 'N/A')}, Reason: {failure.get('reason', 'Unknown')}", "danger")
-                        else:
-                            flash(f"... and {len(failed_details) - display_failure_limit} more failures.", "danger")
-                            break
-        except Exception as e:
-            current_app.logger.error(f"Excel upload route critical error: {e}", exc_info=True)
-            flash(f"An unexpected critical error occurred: {str(e)}", 'danger')
-        return redirect(url_for('workspace.oconvener_dashboard_page'))
-    else:
-        flash('Invalid file type. Please upload an Excel file (.xlsx or .xls).', 'danger')
+    wants_json = request.accept_mimetypes.best == 'application/json'
+    if not RosterReader.is_supported_file(file.filename):
+        message = 'Invalid file type. Please upload an Excel or CSV file (.xlsx, .xls or .csv).'
+        if wants_json:
+            return jsonify({"error": message}), 400
+        flash(message, 'danger')
         return redirect(request.referrer or url_for('workspace.oconvener_dashboard_page'))
 
+    success, job_id_or_message = ImportJobService.submit_member_import(current_oconvener_obj, file)
+    if not success:
+        if wants_json:
+            return jsonify({"error": job_id_or_message}), 500
+        flash(job_id_or_message, 'danger')
+        return redirect(url_for('workspace.oconvener_dashboard_page'))
+
+    status_url = url_for('workspace.oconvener_member_import_status_route', job_id=job_id_or_message)
+    if wants_json:
+        return jsonify({"job_id": job_id_or_message, "status_url": status_url}), 202
+    session['_member_import_job_id'] = job_id_or_message
+    flash("Your member list is being imported in the background. Progress is shown below.", "info")
+    return redirect(url_for('workspace.oconvener_dashboard_page'))
+
+
+@workspace_bp.route('/member/import-jobs/<string:job_id>', methods=['GET'])
+@login_required
+def oconvener_member_import_status_route(job_id: str):
+    job_view = ImportJobService.get_member_import(job_id, current_user.get_id())
+    if not job_view:
+        return jsonify({"error": "Import job not found."}), 404
+    if job_view['status'] in (JOB_COMPLETED, JOB_FAILED) and session.get('_member_import_job_id') == job_id:
+        session.pop('_member_import_job_id', None)
+    return jsonify(job_view)
+
+
+@workspace_bp.route('/member/directory', methods=['GET'])
+@login_required
+def oconvener_member_directory_route():
+    """One page of organization members as JSON; see MemberDirectoryService.list_members for the parameters."""
+    if current_user.role != User.Roles.O_CONVENER:
+        return jsonify({"error": "You are not OConvener"}), 403
+
+    success, page_or_message = MemberDirectoryService.list_members(
+        current_user.organization_id,
+        exclude_user_id=current_user.user_id,
+        cursor=request.args.get('cursor') or None,
+        limit=request.args.get('limit', type=int),
+        access=request.args.get('access') or None,
+        role=request.args.get('role') or None,
+        email_prefix=request.args.get('email_prefix') or None,
+        sort=request.args.get('sort', 'email'),
+        order=request.args.get('order', 'asc')
+    )
+    if not success:
+        return jsonify({"error": page_or_message}), 400
+    return jsonify(page_or_message)
+
 
 @workspace_bp.route('/member/edit/<string:member_id_str>', methods=['POST']) 
 @login_required
@@ -103,7 +103,8 @@ def oconvener_submit_organization_setup():
         return redirect(url_for('workspace.oconvener_setup_organization_page'))
 
     # Verify OTP using app.auth.utils
-    if not verify_otp(email_for_verification, code_from_form):
+    # Not consumed yet: the form may be resubmitted after an upload error; clear_otp runs on success
+    if not verify_otp(email_for_verification, code_from_form, consume=False):
         flash('Invalid or expired verification code. Please request a new one if needed.', 'danger')
         return redirect(url_for('workspace.oconvener_setup_organization_page'))
 
@@ -12,6 +12,7 @@ from ..service.WorkspaceService import WorkspaceService # 确保导入
 from ..utils import ACTIVE, PENDING_EADMIN_APPROVAL, PENDING_SEADMIN_APPROVAL, REJECTED_BY_EADMIN, REJECTED_BY_SEADMIN, NOT_SUBMITTED
 from app.main.User import User
 from app.extensions import mongo
+from app.datauser.services.NotificationService import NotificationService
 
 SERVICE_CONFIG_MAP = {
     'courseInfo': 'Course Information Sharing (Free)',
@@ -23,40 +24,29 @@ SERVICE_CONFIG_MAP = {
 CONFIGURABLE_SERVICES_BY_PROVIDER = ['gpaRecord', 'identityCheck', 'thesisAccess']
 
 
-def create_provider_notification(provider_user_id, organization_id, organization_name, service_key, service_display_name, oconvener_email):
+def build_provider_notification(provider_user_id, organization_id, organization_name, service_key, service_display_name, oconvener_email, link_to_action, created_at):
     """
-    Helper function to create a notification document.
+    Helper function to build a notification document; NotificationService.fan_out writes them.
     """
-    notifications_collection = mongo.db.notifications 
     message = (
         f"Service '{service_display_name}' has been enabled for your organization "
         f"by administrator ({oconvener_email}). Please proceed to your Provider Dashboard "
         f"to configure its details (Base URL, Path, Schemas etc.) under the 'Manage Services' section."
     )
-    try:
-        if not isinstance(provider_user_id, ObjectId):
-            provider_user_id_obj = ObjectId(provider_user_id)
-        else:
-            provider_user_id_obj = provider_user_id
-        organization_id_for_db = organization_id
-        notification_doc = {
-            "user_id": provider_user_id_obj,
-            "organization_id": organization_id_for_db,
-            "organization_name": organization_name,
-            "type": "SERVICE_CONFIGURATION_REQUIRED",
-            "message": message,
-            "service_name_to_configure": service_key,
-            "service_display_name": service_display_name,
-            "is_read": False,
-            "created_at": datetime.now(timezone.utc),
-            "link_to_action": url_for('datauser.provider_dashboard', _anchor='service-form', _external=False)
-        }
-        notifications_collection.insert_one(notification_doc)
-        current_app.logger.info(f"Notification created for provider {provider_user_id} for service {service_key}")
-        return True
-    except Exception as e:
-        current_app.logger.error(f"Error creating notification for provider {provider_user_id}, service {service_key}: {e}")
-        return False
+    return {
+        "user_id": provider_user_id,
+        "organization_id": organization_id,
+        "organization_name": organization_name,
+        "type": "SERVICE_CONFIGURATION_REQUIRED",
+        "message": message,
+        "service_name_to_configure": service_key,
+        "service_display_name": service_display_name,
+        "is_read": False,
+        "created_at": created_at,
+        "link_to_action": link_to_action,
+        # One configuration request per provider and service, however often it is re-enabled
+        "dedupe_key": NotificationService.dedupe_key("SERVICE_CONFIGURATION_REQUIRED", provider_user_id, service_key)
+    }
 
 @workspace_bp.route('/services/set-availability', methods=['POST'])
 @login_required
@@ -138,37 +128,49 @@ def oconvener_set_service_availability_route():
     # Trigger notifications if save was successful and there are services that were newly enabled
     if success and notifications_to_send_details:
         providers_notified_for_services = []
-        users_collection = mongo.db.users
-        providers_in_org = users_collection.find({
+        provider_ids = []
+        for provider_doc in mongo.db.users.find({
             "organization_id": current_user.organization_id,
             "access_level.2": True  # Assuming index 2 is 'Private data provision'
-        })
-        
-        provider_docs_list = list(providers_in_org) # Convert cursor to list to iterate multiple times if needed
-
-        for notif_detail in notifications_to_send_details:
-            service_key = notif_detail["service_key"]
-            service_display_name = notif_detail["service_display_name"]
-            
-            for provider_doc in provider_docs_list: # Iterate over the fetched list
-                provider_user_id = provider_doc["_id"] # This should be ObjectId
-                if not isinstance(provider_user_id, ObjectId): # Defensive check
-                    try:
-                        provider_user_id = ObjectId(provider_user_id)
-                    except Exception:
-                        current_app.logger.warning(f"Could not convert provider user ID {provider_user_id} to ObjectId.")
-                        continue
-                
-                create_provider_notification(
-                    provider_user_id=provider_user_id,
-                    organization_id=current_user.organization_id, # Pass as is (string or ObjectId based on your User model)
-                    organization_name=current_user.organization_name,
-                    service_key=service_key,
-                    service_display_name=service_display_name,
-                    oconvener_email=current_user.email
-                )
-            providers_notified_for_services.append(service_display_name)
-        
+        }, {"_id": 1}):
+            provider_user_id = provider_doc["_id"] # This should be ObjectId
+            if not isinstance(provider_user_id, ObjectId): # Defensive check
+                try:
+                    provider_user_id = ObjectId(provider_user_id)
+                except Exception:
+                    current_app.logger.warning(f"Could not convert provider user ID {provider_user_id} to ObjectId.")
+                    continue
+            provider_ids.append(provider_user_id)
+
+        # Build every notification in memory and write them with one bulk upsert
+        link_to_action = url_for('datauser.provider_dashboard', _anchor='service-form', _external=False)
+        now_utc = datetime.now(timezone.utc)
+        notification_docs = [
+            build_provider_notification(
+                provider_user_id=provider_user_id,
+                organization_id=current_user.organization_id, # Pass as is (string or ObjectId based on your User model)
+                organization_name=current_user.organization_name,
+                service_key=notif_detail["service_key"],
+                service_display_name=notif_detail["service_display_name"],
+                oconvener_email=current_user.email,
+                link_to_action=link_to_action,
+                created_at=now_utc
+            )
+            for notif_detail in notifications_to_send_details
+            for provider_user_id in provider_ids
+        ]
+        try:
+            created_docs, already_present = NotificationService.fan_out(notification_docs)
+            current_app.logger.info(f"Service notifications for org {current_user.organization_id}: {len(created_docs)} created, {already_present} already sent")
+            # Only services for which a notification was actually written, not the deduplicated ones
+            notified_services = {doc["service_display_name"] for doc in created_docs}
+            providers_notified_for_services = [
+                notif_detail["service_display_name"] for notif_detail in notifications_to_send_details
+                if notif_detail["service_display_name"] in notified_services
+            ]
+        except Exception as e:
+            current_app.logger.error(f"Error creating service notifications for org {current_user.organization_id}: {e}")
+
         if providers_notified_for_services:
             flash(f"Providers in your organization have been notified to configure: {', '.join(providers_notified_for_services)}.", "info")
 
@@ -0,0 +1,105 @@
+import math
+from app.extensions import mongo, run_parallel
+from ..models import OConvener
+from .OrganizationService import OrganizationService
+from .WorkspaceService import WorkspaceService
+from ..utils import (
+    ACTIVE, PENDING_EADMIN_APPROVAL, PENDING_SEADMIN_APPROVAL, REJECTED_BY_EADMIN, REJECTED_BY_SEADMIN, NOT_SUBMITTED
+)
+
+
+class DashboardService:
+    """
+    Builds the O-Convener dashboard view model. The independent lookups (organization,
+    approval request, workspace, bank account, member emails) run concurrently and the
+    activity log reuses the member emails. The member table itself is not part of the
+    view model; the page loads it in pages from MemberDirectoryService.
+    """
+
+    @classmethod
+    def _approval_view(cls, oconvener: OConvener, approval_request: dict | None) -> tuple[str, dict | None, str | None]:
+        """Maps the latest approval request to (view status, organization display data, rejection reason)."""
+        if not approval_request:
+            return NOT_SUBMITTED, {"_id": oconvener.organization_id, "name": oconvener.organization_name}, None
+
+        status = approval_request.get("status")
+        org_name_from_request = approval_request.get("org_name", oconvener.organization_name)
+        display_data = {"_id": oconvener.organization_id, "name": org_name_from_request}
+        if status == REJECTED_BY_EADMIN:
+            return REJECTED_BY_EADMIN, display_data, approval_request.get("rejection_reason")
+        if status in (PENDING_EADMIN_APPROVAL, PENDING_SEADMIN_APPROVAL, REJECTED_BY_SEADMIN):
+            return status, display_data, None
+        if status == ACTIVE:
+            display_data["created_at"] = approval_request.get("created_at")
+            return ACTIVE, display_data, None
+        return NOT_SUBMITTED, None, None
+
+    @classmethod
+    def build_oconvener_dashboard(cls, oconvener: OConvener, log_page: int = 1, logs_per_page: int = 15) -> dict[str, any]:
+        """
+        Returns the template variables of workspace/workspace.html (apart from request state
+        such as bank binding messages), plus `workspace_created` when a missing workspace was
+        created on the way.
+        """
+        organization_id = oconvener.organization_id
+        view_model = {
+            "organization_data": None,
+            "workspace_data": None,
+            "view_status": NOT_SUBMITTED,
+            "approval_request_data": None,
+            "rejection_reason": None,
+            "available_services": {},
+            "organization_logs": [],
+            "current_log_page": max(log_page, 1),
+            "total_log_pages": 1,
+            "bank_account_info": None,
+            "workspace_created": False
+        }
+        if not organization_id:
+            return view_model
+
+        organization, approval_request, workspace, bank_account, member_emails = run_parallel(
+            lambda: OrganizationService.get_organization_details(organization_id),
+            lambda: OrganizationService.get_latest_organization_approval_request(
+                oconvener_user_id=oconvener.user_id, organization_id=organization_id) if oconvener.user_id else None,
+            lambda: WorkspaceService.get_workspace_org(organization_id),
+            lambda: mongo.db.BANK_ACCOUNT.find_one({'organization_id': organization_id}),
+            lambda: mongo.db.users.distinct("email", {"organization_id": organization_id})
+        )
+        view_model["bank_account_info"] = bank_account
+
+        if not organization or organization.get('status') != ACTIVE:
+            view_status, display_data, rejection_reason = cls._approval_view(oconvener, approval_request)
+            view_model.update(
+                view_status=view_status,
+                organization_data=display_data,
+                approval_request_data=approval_request,
+                rejection_reason=rejection_reason
+            )
+            return view_model
+
+        view_model.update(view_status=ACTIVE, organization_data=organization)
+        if not workspace:
+            workspace = WorkspaceService.create_workspace(oconvener)
+            view_model["workspace_created"] = workspace is not None
+        if not workspace:
+            return view_model
+
+        view_model["workspace_data"] = workspace.to_dict() if hasattr(workspace, 'to_dict') else None
+        view_model["available_services"] = organization.get('services', {})
+
+        current_log_page = view_model["current_log_page"]
+        organization_logs, total_logs_count = WorkspaceService.get_organization_logs(
+            organization_id, oconvener.email, page=current_log_page, limit=logs_per_page, member_emails=member_emails)
+        total_log_pages = math.ceil(total_logs_count / logs_per_page) if total_logs_count > 0 and logs_per_page > 0 else 1
+        if current_log_page > total_log_pages:
+            current_log_page = total_log_pages
+            organization_logs, total_logs_count = WorkspaceService.get_organization_logs(
+                organization_id, oconvener.email, page=current_log_page, limit=logs_per_page, member_emails=member_emails)
+
+        view_model.update(
+            organization_logs=organization_logs,
+            current_log_page=current_log_page,
+            total_log_pages=total_log_pages
+        )
+        return view_model
@@ -0,0 +1,131 @@
+import os
+import uuid
+import pandas as pd
+from bson import ObjectId
+from flask import current_app
+from app.extensions import mongo
+from app.jobs import job_engine, JobContext, JobFailed, JobLost
+from app.main.User import User
+from ..models import OConvener
+from .MemberService import MemberService
+from .RosterReader import RosterReader
+
+MEMBER_IMPORT_JOB = "member_import"
+
+
+class ImportJobService:
+    """
+    Runs roster imports as background jobs. The upload is stored on disk and the rows
+    are written chunk by chunk; each chunk's results are committed together with the
+    job cursor so a restarted worker continues after the last finished chunk.
+    """
+
+    @staticmethod
+    def _import_folder() -> str:
+        folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'imports')
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    @classmethod
+    def submit_member_import(cls, oconvener: OConvener, file_storage) -> tuple[bool, str]:
+        """Saves the uploaded roster and queues an import job. Returns (success, job id or error message)."""
+        if not RosterReader.is_supported_file(file_storage.filename):
+            return False, "Invalid file type. Please upload an Excel or CSV file (.xlsx, .xls or .csv)."
+
+        extension = os.path.splitext(file_storage.filename)[1].lower()
+        stored_path = os.path.join(cls._import_folder(), f"{uuid.uuid4().hex}{extension}")
+        file_storage.save(stored_path)
+
+        try:
+            job_id = job_engine.submit(MEMBER_IMPORT_JOB, oconvener.get_id(), {
+                "file_path": stored_path,
+                "original_filename": file_storage.filename,
+                "organization_id": oconvener.organization_id
+            })
+        except Exception as e:
+            os.remove(stored_path)
+            current_app.logger.error(f"Could not queue member import for {oconvener.email}: {e}", exc_info=True)
+            return False, "Could not start the import. Please try again later."
+        return True, job_id
+
+    @classmethod
+    def get_member_import(cls, job_id: str, owner_id: str) -> dict | None:
+        """Returns a JSON friendly view of the job, or None when it does not exist or belongs to someone else."""
+        job = job_engine.get(job_id, owner_id=owner_id)
+        if not job or job.get('type') != MEMBER_IMPORT_JOB:
+            return None
+        counters = job.get('counters') or {}
+        results = job.get('results') or {}
+        return {
+            "job_id": str(job['_id']),
+            "status": job.get('status'),
+            "total": job.get('total'),
+            "processed": job.get('processed', 0),
+            "added": counters.get('added', 0),
+            "failed": counters.get('failed', 0),
+            "successful_emails": results.get('successful_emails', []),
+            "failures": results.get('failures', []),
+            "summary": job.get('summary'),
+            "error": job.get('error')
+        }
+
+    @classmethod
+    def run_member_import(cls, ctx: JobContext) -> dict:
+        file_path = ctx.payload.get('file_path')
+        if not file_path or not os.path.exists(file_path):
+            raise JobFailed("The uploaded file is no longer available.")
+
+        # The upload is removed once the job ends either way, unless another worker took
+        # the job over and still reads it
+        keep_file = False
+        try:
+            return cls._import_members(ctx, file_path)
+        except JobLost:
+            keep_file = True
+            raise
+        finally:
+            if not keep_file and os.path.exists(file_path):
+                os.remove(file_path)
+
+    @classmethod
+    def _import_members(cls, ctx: JobContext, file_path: str) -> dict:
+        payload = ctx.payload
+        owner_doc = mongo.db.users.find_one({"_id": ObjectId(ctx.job['owner_id'])})
+        if not owner_doc or owner_doc.get('role') != User.Roles.O_CONVENER.value:
+            raise JobFailed("Only the organization convener can import members.")
+        oconvener = OConvener(owner_doc)
+
+        chunk_size = current_app.config.get('IMPORT_JOB_CHUNK_SIZE', 500)
+        try:
+            with RosterReader(file_path, payload.get('original_filename', file_path), chunk_size) as reader:
+                missing_cols = reader.missing_columns()
+                if missing_cols:
+                    raise JobFailed(f"Missing required column(s) in Excel: {', '.join(missing_cols)}.")
+                if ctx.job.get('total') is None and reader.estimated_total is not None:
+                    ctx.set_total(reader.estimated_total)
+
+                for chunk in reader.iter_chunks(start_row=ctx.cursor):
+                    added_emails, failures = MemberService.import_member_rows(
+                        oconvener, chunk, settlement_reference=f"member-import:{ctx.job_id}:{int(chunk.index[0])}"
+                    )
+                    ctx.commit_chunk(
+                        cursor=int(chunk.index[-1]) + 1,
+                        processed=len(chunk),
+                        results={"successful_emails": added_emails, "failures": failures},
+                        counters={"added": len(added_emails), "failed": len(failures)}
+                    )
+        except pd.errors.EmptyDataError:
+            raise JobFailed("Excel file is empty or has no data.")
+        except ValueError as ve:
+            raise JobFailed(f"Error reading Excel file: Invalid Excel format or corrupted file. ({ve})")
+
+        job = job_engine.get(ctx.job_id) or {}
+        counters = job.get('counters') or {}
+        processed = job.get('processed', 0)
+        if job.get('total') != processed:
+            ctx.set_total(processed)
+        success, message = MemberService.summarize_import(processed, counters.get('added', 0), counters.get('failed', 0))
+        return {"success": success, "message": message}
+
+
+job_engine.register(MEMBER_IMPORT_JOB, ImportJobService.run_member_import)
@@ -0,0 +1,146 @@
+import base64
+import json
+import re
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING
+from app.extensions import mongo
+from app.indexes import IndexRegistry
+from app.main.User import User
+
+ACCESS_LEVEL_FILTERS = {"public": 0, "consume": 1, "provide": 2}
+DIRECTORY_SORT_FIELDS = ("email", "username", "membership_fee")
+MEMBER_ROW_PROJECTION = {"email": 1, "username": 1, "access_level": 1, "membership_fee": 1, "user_role": 1, "role": 1}
+
+
+class MemberDirectoryService:
+    """
+    Serves the organization member list page by page for the workspace dashboard.
+    Pages are keyset paginated on (sort field, _id): the cursor carries the last row's
+    sort value and id, so every page is an index range scan instead of a growing skip.
+    Filters (access level, role, email prefix) are applied by the database.
+    """
+    DEFAULT_PAGE_SIZE = 25
+    MAX_PAGE_SIZE = 100
+    _indexes_ready = False
+
+    @classmethod
+    def ensure_indexes(cls):
+        """users(organization_id, email) and users(organization_id, access_level) are declared in app/indexes.py."""
+        IndexRegistry.ensure(["users"])
+
+    @staticmethod
+    def encode_cursor(sort_value, row_id: ObjectId) -> str:
+        raw = json.dumps({"v": sort_value, "id": str(row_id)}).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[any, ObjectId] | None:
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return data["v"], ObjectId(data["id"])
+        except (ValueError, KeyError, TypeError, InvalidId):
+            return None
+
+    @staticmethod
+    def _role_filter(role_name: str) -> dict | None:
+        try:
+            role_value = User.Roles[role_name.upper()].value
+        except KeyError:
+            return None
+        # Members added by the O-Convener carry `role`; role changes are written to `user_role`.
+        return {"$or": [{"user_role": role_value}, {"user_role": {"$exists": False}, "role": role_value}]}
+
+    @staticmethod
+    def _keyset_filter(field: str, direction: int, last_value, last_id: ObjectId) -> dict:
+        """Rows strictly after (last_value, last_id) in the given order; missing values sort as null (lowest)."""
+        id_op = "$gt" if direction == ASCENDING else "$lt"
+        if last_value is None:
+            clauses = [{field: None, "_id": {id_op: last_id}}]
+            if direction == ASCENDING:
+                clauses.append({field: {"$ne": None}})
+            return {"$or": clauses}
+        value_op = "$gt" if direction == ASCENDING else "$lt"
+        clauses = [{field: {value_op: last_value}}, {field: last_value, "_id": {id_op: last_id}}]
+        if direction == DESCENDING:
+            clauses.append({field: None})
+        return {"$or": clauses}
+
+    @classmethod
+    def _to_row(cls, member_doc: dict) -> dict:
+        role_value = member_doc.get("user_role", member_doc.get("role", User.Roles.NORMAL.value))
+        try:
+            role_name = User.Roles(role_value).name
+        except ValueError:
+            role_name = User.Roles.NULL.name
+        return {
+            "user_id": str(member_doc["_id"]),
+            "email": member_doc.get("email", "N/A"),
+            "username": member_doc.get("username", "N/A"),
+            "access_level": member_doc.get("access_level", [False, False, False]),
+            "membership_fee": member_doc.get("membership_fee", 0.0),
+            "role_name": role_name
+        }
+
+    @classmethod
+    def list_members(cls, organization_id: str, exclude_user_id: str | None = None, cursor: str | None = None,
+                     limit: int | None = None, access: str | None = None, role: str | None = None,
+                     email_prefix: str | None = None, sort: str = "email", order: str = "asc") -> tuple[bool, dict | str]:
+        """
+        Returns (True, {"members", "next_cursor", "total"}) or (False, error message).
+        `total` is only counted for the first page, later pages reuse the client's number.
+        """
+        if not organization_id:
+            return False, "Organization is not set."
+        if sort not in DIRECTORY_SORT_FIELDS:
+            return False, f"Unsupported sort field '{sort}'."
+        if order not in ("asc", "desc"):
+            return False, "Order must be 'asc' or 'desc'."
+        direction = ASCENDING if order == "asc" else DESCENDING
+        limit = min(max(limit or cls.DEFAULT_PAGE_SIZE, 1), cls.MAX_PAGE_SIZE)
+
+        if not cls._indexes_ready:
+            cls.ensure_indexes()
+            cls._indexes_ready = True
+
+        conditions: list[dict] = [{"organization_id": organization_id}]
+        if exclude_user_id:
+            conditions.append({"_id": {"$ne": exclude_user_id}})
+        if access:
+            if access == "none":
+                conditions.append({"access_level": {"$not": {"$elemMatch": {"$eq": True}}}})
+            elif access in ACCESS_LEVEL_FILTERS:
+                conditions.append({f"access_level.{ACCESS_LEVEL_FILTERS[access]}": True})
+            else:
+                return False, f"Unknown access level '{access}'."
+        if role:
+            role_filter = cls._role_filter(role)
+            if role_filter is None:
+                return False, f"Unknown role '{role}'."
+            conditions.append(role_filter)
+        if email_prefix:
+            conditions.append({"email": {"$regex": "^" + re.escape(email_prefix.strip())}})
+
+        base_query = {"$and": conditions}
+        query = base_query
+        if cursor:
+            position = cls.decode_cursor(cursor)
+            if position is None:
+                return False, "Invalid cursor."
+            query = {"$and": conditions + [cls._keyset_filter(sort, direction, *position)]}
+
+        docs = list(
+            mongo.db.users.find(query, MEMBER_ROW_PROJECTION)
+            .sort([(sort, direction), ("_id", direction)])
+            .limit(limit + 1)
+        )
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = cls.encode_cursor(docs[-1].get(sort), docs[-1]["_id"])
+
+        return True, {
+            "members": [cls._to_row(doc) for doc in docs],
+            "next_cursor": next_cursor,
+            "total": mongo.db.users.count_documents(base_query) if not cursor else None
+        }
@@ -1,65 +1,120 @@
 from datetime import datetime, timezone
-import re # For email validation if used here
+from typing import BinaryIO
 from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
 from app.extensions import mongo
 from app.models.ActivityRecord import ActivityRecord
 from ..models import Workspace, OConvener 
 from app.main.User import User 
-from datetime import datetime, UTC
+from app.main.IdentityService import IdentityService
 import pandas as pd
-from io import BytesIO
 from app.payment.BankAccount import BankAccount
+from app.payment.FeeSettlement import FeeSettlement
+from .RosterReader import RosterReader, ROSTER_ACCESS_LEVEL_COLUMNS, ROSTER_FEE_COLUMN
+
+MEMBER_EMAIL_PATTERN = r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$"
+EXCEL_BOOL_TOKENS = {
+    'true': True, 'yes': True, '1': True, 't': True, 'y': True, '是': True, '真': True,
+    'false': False, 'no': False, '0': False, 'f': False, 'n': False, '否': False, '假': False
+}
 
 class MemberService:
+    @classmethod
+    def _resolve_fee_accounts(cls, oconvener: OConvener) -> tuple[BankAccount | None, BankAccount | None, str | None]:
+        """Looks up the organization account and the EDBA account that receives membership fees."""
+        org_account = BankAccount.get_organization_account(oconvener.organization_id)
+        if not org_account:
+            return None, None, "Organization bank account not found."
+        edba_account = BankAccount.get_edba_account()
+        if not edba_account:
+            return org_account, None, "EDBA account not found."
+        return org_account, edba_account, None
+
+    @classmethod
+    def _build_new_member_doc(cls, oconvener: OConvener, member_email: str, member_data: dict[str, any]) -> dict[str, any]:
+        # For new user, ensure _id is ObjectId and user_id (string) is consistent with User model
+        new_user_object_id = ObjectId()
+        now_utc = datetime.now(timezone.utc)
+        return {
+            "_id": new_user_object_id, 
+            "user_id": str(new_user_object_id), # Store string ID as per User model
+            "email": member_email,
+            "username": member_data.get('username', member_email.split('@')[0]),
+            "role": member_data.get('user_role', User.Roles.NORMAL).value,
+            "access_level": member_data.get('access_level', [False, False, False]), 
+            "membership_fee": member_data.get('membership_fee', 0.0),
+            "organization_id": oconvener.organization_id,
+            "organization_name": oconvener.organization_name, # Set correct org name
+            "created_at": now_utc,
+            "last_updated_at": now_utc
+        }
+
+    @classmethod
+    def _build_association_update(cls, oconvener: OConvener, member_data: dict[str, any]) -> dict[str, any]:
+        update_fields = {
+            "organization_id": oconvener.organization_id,
+            "organization_name": oconvener.organization_name, # Set correct org name
+            "last_updated_at": datetime.now(timezone.utc)
+        }
+        # Ensure role and access_level are correctly handled if provided
+        if 'user_role' in member_data:
+            role_value = member_data['user_role']
+            update_fields['user_role'] = role_value.value if isinstance(role_value, User.Roles) else role_value
+        if 'access_level' in member_data: # Use access_level
+            update_fields['access_level'] = member_data['access_level']
+        if 'membership_fee' in member_data:
+             update_fields['membership_fee'] = member_data['membership_fee']
+        if 'username' in member_data and member_data['username']:
+             update_fields['username'] = member_data['username']
+        return update_fields
+
+    @classmethod
+    def _existing_member_conflict(cls, oconvener: OConvener, member_email: str, existing_user_doc: dict) -> str | None:
+        existing_org_id = existing_user_doc.get('organization_id')
+        if existing_org_id == oconvener.organization_id:
+            return f"User {member_email} is already in your organization."
+        if existing_org_id is not None:
+            return f"User {member_email} belongs to another organization."
+        return None
+
     @classmethod
     def add_member(cls, oconvener: OConvener, member_email: str, member_data: dict[str, any]) -> tuple[bool, str]:
+        users_collection = mongo.db.users
+        existing_user_doc = users_collection.find_one({"email": member_email})
+        if existing_user_doc:
+            conflict = cls._existing_member_conflict(oconvener, member_email, existing_user_doc)
+            if conflict:
+                return False, conflict
+
         # --- 新增：银行转账逻辑 ---
         membership_fee = member_data.get('membership_fee', 0.0)
         print(membership_fee)
+        settlement_id, org_account, edba_account = None, None, None
         if membership_fee > 0:
-            #print(result['bankAccount'])
-            org_account = BankAccount.get_organization_account(oconvener.organization_id)
-            if not org_account:
-                return False, "Organization bank account not found."
-            edba_account = None
-            # 通过account_number查找EDBA账户
-            edba_account_data = mongo.db.BANK_ACCOUNT.find_one({"account": "596117071864958"})
-            if edba_account_data:
-                from app.payment.BankAccount import BankAccount as BA
-                edba_account = BA.from_dict(edba_account_data)
-            if not edba_account:
-                return False, "EDBA account not found."
-            if not org_account.transfer_membership_fee(edba_account, membership_fee):
+            org_account, edba_account, account_error = cls._resolve_fee_accounts(oconvener)
+            if account_error:
+                return False, account_error
+            settlement_id, paid_line_ids = FeeSettlement.settle(
+                org_account, edba_account, oconvener.organization_id,
+                [{"line_id": 0, "email": member_email, "fee": membership_fee}]
+            )
+            if not paid_line_ids:
                 return False, "Organization bank account balance is insufficient or transfer failed."
         # --- 原有逻辑 ---
-        users_collection = mongo.db.users
-        existing_user_doc = users_collection.find_one({"email": member_email})
+        success, message = cls._write_member(oconvener, member_email, member_data, existing_user_doc)
+        if not success and settlement_id:
+            FeeSettlement.refund(settlement_id, org_account, edba_account, {0})
+        return success, message
 
+    @classmethod
+    def _write_member(cls, oconvener: OConvener, member_email: str, member_data: dict[str, any], existing_user_doc: dict | None) -> tuple[bool, str]:
+        users_collection = mongo.db.users
         if existing_user_doc:
-            existing_org_id = existing_user_doc.get('organization_id')
-            if existing_org_id == oconvener.organization_id:
-                return False, f"User {member_email} is already in your organization."
-            if existing_org_id is not None:
-                return False, f"User {member_email} belongs to another organization."
-            
-            update_fields = {
-                "organization_id": oconvener.organization_id,
-                "organization_name": oconvener.organization_name, # Set correct org name
-                "last_updated_at": datetime.now(timezone.utc)
-            }
-            # Ensure role and access_level are correctly handled if provided
-            if 'user_role' in member_data:
-                role_value = member_data['user_role']
-                update_fields['user_role'] = role_value.value if isinstance(role_value, User.Roles) else role_value
-            if 'access_level' in member_data: # Use access_level
-                update_fields['access_level'] = member_data['access_level']
-            if 'membership_fee' in member_data:
-                 update_fields['membership_fee'] = member_data['membership_fee']
-            if 'username' in member_data and member_data['username']:
-                 update_fields['username'] = member_data['username']
-            
+            update_fields = cls._build_association_update(oconvener, member_data)
             try:
                 result = users_collection.update_one({"_id": existing_user_doc["_id"]}, {"$set": update_fields})
+                IdentityService.invalidate(existing_user_doc["_id"], member_email)
                 if result.modified_count > 0:
                     #ActivityRecord(userAccount=oconvener.email, activityName="Member Added (Existing User)", details=f"Org:{oconvener.organization_id}, Member:{member_email}").addRecord()
                     return True, f"Existing user {member_email} added to organization."
@@ -68,23 +123,7 @@ class MemberService:
                 print(f"DB Error associating existing member: {e}")
                 return False, "Server error while adding existing member."
         else:
-            # For new user, ensure _id is ObjectId and user_id (string) is consistent with User model
-            new_user_object_id = ObjectId()
-            new_user_id_str = str(new_user_object_id)
-
-            user_doc_to_insert = {
-                "_id": new_user_object_id, 
-                "user_id": new_user_id_str, # Store string ID as per User model
-                "email": member_email,
-                "username": member_data.get('username', member_email.split('@')[0]),
-                "role": member_data.get('user_role', User.Roles.NORMAL).value,
-                "access_level": member_data.get('access_level', [False, False, False]), 
-                "membership_fee": member_data.get('membership_fee', 0.0),
-                "organization_id": oconvener.organization_id,
-                "organization_name": oconvener.organization_name, # Set correct org name
-                "created_at": datetime.now(timezone.utc),
-                "last_updated_at": datetime.now(timezone.utc)
-            }
+            user_doc_to_insert = cls._build_new_member_doc(oconvener, member_email, member_data)
             try:
                 users_collection.insert_one(user_doc_to_insert)
                 #ActivityRecord(userAccount=oconvener.email, activityName="Member Added (New User)", details=f"Org:{oconvener.organization_id}, Member:{member_email}, ID:{new_user_id_str}").addRecord()
@@ -104,163 +143,241 @@ class MemberService:
         for i, is_selected in enumerate(access_level):
             if is_selected:                
                 return round(access_level_total_fees.get(i, 0.0), 2)
+
+    @classmethod
+    def _parse_bool_column(cls, column: pd.Series) -> pd.Series:
+        """
+        Column-wise version of the Excel boolean parser.
+        Returns a Series holding True/False for parseable cells and None for anything else.
+        """
+        parsed = pd.Series(None, index=column.index, dtype=object)
+        is_text = column.map(lambda value: isinstance(value, str)).astype(bool)
+        if is_text.any():
+            tokens = column[is_text].str.strip().str.lower()
+            parsed[is_text] = tokens.map(EXCEL_BOOL_TOKENS).astype(object).where(tokens.isin(EXCEL_BOOL_TOKENS.keys()), None)
+        non_text = ~is_text & column.notna()
+        if non_text.any():
+            numeric = pd.to_numeric(column[non_text].astype(object), errors='coerce')
+            parsed[non_text] = numeric.ne(0).astype(object).where(numeric.notna(), None)
+        return parsed
+
+    @classmethod
+    def _parse_fee_column(cls, column: pd.Series) -> tuple[pd.Series, pd.Series]:
+        """Returns (parsed fee, format_error mask) for the optional membership fee column."""
+        is_text = column.map(lambda value: isinstance(value, str)).astype(bool)
+        as_text = column.where(is_text, None).astype(object)
+        stripped = as_text[is_text].str.replace(r'[^\d\.]', '', regex=True)
+        raw_numbers = column.where(~is_text, None).astype(object)
+        raw_numbers[is_text] = stripped.where(stripped != '', None)
+        fees = pd.to_numeric(raw_numbers, errors='coerce')
+        format_error = column.notna() & fees.isna()
+        return fees, format_error
+
+    @classmethod
+    def _validate_member_rows(cls, df: pd.DataFrame, access_level_column_details: list[tuple[str, str]], fee_col: str) -> tuple[list[tuple[int, str, dict]], list[tuple[int, dict[str, str]]]]:
+        """
+        Validates a whole roster frame with column operations.
+        Returns the rows that are ready to be written as (index, email, member_data) and the
+        failed rows as (index, failure detail), using the same reasons as the row-by-row import.
+        """
+        row_identifier = "Excel row " + (df.index.to_series() + 2).astype(str)
+        reasons = pd.Series(None, index=df.index, dtype=object)
+
+        def fail(mask: pd.Series, reason):
+            pending = reasons.isna() & mask.fillna(False).astype(bool)
+            if isinstance(reason, pd.Series):
+                reasons[pending] = reason[pending]
+            else:
+                reasons[pending] = reason
+
+        email_raw = df['email']
+        email = email_raw.astype(str).str.strip().str.lower()
+        email_missing = email_raw.isna() | email_raw.astype(str).str.strip().eq('')
+        fail(email_missing, "email is missing.")
+        fail(~email.str.match(MEMBER_EMAIL_PATTERN), "Invalid email format.")
+
+        username_raw = df['username']
+        username = username_raw.astype(str).str.strip()
+        fail(username_raw.isna() | username.eq(''), "username is missing or empty.")
+
+        parsed_levels = []
+        for col_internal_name, col_display_name in access_level_column_details:
+            access_raw = df[col_internal_name]
+            parsed = cls._parse_bool_column(access_raw)
+            fail(access_raw.isna(), f"{col_display_name} value is missing. Please provide TRUE or FALSE.")
+            fail(parsed.isna(), f"Invalid value for {col_display_name}: '" + access_raw.astype(str) + "'. Use TRUE/FALSE, YES/NO, 1/0.")
+            parsed_levels.append(parsed.where(parsed.notna(), False).astype(bool))
+
+        levels = pd.concat(parsed_levels, axis=1, keys=[details[1] for details in access_level_column_details])
+        true_count = levels.sum(axis=1)
+        access_level_names_str = ", ".join([details[1] for details in access_level_column_details])
+        fail(true_count.eq(0), f"No access level selected. Exactly one of '{access_level_names_str}' must be TRUE.")
+        selected_names = levels.apply(lambda row: ", ".join(row.index[row.values]), axis=1) if len(levels) else pd.Series(dtype=object)
+        fail(true_count.gt(1), "Multiple access levels selected (" + selected_names + f"). Exactly one of '{access_level_names_str}' must be TRUE.")
+
+        # Fall back to the access level based fee when the column is absent or the cell is empty.
+        first_level = levels.values.argmax(axis=1) if len(levels) else []
+        fees = pd.Series([cls._calculate_membership_fee([i == level for i in range(3)]) for level in first_level], index=df.index, dtype=float)
+        if fee_col in df.columns:
+            fee_raw = df[fee_col]
+            parsed_fees, fee_format_error = cls._parse_fee_column(fee_raw)
+            fail(fee_format_error, "Invalid membership fee format: '" + fee_raw.astype(str) + "'.")
+            fail(parsed_fees < 0, "Membership fee cannot be negative.")
+            fees = parsed_fees.round(2).where(fee_raw.notna(), fees)
+
+        failures = []
+        for index in reasons.index[reasons.notna()]:
+            failures.append((index, {
+                "row": row_identifier[index],
+                "email": f"N/A at Excel row {index + 2}" if email_missing[index] else email[index],
+                "reason": reasons[index]
+            }))
+
+        valid = reasons.isna()
+        level_lists = levels[valid].values.tolist()
+        ready_rows = []
+        for (index, member_email, member_username, fee), access_level in zip(
+                zip(df.index[valid], email[valid], username[valid], fees[valid]), level_lists):
+            ready_rows.append((index, member_email, {
+                "username": member_username,
+                "role": User.Roles.NORMAL.value,
+                "access_level": [bool(level) for level in access_level],
+                "membership_fee": float(fee)
+            }))
+        return ready_rows, failures
+
+    @classmethod
+    def _bulk_add_members(cls, oconvener: OConvener, ready_rows: list[tuple[int, str, dict]], settlement_reference: str | None = None) -> tuple[list[tuple[int, str]], list[tuple[int, dict[str, str]]]]:
+        """
+        Writes validated rows with one prefetch query and one unordered bulk_write.
+        Per-row outcomes mirror add_member. A settlement_reference keeps the fee charge of a
+        re-run batch (e.g. a resumed import chunk) from being taken twice.
+        """
+        if not ready_rows:
+            return [], []
+        users_collection = mongo.db.users
+        emails = list({member_email for _, member_email, _ in ready_rows})
+        existing_by_email = {
+            doc['email']: doc for doc in users_collection.find(
+                {"email": {"$in": emails}}, {"_id": 1, "email": 1, "organization_id": 1})
+        }
+
+        failures = []
+        candidates = []
+        queued_emails = set()
+
+        for index, member_email, member_data in ready_rows:
+            row_detail = {"row": f"Excel row {index + 2}", "email": member_email}
+            existing_user_doc = existing_by_email.get(member_email)
+            if member_email in queued_emails:
+                failures.append((index, {**row_detail, "reason": f"User {member_email} is already in your organization."}))
+                continue
+            if existing_user_doc:
+                conflict = cls._existing_member_conflict(oconvener, member_email, existing_user_doc)
+                if conflict:
+                    failures.append((index, {**row_detail, "reason": conflict}))
+                    continue
+            candidates.append((index, member_email, member_data, existing_user_doc))
+            queued_emails.add(member_email)
+
+        # Settle all fees of the batch at once; rows whose fee no longer fits the balance fail.
+        fee_lines = [
+            {"line_id": int(index), "email": member_email, "fee": member_data.get('membership_fee', 0.0)}
+            for index, member_email, member_data, _ in candidates if member_data.get('membership_fee', 0.0) > 0
+        ]
+        paid_line_ids = set()
+        settlement = (None, None, None)
+        account_error = None
+        if fee_lines:
+            org_account, edba_account, account_error = cls._resolve_fee_accounts(oconvener)
+            if not account_error:
+                settlement_id, paid_line_ids = FeeSettlement.settle(org_account, edba_account, oconvener.organization_id, fee_lines, reference=settlement_reference)
+                settlement = (settlement_id, org_account, edba_account)
+
+        operations = []
+        operation_rows = []
+        for index, member_email, member_data, existing_user_doc in candidates:
+            if member_data.get('membership_fee', 0.0) > 0 and int(index) not in paid_line_ids:
+                reason = account_error or "Organization bank account balance is insufficient or transfer failed."
+                failures.append((index, {"row": f"Excel row {index + 2}", "email": member_email, "reason": reason}))
+                continue
+            if existing_user_doc:
+                update_fields = cls._build_association_update(oconvener, member_data)
+                operations.append(UpdateOne({"_id": existing_user_doc["_id"]}, {"$set": update_fields}))
+                operation_rows.append((index, member_email, "Server error while adding existing member."))
+            else:
+                operations.append(InsertOne(cls._build_new_member_doc(oconvener, member_email, member_data)))
+                operation_rows.append((index, member_email, "Server error while creating new member."))
+
+        failed_operation_indexes = set()
+        if operations:
+            try:
+                users_collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as bwe:
+                for write_error in bwe.details.get('writeErrors', []):
+                    failed_operation_indexes.add(write_error['index'])
+                print(f"DB Error during bulk member import: {bwe.details.get('writeErrors', [])[:5]}")
+            except Exception as e:
+                print(f"DB Error during bulk member import: {e}")
+                failed_operation_indexes = set(range(len(operations)))
+            existing_members = [(existing_user_doc["_id"], member_email) for _, member_email, _, existing_user_doc in candidates if existing_user_doc]
+            IdentityService.invalidate_many([user_id for user_id, _ in existing_members], [email for _, email in existing_members])
+
+        settlement_id, org_account, edba_account = settlement
+        refund_line_ids = {int(operation_rows[op_index][0]) for op_index in failed_operation_indexes} & paid_line_ids
+        if refund_line_ids:
+            FeeSettlement.refund(settlement_id, org_account, edba_account, refund_line_ids)
+
+        added = []
+        for op_index, (index, member_email, error_reason) in enumerate(operation_rows):
+            if op_index in failed_operation_indexes:
+                failures.append((index, {"row": f"Excel row {index + 2}", "email": member_email, "reason": error_reason}))
+            else:
+                added.append((index, member_email))
+        return added, failures
     
     @classmethod
-    def add_members_from_excel(cls, oconvener: 'OConvener', file_stream: BytesIO) -> tuple[bool, str, list[str], list[dict[str, str]]]:
+    def import_member_rows(cls, oconvener: OConvener, df: pd.DataFrame, settlement_reference: str | None = None) -> tuple[list[str], list[dict[str, str]]]:
+        """
+        Validates and writes one block of roster rows. The frame index must be the 0-based
+        position of the row in the sheet so that failures point at the right Excel row.
+        Returns (added emails, failure details), both in sheet order.
+        """
+        ready_rows, validation_failures = cls._validate_member_rows(df, ROSTER_ACCESS_LEVEL_COLUMNS, ROSTER_FEE_COLUMN)
+        added_rows, write_failures = cls._bulk_add_members(oconvener, ready_rows, settlement_reference)
+        added_emails = [member_email for _, member_email in sorted(added_rows, key=lambda item: item[0])]
+        failure_details = [detail for _, detail in sorted(validation_failures + write_failures, key=lambda item: item[0])]
+        return added_emails, failure_details
+
+    @classmethod
+    def summarize_import(cls, processed_count: int, added_or_associated_count: int, failed_count: int) -> tuple[bool, str]:
+        summary_message = f"Processed {processed_count} entries. {added_or_associated_count} members added/associated. {failed_count} failures."
+        overall_success = processed_count > 0 and added_or_associated_count > 0
+        
+        if processed_count > 0 and added_or_associated_count == 0 and failed_count > 0:
+            overall_success = False 
+        elif processed_count == 0:
+            overall_success = False
+            summary_message = "No valid entries found to process."
+        return overall_success, summary_message
+    
+    @classmethod
+    def add_members_from_excel(cls, oconvener: 'OConvener', file_stream: BinaryIO, filename: str = 'members.xlsx', chunk_size: int = 500) -> tuple[bool, str, list[str], list[dict[str, str]]]:
         successful_adds_emails = []
         failed_adds_details = []
         processed_count = 0
-        added_or_associated_count = 0
 
         try:
-            df = pd.read_excel(file_stream, engine='openpyxl')
-            df.columns = [str(col).strip().lower().replace('_', ' ') for col in df.columns]
-
-            email_col = 'email'
-            username_col = 'username'
-            public_col = 'access public'
-            consume_col = 'access consume'
-            provide_col = 'access provide'
-            fee_col = 'membership fee'
-
-            required_columns = {
-                email_col: "email",
-                username_col: "username",
-                public_col: "access public",
-                consume_col: "access consume",
-                provide_col: "access provide"
-            }
-
-            access_level_column_details = [
-                (public_col, required_columns[public_col]),
-                (consume_col, required_columns[consume_col]),
-                (provide_col, required_columns[provide_col])
-            ]
-
-            missing_cols = [display_name for internal_name, display_name in required_columns.items() if internal_name not in df.columns]
-            if missing_cols:
-                return False, f"Missing required column(s) in Excel: {', '.join(missing_cols)}.", [], []
-
-            for index, row in df.iterrows():
-                processed_count += 1
-                current_email_for_error_reporting = f"N/A at Excel row {index + 2}"
-                row_identifier = f"Excel row {index + 2}"
-
-                try:
-                    email_val = row.get(email_col)
-                    if pd.isna(email_val) or not str(email_val).strip():
-                        failed_adds_details.append({"row": row_identifier, "email": current_email_for_error_reporting, "reason": f"{required_columns[email_col]} is missing."})
-                        continue
-                    email = str(email_val).strip().lower()
-                    current_email_for_error_reporting = email
-
-                    if not re.match(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$", email):
-                        failed_adds_details.append({"row": row_identifier, "email": email, "reason": "Invalid email format."})
-                        continue
-
-                    username_val = row.get(username_col)
-                    if pd.isna(username_val) or not str(username_val).strip():
-                        failed_adds_details.append({"row": row_identifier, "email": email, "reason": f"{required_columns[username_col]} is missing or empty."})
-                        continue
-                    username = str(username_val).strip()
-                    if not username:
-                        failed_adds_details.append({"row": row_identifier, "email": email, "reason": f"{required_columns[username_col]} cannot be empty."})
-                        continue
-                        
-                    def parse_bool_excel(value_to_parse, col_display_name: str) -> bool | None:
-                        if isinstance(value_to_parse, bool): return value_to_parse
-                        if isinstance(value_to_parse, (int, float)): return bool(value_to_parse)
-                        if isinstance(value_to_parse, str):
-                            val_lower = value_to_parse.strip().lower()
-                            if val_lower in ['true', 'yes', '1', 't', 'y', '是', '真']: return True
-                            if val_lower in ['false', 'no', '0', 'f', 'n', '否', '假']: return False
-                        return None
-
-                    access_level_values = []
-                    row_access_levels_valid_parsing = True 
-                    
-                    for col_internal_name, col_display_name in access_level_column_details:
-                        access_val = row.get(col_internal_name)
-                        if pd.isna(access_val):
-                            failed_adds_details.append({"row": row_identifier, "email": email, "reason": f"{col_display_name} value is missing. Please provide TRUE or FALSE."})
-                            row_access_levels_valid_parsing = False
-                            break
-                        
-                        parsed_bool = parse_bool_excel(access_val, col_display_name)
-                        if parsed_bool is None:
-                            failed_adds_details.append({"row": row_identifier, "email": email, "reason": f"Invalid value for {col_display_name}: '{access_val}'. Use TRUE/FALSE, YES/NO, 1/0."})
-                            row_access_levels_valid_parsing = False
-                            break
-                        access_level_values.append(parsed_bool)
-                    
-                    if not row_access_levels_valid_parsing:
-                        continue 
-                    true_count = sum(1 for level_is_true in access_level_values if level_is_true is True)
-
-                    if true_count == 0:
-                        reason_msg = "No access level selected. "
-                        access_level_names_str = ", ".join([details[1] for details in access_level_column_details])
-                        reason_msg += f"Exactly one of '{access_level_names_str}' must be TRUE."
-                        failed_adds_details.append({"row": row_identifier, "email": email, "reason": reason_msg})
-                        continue
-                    elif true_count > 1:
-                        selected_levels_display_names = []
-                        for i, is_true in enumerate(access_level_values):
-                            if is_true:
-                                selected_levels_display_names.append(access_level_column_details[i][1]) # 获取显示名称
-                        
-                        reason_msg = f"Multiple access levels selected ({', '.join(selected_levels_display_names)}). "
-                        access_level_names_str = ", ".join([details[1] for details in access_level_column_details])
-                        reason_msg += f"Exactly one of '{access_level_names_str}' must be TRUE."
-                        failed_adds_details.append({"row": row_identifier, "email": email, "reason": reason_msg})
-                        continue
-                    
-                    access_level = access_level_values # 此列表现在保证有且仅有一个 True
-
-                    membership_fee = None
-                    if fee_col in df.columns and pd.notna(row.get(fee_col)):
-                        try:
-                            fee_val_raw = row[fee_col]
-                            if isinstance(fee_val_raw, str):
-                                fee_val_str = re.sub(r'[^\d\.]', '', fee_val_raw)
-                                if not fee_val_str: raise ValueError("Empty string after stripping currency symbols.")
-                                fee_val = float(fee_val_str)
-                            else:
-                                fee_val = float(fee_val_raw)
-
-                            if fee_val < 0:
-                                failed_adds_details.append({"row": row_identifier, "email": email, "reason": "Membership fee cannot be negative."})
-                                continue
-                            membership_fee = round(fee_val, 2)
-                        except ValueError:
-                            failed_adds_details.append({"row": row_identifier, "email": email, "reason": f"Invalid membership fee format: '{row[fee_col]}'."})
-                            continue
-                    
-                    if membership_fee is None:
-                        membership_fee = cls._calculate_membership_fee(access_level)
-
-                    member_data = {
-                        "username": username,
-                        "role": User.Roles.NORMAL.value,
-                        "access_level": access_level,
-                        "membership_fee": membership_fee
-                    }
-
-                    success, message = cls.add_member(
-                        oconvener=oconvener,
-                        member_email=email,
-                        member_data=member_data
-                    )
-
-                    if success:
-                        successful_adds_emails.append(email)
-                        added_or_associated_count += 1
-                    else:
-                        failed_adds_details.append({"row": row_identifier, "email": email, "reason": message})
-
-                except Exception as e_row:
-                    failed_adds_details.append({"row": row_identifier, "email": current_email_for_error_reporting, "reason": f"Error processing row: {str(e_row)}"})
-                    continue
+            with RosterReader(file_stream, filename, chunk_size) as reader:
+                missing_cols = reader.missing_columns()
+                if missing_cols:
+                    return False, f"Missing required column(s) in Excel: {', '.join(missing_cols)}.", [], []
+
+                for chunk in reader.iter_chunks():
+                    processed_count += len(chunk)
+                    added_emails, failures = cls.import_member_rows(oconvener, chunk)
+                    successful_adds_emails.extend(added_emails)
+                    failed_adds_details.extend(failures)
 
         except pd.errors.EmptyDataError:
              return False, "Excel file is empty or has no data.", [], []
@@ -273,14 +390,7 @@ class MemberService:
         except Exception as e_file:
             return False, f"Critical error processing Excel file: {str(e_file)}", [], [{"email": "File Level Error", "reason": str(e_file)}]
 
-        summary_message = f"Processed {processed_count} entries. {added_or_associated_count} members added/associated. {len(failed_adds_details)} failures."
-        overall_success = processed_count > 0 and added_or_associated_count > 0
-        
-        if processed_count > 0 and added_or_associated_count == 0 and len(failed_adds_details) > 0:
-            overall_success = False 
-        elif processed_count == 0:
-            overall_success = False
-            summary_message = "No valid entries found to process."
+        overall_success, summary_message = cls.summarize_import(processed_count, len(successful_adds_emails), len(failed_adds_details))
         #print(failed_adds_details)
         return overall_success, summary_message, successful_adds_emails, failed_adds_details
 
@@ -309,6 +419,7 @@ class MemberService:
                 {"$unset": {"organization_id": "", "organization_name": ""},
                  "$set": {"last_updated_at": datetime.now(timezone.utc)}}
             )
+            IdentityService.invalidate(member_doc["_id"], member_doc.get("email"))
             if result.modified_count > 0:
                 #ActivityRecord(userAccount=oconvener.email, activityName="Member Removed", details=f"Org:{oconvener.organization_id}, Member:{target_email_lower}").addRecord()
                 return True, f"Member {target_email_lower} removed from organization."
@@ -368,6 +479,7 @@ class MemberService:
                 {"_id": member_obj_id, "organization_id": oconvener.organization_id},
                 {"$set": allowed_updates}
             )
+            IdentityService.invalidate(member_obj_id)
             if result.matched_count == 0:
                 return False, "Member not found in your organization or no changes made."
             if result.modified_count > 0:
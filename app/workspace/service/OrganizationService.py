@@ -1,16 +1,38 @@
+import copy
 from datetime import datetime, timezone
 import re # For email validation if used here
 from bson import ObjectId
+from flask import current_app
+from pymongo import ReturnDocument
+from app.cache import TTLCache
 from app.extensions import mongo
+from app.jobs import job_engine, JobContext, JobFailed
+from app.datauser.models.policy import Policy
 from app.models.ActivityRecord import ActivityRecord
 # Assuming User base class and OConvener are now in .models
 from ..models import Workspace, OConvener 
 from app.main.User import User 
+from app.main.IdentityService import IdentityService
 from app.auth.utils import is_valid_email
 from datetime import datetime, UTC
-from ..utils import ACTIVE, PENDING_EADMIN_APPROVAL, PENDING_SEADMIN_APPROVAL, REJECTED_BY_EADMIN, REJECTED_BY_SEADMIN, NOT_SUBMITTED
+from ..utils import ACTIVE, PENDING_EADMIN_APPROVAL, PENDING_SEADMIN_APPROVAL, REJECTED_BY_EADMIN, REJECTED_BY_SEADMIN, NOT_SUBMITTED, registration_counters
+
+ORG_RENAME_JOB = "org_rename"
 
 class OrganizationService:
+    # Organization records by organization_id (per worker). Every write to
+    # org_register_request must call invalidate_organization_cache().
+    _org_cache = TTLCache("organizations", maxsize=2000, ttl=60)
+
+    @classmethod
+    def init_app(cls, app):
+        cls._org_cache.configure(maxsize=app.config.get('ORG_CACHE_SIZE', 2000), ttl=app.config.get('ORG_CACHE_TTL', 60))
+
+    @classmethod
+    def invalidate_organization_cache(cls, organization_id: str):
+        if organization_id:
+            cls._org_cache.delete(organization_id)
+
     @classmethod
     def submit_org_for_approval(cls, oconvener: OConvener, org_name: str, proof_document: str, email: str) -> tuple[bool, str]:
         '''
@@ -47,6 +69,8 @@ class OrganizationService:
                     {"_id": user_object_id_to_update}, # Use ObjectId here
                     {"$set": {"organization_name": oconvener.organization_name, "last_updated_at": datetime.now(UTC)}}
                 )
+                # The cached identity still carries the old organization name
+                IdentityService.invalidate(user_object_id_to_update, oconvener.email)
 
                 # Corrected typo: match_count -> matched_count
                 if update_result.matched_count == 0:
@@ -83,41 +107,57 @@ class OrganizationService:
         }
 
         pending_collection.insert_one(request_data)
-        org_collection = mongo.db.org_register_request
-        org_collection.insert_one(request_data)
+        registration_counters.move(None, PENDING_EADMIN_APPROVAL)
+        cls.invalidate_organization_cache(oconvener.organization_id)
 
         #ActivityRecord(userAccount=oconvener.email, activityName="Organization submitted for approval", details=f"Org ID on User: {oconvener.organization_id}, Submitted Name: {org_name}").addRecord()
         return True, "Organization '{org_name}' submitted for E-Admin approval."
     
     @classmethod
     def update_org_name(cls, oconvener: OConvener, new_name: str) -> bool:
+        """
+        Renames the organization record and the convener's own account right away; the
+        copies of the name on members, notifications and policies are updated by an
+        org_rename background job, so the request does not depend on the member count.
+        """
         org_collection = mongo.db.org_register_request
         users_collection = mongo.db.users
         now_utc = datetime.now(UTC)
         try:
             # update 'organizations' collection org name
-            result_org_update = org_collection.update_one(
+            org_before = org_collection.find_one_and_update(
                 {"organization_id": oconvener.organization_id, "status": ACTIVE}, 
-                {"$set": {"organization_name": new_name, "last_updated_at": now_utc}}
+                {"$set": {"organization_name": new_name, "last_updated_at": now_utc}},
+                projection={"organization_name": 1},
+                return_document=ReturnDocument.BEFORE
             )
-            if result_org_update.matched_count == 0:
+            if org_before is None:
                 message = f"Organization {oconvener.organization_id} not found or not active for name update in 'organizations' collection."
                 print(message)
                 return False, message
+            cls.invalidate_organization_cache(oconvener.organization_id)
 
             oconvener.organization_name = new_name
+            if oconvener.user_id and oconvener.user_id != "-1":
+                users_collection.update_one(
+                    {"_id": ObjectId(oconvener.user_id)},
+                    {"$set": {"organization_name": new_name, "last_updated_at": now_utc}}
+                )
+                IdentityService.invalidate(oconvener.user_id, oconvener.email)
+
             # update all user belongs to organization
-            update_users_result = users_collection.update_many(
-                {"organization_id": oconvener.organization_id}, 
-                {"$set": {"organization_name": new_name, "last_updated_at": now_utc}}
-            )
+            job_engine.submit(ORG_RENAME_JOB, oconvener.get_id(), {
+                "organization_id": oconvener.organization_id,
+                "old_name": org_before.get("organization_name"),
+                "new_name": new_name
+            })
                     
             # ActivityRecord(
             #     userAccount=oconvener.email, 
             #     activityName="Organization Name Updated (Org Table and All Members)",
-            #     details=f"Org ID: {oconvener.organization_id}, New Name: {new_name}, Users Updated: {update_users_result.modified_count}"
+            #     details=f"Org ID: {oconvener.organization_id}, New Name: {new_name}"
             # ).addRecord()
-            return True, f"Organization name updated to '{new_name}' successfully for the organization and its members."
+            return True, f"Organization name updated to '{new_name}'. Member records are being updated in the background."
 
         except Exception as e:
             error_message = f"Error updating organization name for {oconvener.organization_id}: {e}"
@@ -125,13 +165,77 @@ class OrganizationService:
             #ActivityRecord(userAccount=oconvener.email, activityName="Org Name Update DB Error", details=str(e)).addRecord()
             return False, f"Server error during organization name update: {e}"
 
+    @staticmethod
+    def _active_org_name(organization_id: str) -> str | None:
+        org_doc = mongo.db.org_register_request.find_one(
+            {"organization_id": organization_id, "status": ACTIVE}, {"organization_name": 1}
+        )
+        return org_doc.get("organization_name") if org_doc else None
+
+    @classmethod
+    def run_org_rename(cls, ctx: JobContext) -> dict:
+        """
+        Copies the organization's current name onto its members and notifications (by
+        organization_id) and onto the policies that carry the old name, ORG_RENAME_CHUNK_SIZE
+        documents per write. The name is re-read for every chunk and only documents that
+        do not have it yet are touched, so an interrupted job can simply run again and
+        overlapping renames end with the latest name everywhere.
+        """
+        organization_id = ctx.payload.get("organization_id")
+        old_name = ctx.payload.get("old_name")
+        chunk_size = current_app.config.get('ORG_RENAME_CHUNK_SIZE', 1000)
+        # Names are not unique, so members and notifications are selected by organization_id;
+        # only policies, which carry no id, are matched on the old name
+        targets = [
+            ("users", "organization_name", {"organization_id": organization_id}),
+            ("notifications", "organization_name", {"organization_id": organization_id})
+        ]
+        if old_name:
+            targets.append((Policy.COLLECTION, "organization", {"organization": old_name}))
+
+        for collection_name, field, query in targets:
+            collection = mongo.db[collection_name]
+            while True:
+                current_name = cls._active_org_name(organization_id)
+                if current_name is None:
+                    raise JobFailed("The organization is no longer active.")
+                chunk_query = {"$and": [query, {field: {"$ne": current_name}}]}
+                chunk_ids = [doc["_id"] for doc in collection.find(chunk_query, {"_id": 1}).limit(chunk_size)]
+                if not chunk_ids:
+                    break
+                update = {field: current_name}
+                if collection_name == "users":
+                    update["last_updated_at"] = datetime.now(UTC)
+                result = collection.update_many({"$and": [{"_id": {"$in": chunk_ids}}, chunk_query]}, {"$set": update})
+                if collection_name == "users":
+                    IdentityService.invalidate_organization(organization_id)
+                ctx.commit_chunk(
+                    cursor=ctx.cursor + 1,
+                    processed=result.modified_count,
+                    counters={collection_name: result.modified_count}
+                )
+
+        counters = (job_engine.get(ctx.job_id) or {}).get('counters') or {}
+        return {
+            "success": True,
+            "message": f"Organization name propagated: {counters.get('users', 0)} members, "
+                       f"{counters.get('notifications', 0)} notifications, {counters.get(Policy.COLLECTION, 0)} policies updated."
+        }
+
     @classmethod
     def get_organization_details(cls, organization_id: str) -> dict[str, any] | None:
-        org_collection = mongo.db.org_register_request
-        org_doc = org_collection.find_one({"organization_id": organization_id})
-        if org_doc and '_id' in org_doc and not isinstance(org_doc['_id'], str):
-            org_doc['_id'] = str(org_doc['_id']) 
-        return org_doc
+        """Read-through cached; callers get their own copy of the record."""
+        org_doc = cls._org_cache.get(organization_id)
+        if org_doc is None:
+            org_collection = mongo.db.org_register_request
+            org_doc = org_collection.find_one({"organization_id": organization_id})
+            if org_doc is None:
+                # Not cached, so a newly submitted organization shows up at once
+                return None
+            if '_id' in org_doc and not isinstance(org_doc['_id'], str):
+                org_doc['_id'] = str(org_doc['_id'])
+            cls._org_cache.set(organization_id, org_doc)
+        return copy.deepcopy(org_doc)
 
     
     @classmethod
@@ -143,4 +247,7 @@ class OrganizationService:
         result = approval_requests_coll.find_one(
             {"submit_user_id": oconvener_user_id, "organization_id": organization_id}
         )
-        return result
\ No newline at end of file
+        return result
+
+
+job_engine.register(ORG_RENAME_JOB, OrganizationService.run_org_rename)
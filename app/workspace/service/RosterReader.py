@@ -0,0 +1,172 @@
+import os
+from zipfile import BadZipFile
+import openpyxl
+import pandas as pd
+from openpyxl.utils.exceptions import InvalidFileException
+
+ROSTER_REQUIRED_COLUMNS = {
+    'email': "email",
+    'username': "username",
+    'access public': "access public",
+    'access consume': "access consume",
+    'access provide': "access provide"
+}
+ROSTER_ACCESS_LEVEL_COLUMNS = [
+    ('access public', "access public"),
+    ('access consume', "access consume"),
+    ('access provide', "access provide")
+]
+ROSTER_FEE_COLUMN = 'membership fee'
+ROSTER_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+
+
+class RosterReader:
+    """
+    Reads a member roster in fixed-size chunks so memory stays flat regardless of the
+    number of rows. .xlsx files are streamed with openpyxl's read-only mode and .csv files
+    with pandas' chunked reader. Legacy .xls files have no streaming reader and are loaded
+    with pandas first, then handed out in the same chunks.
+
+    Every chunk is a DataFrame with normalized column names whose index is the 0-based
+    position of the row below the header, so row numbers stay stable across chunks.
+    """
+
+    def __init__(self, source, filename: str, chunk_size: int = 500):
+        self.source = source
+        self.extension = os.path.splitext(filename or '')[1].lower()
+        self.chunk_size = max(int(chunk_size), 1)
+        self._workbook = None
+        self._columns = None
+        self._estimated_total = None
+        self._frame = None
+        if self.extension not in ROSTER_EXTENSIONS:
+            raise ValueError(f"Unsupported roster file type '{self.extension}'.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def is_supported_file(filename: str) -> bool:
+        return bool(filename) and filename.lower().endswith(ROSTER_EXTENSIONS)
+
+    @staticmethod
+    def normalize_columns(columns) -> list[str]:
+        return [str(col).strip().lower().replace('_', ' ') for col in columns]
+
+    @property
+    def columns(self) -> list[str]:
+        if self._columns is None:
+            self._read_header()
+        return self._columns
+
+    @property
+    def estimated_total(self) -> int | None:
+        """Row count from the sheet dimensions where the format records it (.xlsx/.xls), otherwise None."""
+        if self._columns is None:
+            self._read_header()
+        return self._estimated_total
+
+    def missing_columns(self) -> list[str]:
+        return [display_name for internal_name, display_name in ROSTER_REQUIRED_COLUMNS.items() if internal_name not in self.columns]
+
+    def iter_chunks(self, start_row: int = 0):
+        """Yields DataFrames of about chunk_size rows, skipping rows before start_row."""
+        if self.extension == '.xlsx':
+            chunks = self._iter_xlsx_chunks(start_row)
+        elif self.extension == '.csv':
+            chunks = self._iter_csv_chunks()
+        else:
+            chunks = self._iter_frame_chunks(self._read_whole_sheet())
+
+        for chunk in chunks:
+            if len(chunk) and chunk.index[-1] < start_row:
+                continue
+            chunk = chunk[chunk.index >= start_row]
+            if len(chunk):
+                yield chunk
+
+    def close(self):
+        if self._workbook is not None:
+            self._workbook.close()
+            self._workbook = None
+
+    def _rewind(self):
+        if hasattr(self.source, 'seek'):
+            self.source.seek(0)
+
+    def _read_header(self):
+        if self.extension == '.xlsx':
+            sheet = self._open_sheet()
+            header = next(sheet.iter_rows(max_row=1, values_only=True), None)
+            if header is None:
+                raise pd.errors.EmptyDataError("No columns to parse from file")
+            self._columns = self.normalize_columns(
+                col if col is not None else f"Unnamed: {position}" for position, col in enumerate(header)
+            )
+            if sheet.max_row:
+                self._estimated_total = max(sheet.max_row - 1, 0)
+        elif self.extension == '.csv':
+            self._rewind()
+            self._columns = self.normalize_columns(pd.read_csv(self.source, nrows=0, encoding='utf-8-sig').columns)
+        else:
+            df = self._read_whole_sheet()
+            self._columns = list(df.columns)
+            self._estimated_total = len(df)
+
+    def _open_sheet(self):
+        if self._workbook is None:
+            self._rewind()
+            try:
+                self._workbook = openpyxl.load_workbook(self.source, read_only=True, data_only=True)
+            except (InvalidFileException, BadZipFile, KeyError) as e:
+                raise ValueError(f"Not a valid .xlsx workbook: {e}")
+        return self._workbook.active
+
+    def _iter_xlsx_chunks(self, start_row: int):
+        columns = self.columns
+        width = len(columns)
+        rows, row_indexes = [], []
+        blank_run_start, blank_run_length = 0, 0
+        rows_iter = self._open_sheet().iter_rows(min_row=2, values_only=True)
+        for position, values in enumerate(rows_iter):
+            values = tuple(values[:width]) + (None,) * (width - len(values))
+            if all(value is None or value == '' for value in values):
+                # Like pandas, keep blank rows between data but drop the trailing ones.
+                if blank_run_length == 0:
+                    blank_run_start = position
+                blank_run_length += 1
+                continue
+            for blank_position in range(max(blank_run_start, start_row), blank_run_start + blank_run_length):
+                rows.append((None,) * width)
+                row_indexes.append(blank_position)
+            blank_run_length = 0
+            if position >= start_row:
+                rows.append(values)
+                row_indexes.append(position)
+            if len(rows) >= self.chunk_size:
+                yield pd.DataFrame(rows, columns=columns, index=row_indexes)
+                rows, row_indexes = [], []
+        if rows:
+            yield pd.DataFrame(rows, columns=columns, index=row_indexes)
+
+    def _iter_csv_chunks(self):
+        columns = self.columns
+        self._rewind()
+        for chunk in pd.read_csv(self.source, chunksize=self.chunk_size, encoding='utf-8-sig'):
+            chunk.columns = columns
+            yield chunk
+
+    def _read_whole_sheet(self) -> pd.DataFrame:
+        if self._frame is None:
+            self._rewind()
+            df = pd.read_excel(self.source)
+            df.columns = self.normalize_columns(df.columns)
+            self._frame = df.reset_index(drop=True)
+        return self._frame
+
+    def _iter_frame_chunks(self, df: pd.DataFrame):
+        for start in range(0, len(df), self.chunk_size):
+            yield df.iloc[start:start + self.chunk_size]
@@ -7,6 +7,7 @@ from app.models.ActivityRecord import ActivityRecord
 from ..models import Workspace, OConvener
 from datetime import datetime, UTC
 from flask import current_app
+from .OrganizationService import OrganizationService
 from ..utils import ACTIVE, PENDING_EADMIN_APPROVAL, PENDING_SEADMIN_APPROVAL, REJECTED_BY_EADMIN, REJECTED_BY_SEADMIN, NOT_SUBMITTED
 
 class WorkspaceService:
@@ -144,6 +145,7 @@ class WorkspaceService:
                 {"$set": updates_for_mongo_services_field, "$currentDate": {"last_updated_at": True}}
             )
 
+            OrganizationService.invalidate_organization_cache(organization_id)
             if result.modified_count > 0:
                 # Construct log details from the actual updates applied
                 log_details_parts = []
@@ -173,16 +175,20 @@ class WorkspaceService:
             return False, f"Server error during service configuration update: {str(e)}"
 
     @classmethod
-    def get_organization_logs(cls, organization_id: str, performed_by_email: str, page: int = 1, limit: int = 15) -> tuple[list[dict[str, any]], int]: 
+    def get_organization_logs(cls, organization_id: str, performed_by_email: str, page: int = 1, limit: int = 15, member_emails: list[str] | None = None) -> tuple[list[dict[str, any]], int]: 
+        """member_emails can be passed in by callers that already loaded the organization's members."""
         if not organization_id:
             return [], 0
 
         users_collection = mongo.db.users
         log_collection = mongo.db.activity_log
         
-        member_emails = [member_doc['email'] for member_doc in users_collection.find(
-            {"organization_id": organization_id}, {"email": 1}) if 'email' in member_doc
-        ]
+        if member_emails is None:
+            member_emails = [member_doc['email'] for member_doc in users_collection.find(
+                {"organization_id": organization_id}, {"email": 1}) if 'email' in member_doc
+            ]
+        else:
+            member_emails = list(member_emails)
         if performed_by_email and performed_by_email not in member_emails:
             oconvener_user = users_collection.find_one({"email": performed_by_email, "organization_id": organization_id})
             if oconvener_user:
@@ -1,4 +1,5 @@
 from flask import current_app
+from app.status_counters import StatusCounters
 # Organization Status Constants
 PENDING_EADMIN_APPROVAL = "pending_eadmin_approval"  # EAdmin 审批后的状态，等待 SEadmin 审批
 PENDING_SEADMIN_APPROVAL = "pending_seadmin_approval" # 新增状态，专指等待SEadmin审批
@@ -7,6 +8,9 @@ REJECTED_BY_EADMIN = "rejected_by_eadmin" # EAdmin 拒绝
 REJECTED_BY_SEADMIN = "rejected_by_seadmin" # SEadmin 拒绝 (新增)
 NOT_SUBMITTED = "not_submitted"
 
+# Registration applications per status (org_register_request), for the approval queues
+registration_counters = StatusCounters("org_register_request")
+
 def allowed_file_for_proof(filename: str) -> bool:
     allowed_extensions = current_app.config.get('ALLOWED_EXTENSIONS_DOCS', {'pdf'})
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
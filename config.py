@@ -24,10 +24,94 @@ class Config:
     MAIL_PASSWORD = None
     MAIL_USE_TLS = False
     MAIL_USE_SSL = False
-    MAIL_DEFAULT_SENDER = {'E-DBA System', 'sys@arianet.xyz'}
+    MAIL_DEFAULT_SENDER = ('E-DBA System', 'sys@arianet.xyz')
     # Run test smtp daemon with following command:
     # `python -m aiosmtpd -n -l localhost:1025`
 
+    # Outbound mail queue (app/mail_queue.py); with MAIL_QUEUE_ENABLED off mail is sent inline
+    MAIL_QUEUE_ENABLED = True
+    MAIL_QUEUE_BATCH_SIZE = 50        # messages sent per claim round over one SMTP connection
+    MAIL_QUEUE_POLL_INTERVAL = 5      # seconds; new messages wake the sender immediately
+    MAIL_QUEUE_MAX_ATTEMPTS = 5
+    MAIL_QUEUE_RETRY_BASE = 30        # seconds before the first retry, doubled for each further one
+    MAIL_QUEUE_IDLE_TIMEOUT = 60      # close the SMTP connection after this many idle seconds
+
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', os.path.join(os.path.abspath(os.path.dirname(__file__)), 'uploads'))
     ALLOWS_EXTENTIONS = {"pdf"}
-    
\ No newline at end of file
+
+    # Background jobs (member imports etc.)
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_STALE_AFTER = timedelta(minutes=2)   # running jobs without a heartbeat for this long are resumed; refreshed every quarter of it
+    JOB_SWEEP_INTERVAL = 60                  # seconds between checks for interrupted jobs
+    JOB_RESUME_ON_START = True
+    JOB_RESULT_LIMIT = 5000                  # max entries kept per result list on a job document
+    LEDGER_RECOVER_AFTER = timedelta(minutes=5)   # pending ledger entries older than this are finished by the job sweep
+    IMPORT_JOB_CHUNK_SIZE = 500
+    ORG_RENAME_CHUNK_SIZE = 1000             # documents renamed per write by the org_rename job
+
+    # Thread pool used by extensions.run_parallel for independent dashboard queries
+    PARALLEL_QUERY_WORKERS = int(os.environ.get('PARALLEL_QUERY_WORKERS', 8))
+
+    # Create the indexes declared in app/indexes.py when the app starts (`flask indexes ensure` does the same on demand)
+    ENSURE_INDEXES_ON_START = os.environ.get('ENSURE_INDEXES_ON_START', 'false').lower() in ('1', 'true', 'yes')
+
+    # Query plan auditor (tests/staging): explains sampled reads and reports collection scans per route
+    QUERY_AUDIT_ENABLED = os.environ.get('QUERY_AUDIT_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    QUERY_AUDIT_SAMPLE_RATE = float(os.environ.get('QUERY_AUDIT_SAMPLE_RATE', 1.0))
+    QUERY_AUDIT_BASELINE = os.environ.get('QUERY_AUDIT_BASELINE')             # JSON list of known COLLSCAN shapes
+    QUERY_AUDIT_FAIL_ON_NEW_COLLSCAN = os.environ.get('QUERY_AUDIT_FAIL_ON_NEW_COLLSCAN', 'false').lower() in ('1', 'true', 'yes')
+    QUERY_AUDIT_REPORT_PATH = os.environ.get('QUERY_AUDIT_REPORT_PATH')       # report written here when the process exits
+
+    # Per-request DB/HTTP counters, reported in a Server-Timing header and one JSON log line per request
+    REQUEST_INSTRUMENTATION_ENABLED = True
+    SERVER_TIMING_HEADER = True
+    REQUEST_N_PLUS_ONE_THRESHOLD = 20   # same command on the same collection this many times in one request is flagged
+
+    # /metrics (Prometheus text format). Under multi-worker gunicorn point METRICS_MULTIPROC_DIR at a
+    # directory shared by the workers (cleared on deploy) so every scrape sees all workers.
+    METRICS_ENABLED = True
+    METRICS_MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR')
+    METRICS_FLUSH_INTERVAL = 5   # seconds between writes of a worker's samples in multiprocess mode
+
+    # In-process user document cache used by IdentityService (per worker; writes through the services invalidate it)
+    USER_CACHE_TTL = 30       # seconds
+    USER_CACHE_SIZE = 10000
+
+    # In-process organization record cache used by OrganizationService.get_organization_details (per worker)
+    ORG_CACHE_TTL = 60        # seconds
+    ORG_CACHE_SIZE = 2000
+
+    # E-Admin / Senior E-Admin approval queues: page size and the bulk approve/reject limit
+    ADMIN_QUEUE_PAGE_SIZE = 25
+    ADMIN_BULK_MAX_APPLICATIONS = 1000
+    ADMIN_DASHBOARD_TOTALS_TTL = 30   # seconds the log/policy totals behind the dashboard pagination are cached
+
+    # Help desk: questions per page on /help, /help/admin and the T-Admin dashboard, and search result limit
+    HELP_PAGE_SIZE = 20
+    HELP_SEARCH_LIMIT = 50
+
+    # Provider notification stream (SSE); connections end after NOTIFICATION_STREAM_MAX_SECONDS and the browser reconnects
+    NOTIFICATION_STREAM_POLL_INTERVAL = 2   # seconds between the per-process checks for new notifications
+    NOTIFICATION_STREAM_HEARTBEAT = 15      # seconds between keep-alive comments
+    NOTIFICATION_STREAM_MAX_SECONDS = 300
+
+    # Rate limiting of the datauser, consumer and public APIs (app/ratelimit.py)
+    RATE_LIMIT_ENABLED = True
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')   # 'mongo' shares the limits between workers
+    RATE_LIMITS = {"ip": "300/minute", "user": "120/minute", "organization": "1200/minute"}
+    RATE_LIMIT_ENDPOINTS = {
+        "consumer.download_thesis": {"user": "10/minute"},
+        "public.download_thesis": {"user": "10/minute"},
+        "public.search_courses": {"ip": "60/minute"}
+    }
+    # Reverse proxies in front of the app; their X-Forwarded-For entries are trusted so the
+    # "ip" limit sees the client address. 0 when clients connect directly.
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+
+    # Daily thesis download quota (USER_QUOTA, one document per user and UTC day)
+    QUOTA_DEFAULT_MAX_DAILY = 5       # for users without their own max_daily
+    QUOTA_LIMIT_CACHE_TTL = 60        # seconds a user's max_daily is cached in-process
+    QUOTA_EXHAUSTED_CACHE_TTL = 60    # seconds an exhausted user is refused without a database lookup
+
+    # Login / verification codes (OTP and CAPTCHA collections, expired by TTL indexes)
+    CODE_MAX_ATTEMPTS = 5     # wrong guesses before a code stops working